@@ -0,0 +1,89 @@
+"""
+CPU Layout Benchmark
+Sweeps inference worker layouts (workers x cores per worker, NUMA pinned) and reports the best fps for this host
+
+Usage:
+    python benchmarks/cpu_layout_benchmark.py --model RealESRGAN_x4plus --width 320 --height 180 --frames 32
+    python benchmarks/cpu_layout_benchmark.py --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.cpu_topology import get_numa_nodes, worker_layout, worker_env, format_cpulist
+from utils.worker_pool import InferenceWorkerPool
+
+
+def layout_envs(num_workers, pinned):
+    """Worker environments for one layout (unpinned workers share every core)"""
+    layout = worker_layout(num_workers)
+    return layout, [worker_env(slot) if pinned else {} for slot in layout]
+
+
+async def run_frames(pool, frame, model_name, frames):
+    """Upscale frames on the pool, as many in flight as there are workers"""
+    await asyncio.gather(*(pool.enhance_frame(frame, model_name, "CPU") for _ in range(frames)))
+
+
+def bench_layout(num_workers, pinned, frame, model_name, frames, temp_dir):
+    """Frames/s for one layout"""
+    layout, envs = layout_envs(num_workers, pinned)
+    pool = InferenceWorkerPool(num_workers, Path(temp_dir) / f"layout_{num_workers}_{int(pinned)}", envs)
+    pool.start()
+    try:
+        pool.ready.wait()
+        # Warm up: load the model in every worker
+        asyncio.run(run_frames(pool, frame, model_name, num_workers * 2))
+        
+        start = time.perf_counter()
+        asyncio.run(run_frames(pool, frame, model_name, frames))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    return layout, frames / elapsed
+
+
+def main():
+    nodes = get_numa_nodes()
+    total_cores = sum(len(info["cores"]) for info in nodes.values())
+    default_workers = sorted({1, len(nodes)} | {2 ** i for i in range(1, 8) if 2 ** i <= total_cores // 2})
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="RealESRGAN_x4plus")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=180)
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    args = parser.parse_args()
+    
+    print(f"Host: {total_cores} usable cores on {len(nodes)} NUMA node(s)")
+    for node, info in nodes.items():
+        print(f"  node {node}: cores {format_cpulist(info['cores'])}, {info['memory'] / 1024**3:.1f} GB")
+    print(f"Model: {args.model}, frame {args.width}x{args.height}, {args.frames} frames per layout\n")
+    
+    frame = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Baseline: one unpinned worker letting torch use every core
+        sweep = [(1, False)] + [(workers, True) for workers in args.workers]
+        for num_workers, pinned in sweep:
+            layout, fps = bench_layout(num_workers, pinned, frame, args.model, args.frames, temp_dir)
+            cores = " | ".join(format_cpulist(slot["cores"]) for slot in layout) if pinned else "all (unpinned)"
+            print(f"  {num_workers:>3} worker(s) {fps:8.2f} fps  cores: {cores}")
+            results.append((fps, num_workers, pinned))
+    
+    fps, num_workers, pinned = max(results)
+    print(f"\nBest: {num_workers} {'pinned' if pinned else 'unpinned'} worker(s) at {fps:.2f} fps")
+    if pinned:
+        print(f"Run with INFERENCE_WORKERS={num_workers} to use this layout")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+LUT Benchmark
+Measures 3D-LUT grading throughput of every code path on a synthetic LUT and frame
+
+Usage:
+    python benchmarks/lut_benchmark.py --width 1920 --height 1080 --size 33
+    python benchmarks/lut_benchmark.py --cube path/to/grade.cube --frames 10
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import torch
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.color_lut import Lut3D
+
+
+def synthetic_lut(size):
+    """A smooth, non-trivial grade: contrast curve plus a channel cross-talk"""
+    codes = np.linspace(0, 1, size, dtype=np.float32)
+    b, g, r = np.meshgrid(codes, codes, codes, indexing="ij")
+    rgb = np.stack([r, g, b], axis=-1)
+    curved = rgb * rgb * (3 - 2 * rgb)
+    mixed = curved @ np.array([[0.9, 0.05, 0.05], [0.05, 0.85, 0.1], [0.0, 0.1, 0.9]], dtype=np.float32)
+    return Lut3D(np.clip(mixed, 0, 1), title=f"synthetic {size}³")
+
+
+def bench(fn, frames):
+    """Seconds per call of fn, after one warm-up call"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cube", help="Benchmark this .cube file instead of a synthetic LUT")
+    parser.add_argument("--size", type=int, default=33, help="Grid size of the synthetic LUT")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=5)
+    args = parser.parse_args()
+    
+    lut = Lut3D.from_file(args.cube) if args.cube else synthetic_lut(args.size)
+    rng = np.random.default_rng(0)
+    frame8 = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    frame16 = rng.integers(0, 65536, (args.height, args.width, 3), dtype=np.uint16)
+    frame_float = frame8.astype(np.float32) / 255.0
+    megapixels = args.width * args.height / 1e6
+    print(f"LUT: {lut.title} ({lut.size}³), frame {args.width}x{args.height}, {args.frames} frames per path\n")
+    
+    # One-off costs, paid on the first frame of a job
+    for method in ("tetrahedral", "trilinear"):
+        start = time.perf_counter()
+        lut._dense_table(method)
+        print(f"  Bake 8-bit {method:<12} table: {time.perf_counter() - start:6.2f}s (once per LUT)")
+    print()
+    
+    paths = {
+        "float trilinear": lambda: lut.apply(frame_float, "trilinear"),
+        "float tetrahedral": lambda: lut.apply(frame_float, "tetrahedral"),
+        "8-bit baked table": lambda: lut.apply(frame8, "tetrahedral"),
+        "16-bit tetrahedral": lambda: lut.apply(frame16, "tetrahedral"),
+        "8-bit, 50% strength": lambda: lut.apply(frame8, "tetrahedral", 0.5),
+    }
+    tensor = torch.from_numpy(np.ascontiguousarray(frame_float[..., ::-1].transpose(2, 0, 1)))[None]
+    paths["torch grid_sample (CPU)"] = lambda: lut.apply_tensor(tensor)
+    if torch.cuda.is_available():
+        gpu_tensor = tensor.cuda()
+        
+        def on_gpu():
+            lut.apply_tensor(gpu_tensor)
+            torch.cuda.synchronize()
+        paths["torch grid_sample (CUDA)"] = on_gpu
+    
+    for name, fn in paths.items():
+        seconds = bench(fn, args.frames)
+        print(f"  {name:<26} {seconds * 1000:8.1f} ms/frame  {megapixels / seconds:8.1f} MP/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Model Benchmark
+Measures inference speed of every registered model (RRDBNet, compact SRVGG and classical draft) on this host
+
+Usage:
+    python benchmarks/model_benchmark.py --device cpu --width 320 --height 180 --frames 8
+    python benchmarks/model_benchmark.py --models RealESRGAN_x4plus realesr-general-x4v3 --device cuda
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import torch
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.config import MODELS
+from utils.model_factory import create_upsampler, model_architecture
+
+
+def bench_model(model_name, device, frame, frames, warmup=2):
+    """Seconds per frame of one model"""
+    upsampler = create_upsampler(model_name, device)
+    for _ in range(warmup):
+        upsampler.enhance(frame, outscale=MODELS[model_name]["scale"])
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    
+    start = time.perf_counter()
+    for _ in range(frames):
+        upsampler.enhance(frame, outscale=MODELS[model_name]["scale"])
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=180)
+    parser.add_argument("--frames", type=int, default=8)
+    args = parser.parse_args()
+    
+    device = torch.device(args.device)
+    frame = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    print(f"Device: {device}, frame {args.width}x{args.height}, {args.frames} frames per model "
+          f"({torch.get_num_threads()} torch threads)\n")
+    
+    results = {}
+    for model_name in args.models:
+        seconds = bench_model(model_name, device, frame, args.frames)
+        results[model_name] = seconds
+        megapixels = args.width * args.height / 1e6 / seconds
+        print(f"  {model_name:<28} {model_architecture(model_name):<9} {seconds:8.3f}s/frame "
+              f"{1 / seconds:7.2f} fps  {megapixels:6.3f} input MP/s")
+    
+    reference = results.get("RealESRGAN_x4plus")
+    if reference:
+        print("\nMeasured cost relative to RealESRGAN_x4plus (config relative_cost in brackets):")
+        for model_name, seconds in results.items():
+            print(f"  {model_name:<28} {seconds / reference:5.2f}  [{MODELS[model_name].get('relative_cost', 1.0)}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Shared Memory Ring Benchmark
+Compares frame hand-off throughput of SharedFrameRing against a pickling multiprocessing.Queue
+
+Usage:
+    python benchmarks/shm_ring_benchmark.py --width 7680 --height 4320 --frames 120
+"""
+import argparse
+import multiprocessing as mp
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.shm_ring import SharedFrameRing
+
+
+def _source_frame(frame_shape):
+    """Frame the producers send, noise so nothing compresses or short-circuits"""
+    return np.random.default_rng(0).integers(0, 256, frame_shape, dtype=np.uint8)
+
+
+def _ring_producer(ring, frame_shape, frames):
+    """Copy whole frames into the ring's slots"""
+    frame = _source_frame(frame_shape)
+    for sequence in range(frames):
+        frame[0, 0, 0] = sequence % 256
+        np.copyto(ring.acquire_write(), frame)
+        ring.commit_write(sequence)
+    ring.close()
+
+
+def _queue_producer(queue, frame_shape, frames):
+    """Send frames through a queue (pickled)"""
+    frame = _source_frame(frame_shape)
+    for sequence in range(frames):
+        frame[0, 0, 0] = sequence % 256
+        queue.put((sequence, frame))
+
+
+def bench_ring(frame_shape, frames, slots):
+    """Frames/s through the shared memory ring"""
+    context = mp.get_context("spawn")
+    ring = SharedFrameRing(frame_shape, slots, context=context)
+    producer = context.Process(target=_ring_producer, args=(ring, frame_shape, frames))
+    producer.start()
+    
+    # The consumer copies each frame out too, like a queue consumer ends up with its own copy
+    output = np.empty(frame_shape, dtype=np.uint8)
+    start = time.perf_counter()
+    for expected in range(frames):
+        sequence, view = ring.acquire_read()
+        assert sequence == expected, f"out of order: {sequence} != {expected}"
+        np.copyto(output, view)
+        assert output[0, 0, 0] == expected % 256
+        ring.release_read()
+    elapsed = time.perf_counter() - start
+    
+    producer.join()
+    ring.close()
+    ring.unlink()
+    return frames / elapsed
+
+
+def bench_queue(frame_shape, frames, slots):
+    """Frames/s through a multiprocessing.Queue"""
+    context = mp.get_context("spawn")
+    queue = context.Queue(maxsize=slots)
+    producer = context.Process(target=_queue_producer, args=(queue, frame_shape, frames))
+    producer.start()
+    
+    start = time.perf_counter()
+    for _ in range(frames):
+        queue.get()
+    elapsed = time.perf_counter() - start
+    
+    producer.join()
+    return frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=7680)
+    parser.add_argument("--height", type=int, default=4320)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--slots", type=int, default=4)
+    args = parser.parse_args()
+    
+    frame_shape = (args.height, args.width, 3)
+    megabytes = np.prod(frame_shape) / 1024**2
+    print(f"Frame: {args.width}x{args.height}x3 ({megabytes:.1f} MB), {args.frames} frames, {args.slots} slots")
+    
+    for name, bench in (("SharedFrameRing", bench_ring), ("mp.Queue (pickle)", bench_queue)):
+        fps = bench(frame_shape, args.frames, args.slots)
+        print(f"  {name:<18} {fps:8.1f} frames/s  {fps * megabytes / 1024:6.2f} GB/s")
+
+
+if __name__ == "__main__":
+    main()
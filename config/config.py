@@ -23,27 +23,181 @@ MODELS = {
         "model_name": "RealESRGAN_x4plus",
         "url": "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.1.0/RealESRGAN_x4plus.pth",
         "description": "General purpose, best quality/performance balance",
+        "architecture": "rrdbnet",
+        "num_block": 23,
+        "family": "general",
+        "relative_cost": 1.0,
+        "content": ["live_action", "animation"],
         "default": True
     },
     "RealESRGAN_x2plus": {
         "scale": 2,
         "model_name": "RealESRGAN_x2plus",
         "url": "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.1/RealESRGAN_x2plus.pth",
-        "description": "Lighter upscaling"
+        "description": "Lighter upscaling",
+        "architecture": "rrdbnet",
+        "num_block": 23,
+        "family": "general",
+        "relative_cost": 0.3,
+        "content": ["live_action", "animation"]
     },
     "RealESRNet_x4plus": {
         "scale": 4,
         "model_name": "RealESRNet_x4plus",
         "url": "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.1.1/RealESRNet_x4plus.pth",
-        "description": "Cleaner, less aggressive enhancement"
+        "description": "Cleaner, less aggressive enhancement",
+        "architecture": "rrdbnet",
+        "num_block": 23,
+        "family": "clean",
+        "relative_cost": 1.0,
+        "content": ["live_action"],
+        "clean_only": True
     },
     "RealESRGAN_x4plus_anime_6B": {
         "scale": 4,
         "model_name": "RealESRGAN_x4plus_anime_6B",
         "url": "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.2.4/RealESRGAN_x4plus_anime_6B.pth",
-        "description": "Optimized for anime/cartoon content"
+        "description": "Optimized for anime/cartoon content",
+        "architecture": "rrdbnet",
+        "num_block": 6,
+        "family": "anime",
+        "relative_cost": 0.3,
+        "content": ["animation"]
+    },
+    "realesr-general-x4v3": {
+        "scale": 4,
+        "model_name": "realesr-general-x4v3",
+        "url": "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.5.0/realesr-general-x4v3.pth",
+        "description": "Compact general model, many times faster (good choice on CPU)",
+        "architecture": "srvgg",
+        "num_conv": 32,
+        "family": "compact",
+        "relative_cost": 0.08,
+        "content": ["live_action", "animation"]
+    },
+    "realesr-animevideov3": {
+        "scale": 4,
+        "model_name": "realesr-animevideov3",
+        "url": "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.5.0/realesr-animevideov3.pth",
+        "description": "Compact anime video model, fastest option for animation",
+        "architecture": "srvgg",
+        "num_conv": 16,
+        "family": "compact_anime",
+        "relative_cost": 0.04,
+        "content": ["animation"]
+    },
+    "draft-lanczos-x4": {
+        "scale": 4,
+        "model_name": "draft-lanczos-x4",
+        "url": None,
+        "description": "Draft: Lanczos resampling with edge-aware sharpening, no AI (quick looks and proxy files)",
+        "architecture": "classical",
+        "interpolation": "lanczos",
+        "sharpen": 0.6,
+        "family": "draft_lanczos",
+        "relative_cost": 0.002
+    },
+    "draft-lanczos-x2": {
+        "scale": 2,
+        "model_name": "draft-lanczos-x2",
+        "url": None,
+        "description": "Draft: 2x Lanczos resampling with edge-aware sharpening, no AI",
+        "architecture": "classical",
+        "interpolation": "lanczos",
+        "sharpen": 0.5,
+        "family": "draft_lanczos",
+        "relative_cost": 0.002
+    },
+    "draft-bicubic-x4": {
+        "scale": 4,
+        "model_name": "draft-bicubic-x4",
+        "url": None,
+        "description": "Draft: bicubic resampling with edge-aware sharpening, fastest option",
+        "architecture": "classical",
+        "interpolation": "bicubic",
+        "sharpen": 0.7,
+        "family": "draft_bicubic",
+        "relative_cost": 0.0015
+    },
+    "draft-bicubic-x2": {
+        "scale": 2,
+        "model_name": "draft-bicubic-x2",
+        "url": None,
+        "description": "Draft: 2x bicubic resampling with edge-aware sharpening, fastest option",
+        "architecture": "classical",
+        "interpolation": "bicubic",
+        "sharpen": 0.6,
+        "family": "draft_bicubic",
+        "relative_cost": 0.0015
     }
 }
+# "architecture": network the factory builds ("rrdbnet" or "srvgg"), with its size ("num_block" / "num_conv"),
+# or "classical" for draft models: OpenCV resampling ("interpolation") plus edge-aware "sharpen", no weights
+# "family": models that look alike and may stand in for each other at a different scale
+# "relative_cost": inference cost per input pixel relative to RealESRGAN_x4plus
+# "content": material the model suits in auto model mode (models without it are never picked automatically);
+# "clean_only": unsuited to noisy sources
+
+# Output renditions for upscaled videos (encoded in parallel from one upscale pass)
+RENDITIONS = {
+    "H.264 Full Resolution": {
+        "vcodec": "libx264",
+        "pix_fmt": "yuv420p",
+        "crf": 18,
+        "container": "mp4",
+        "description": "Same settings as the classic single output",
+        "default": True
+    },
+    "H.264 1080p": {
+        "vcodec": "libx264",
+        "pix_fmt": "yuv420p",
+        "crf": 20,
+        "height": 1080,
+        "container": "mp4",
+        "description": "1080p ladder rung for web delivery"
+    },
+    "H.264 720p": {
+        "vcodec": "libx264",
+        "pix_fmt": "yuv420p",
+        "crf": 21,
+        "height": 720,
+        "container": "mp4",
+        "description": "720p ladder rung for web delivery"
+    },
+    "HEVC Full Resolution": {
+        "vcodec": "libx265",
+        "pix_fmt": "yuv420p",
+        "crf": 22,
+        "tag:v": "hvc1",
+        "container": "mp4",
+        "description": "Smaller files, needs HEVC-capable players"
+    },
+    "AV1 Full Resolution": {
+        "vcodec": "libsvtav1",
+        "pix_fmt": "yuv420p",
+        "crf": 30,
+        "preset": 8,
+        "container": "mp4",
+        "description": "Best compression, slowest to encode"
+    },
+    "ProRes 422 HQ": {
+        "vcodec": "prores_ks",
+        "pix_fmt": "yuv422p10le",
+        "profile:v": 3,
+        "container": "mov",
+        "description": "Mezzanine master for further editing"
+    }
+}
+
+# Segmented stream written for job API clients that want early output
+JOB_STREAM_RENDITION = {
+    "vcodec": "libx264",
+    "pix_fmt": "yuv420p",
+    "crf": 20,
+    "format": "hls",
+    "segment_seconds": 4,
+    "container": "m3u8"
+}
 
 # Device options
 DEVICE_OPTIONS = ["CPU", "GPU (CUDA)", "MPS (Apple Silicon)"]
@@ -66,3 +220,97 @@ def ensure_directories():
 
 # Session file
 SESSION_FILE = CONFIG_DIR / "session.json"
+
+# Throughput history used for job time predictions
+PERFORMANCE_FILE = CONFIG_DIR / "performance_history.json"
+
+# Balance CPU cores between inference threads and the video encoders during a job
+CPU_BALANCE_ENABLED = os.getenv("CPU_BALANCE", "1") == "1"
+# Let the balancer also switch x264/x265 to faster presets mid-job. Those renditions are then
+# written in MPEG-TS parts and joined at the end, an extra remux, so it is opt-in
+CPU_BALANCE_PRESETS_ENABLED = os.getenv("CPU_BALANCE_PRESETS", "0") == "1"
+# Fastest x264/x265 preset the balancer may fall back to when encoding is the bottleneck
+CPU_BALANCE_PRESET_FLOOR = "veryfast"
+# Frames per measurement window
+CPU_BALANCE_INTERVAL = 24
+
+# Media metadata cache (keyed by path, size and mtime) and parallel probes when filling it
+MEDIA_INDEX_FILE = CONFIG_DIR / "media_index.json"
+MEDIA_PROBE_WORKERS = int(os.getenv("MEDIA_PROBE_WORKERS", "8"))
+# Single-file probes rewrite the index at most this often (seconds), the rest is saved on exit
+MEDIA_INDEX_SAVE_INTERVAL = 5.0
+
+# Jobs predicted to take longer than this (seconds) get a warning in the UI
+LONG_JOB_WARNING_SECONDS = 3600
+
+# Minimum seconds between progress updates (UI, terminal and job events)
+PROGRESS_UPDATE_INTERVAL = 0.5
+
+# Job API (HTTP + Server-Sent Events), independent of the Gradio UI
+JOB_API_ENABLED = os.getenv("JOB_API_ENABLED", "0") == "1"
+JOB_API_HOST = os.getenv("JOB_API_HOST", "127.0.0.1")
+JOB_API_PORT = int(os.getenv("JOB_API_PORT", "7861"))
+# Finished jobs (and their output directories) are deleted beyond this many, or this many hours
+# after they finished
+JOB_RETENTION_COUNT = int(os.getenv("JOB_RETENTION_COUNT", "50"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+# Jobs that opt in ("draft_under_load") run on the draft model of their scale when at least this
+# many jobs are queued behind them
+DRAFT_FALLBACK_QUEUE_DEPTH = int(os.getenv("DRAFT_FALLBACK_QUEUE_DEPTH", "3"))
+
+# Separate inference worker processes (0 = run inference in the web server process)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+# Frame rings between the web process and each worker: slots per direction and bytes per
+# input slot (output slots hold 4x). Larger frames, or frames arriving while all slots
+# are busy, get a shared memory block of their own. 0 turns the rings off
+WORKER_RING_SLOTS = 2
+WORKER_RING_FRAME_BYTES = int(os.getenv("WORKER_RING_FRAME_BYTES", str(1920 * 1080 * 3)))
+
+# Device scheduling
+# CPU cores per schedulable CPU device (0 = one group per NUMA node)
+CPU_GROUP_SIZE = int(os.getenv("CPU_GROUP_SIZE", "0")) or None
+# Share of each device's memory the scheduler may hand out
+DEVICE_MEMORY_FRACTION = 0.9
+# Memory a batched forward pass may use on CPU/MPS (CUDA uses free device memory)
+BATCH_MEMORY_BUDGET_MB = int(os.getenv("BATCH_MEMORY_BUDGET_MB", "2048"))
+
+# Images with no side above this many pixels are packed into mosaics and upscaled together
+SMALL_IMAGE_MAX_SIDE = 128
+# Reflected border around each mosaic tile so neighbouring images don't bleed into each other
+MOSAIC_MARGIN = 16
+
+# Alpha channels: "resize" (cheap interpolation) or "model" (same forward pass as the colour)
+ALPHA_UPSCALE_MODE = os.getenv("ALPHA_UPSCALE_MODE", "resize")
+
+# Output size presets for target-resolution mode (None = the model's native scale)
+TARGET_RESOLUTIONS = {
+    "Model native": None,
+    "2x": {"scale": 2},
+    "1080p": {"height": 1080},
+    "1440p": {"height": 1440},
+    "4K UHD (2160p)": {"height": 2160},
+    "4K DCI crop (4096x2160)": {"width": 4096, "height": 2160, "mode": "fill"},
+    "8K (4320p)": {"height": 4320}
+}
+
+# Images above this many input pixels are upscaled tile by tile into a memory-mapped output
+LARGE_IMAGE_PIXELS = 40_000_000
+# Input tile size and feathered overlap (pixels) for tiled upscaling
+LARGE_IMAGE_TILE_SIZE = 512
+LARGE_IMAGE_TILE_OVERLAP = 32
+
+# Auto model mode: per-scene content classification thresholds
+AUTO_ANIMATION_THRESHOLD = 0.5  # animation score (0-1) from which a scene counts as animation
+AUTO_NOISE_THRESHOLD = 6.0  # estimated noise sigma (0-255 scale) above which a source counts as noisy
+AUTO_SAMPLES_PER_SCENE = 3  # frames profiled per scene
+
+# Face enhancement (GFPGAN), applied to upscaled frames when enabled
+FACE_ENHANCE_MODEL_URL = "https://github.com/TencentARC/GFPGAN/releases/download/v1.3.0/GFPGANv1.4.pth"
+FACE_ENHANCE_WEIGHT = 0.5  # blend of restored and original face features (0-1)
+FACE_DETECT_INTERVAL = 24  # frames between face detections when tracking holds (scene cuts always detect)
+FACE_TRACK_MAX_ERROR = 1.5  # forward-backward landmark tracking error (pixels) that forces a new detection
+FACE_BATCH_FRAMES = 8  # video frames whose face crops are restored together in one GFPGAN pass
+
+# Smart trimming: quality of the re-encoded fragments at the cut points
+TRIM_CRF = 16
+TRIM_PRESET = "medium"
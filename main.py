@@ -10,12 +10,24 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 # Import modules
-from config.config import ensure_directories
+from config.config import (
+    ensure_directories,
+    TEMP_DIR,
+    JOB_API_ENABLED,
+    JOB_API_HOST,
+    JOB_API_PORT,
+    INFERENCE_WORKERS
+)
 from utils.temp_manager import TempManager
 from utils.device_manager import DeviceManager
 from tabs.upscaler_tab import UpscalerTab
 from tabs.support_tab import SupportTab
+from tabs.trim_tab import TrimTab
+from tabs.color_tab import ColorTab
+from tabs.convert_tab import ConvertTab
 from theme.custom_theme import CustomTheme, create_custom_css
+from utils.job_api import JobManager, JobAPIServer
+from utils.worker_pool import InferenceWorkerPool
 
 
 class VideoEditorApp:
@@ -28,8 +40,17 @@ class VideoEditorApp:
         
         # Initialize tabs
         self.upscaler_tab = UpscalerTab(self.temp_manager, self.device_manager)
+        self.trim_tab = TrimTab(self.temp_manager)
+        self.color_tab = ColorTab(self.temp_manager)
+        self.convert_tab = ConvertTab(self.temp_manager)
         self.support_tab = SupportTab()
         
+        # Optional HTTP job API (enable with JOB_API_ENABLED=1)
+        self.job_api = None
+        
+        # Optional inference worker processes (enable with INFERENCE_WORKERS=N)
+        self.worker_pool = None
+        
     def initialize(self):
         """Initialize application"""
         print("=" * 60)
@@ -46,6 +67,22 @@ class VideoEditorApp:
         print(f"   Platform: {device_info['platform']}")
         print(f"   Current Device: {device_info['current']}")
         print(f"   Available Devices: {', '.join(device_info['available'])}")
+        print(f"   Schedulable Devices: {', '.join(device_info['devices'])}")
+        
+        # Start inference workers before the UI is built so handlers can use them
+        if INFERENCE_WORKERS > 0:
+            # Spread workers over accelerators, or pin them to NUMA-local core sets
+            worker_envs = self.device_manager.worker_envs(INFERENCE_WORKERS)
+            self.worker_pool = InferenceWorkerPool(INFERENCE_WORKERS, TEMP_DIR / "workers", worker_envs,
+                                                   device_manager=self.device_manager)
+            self.worker_pool.start()
+            self.upscaler_tab.worker_pool = self.worker_pool
+        
+        # Start job API
+        if JOB_API_ENABLED:
+            job_manager = JobManager(self.upscaler_tab, self.temp_manager)
+            self.job_api = JobAPIServer(job_manager, JOB_API_HOST, JOB_API_PORT)
+            self.job_api.start()
         
         print("\n" + "=" * 60)
         print("✓ Application initialized successfully")
@@ -67,6 +104,9 @@ class VideoEditorApp:
             
             # Main Tabs
             self.upscaler_tab.create_tab()
+            self.trim_tab.create_tab()
+            self.color_tab.create_tab()
+            self.convert_tab.create_tab()
             self.support_tab.create_tab()
             
             # Placeholder for future tabs
@@ -77,11 +117,8 @@ class VideoEditorApp:
                 This application is designed with a modular architecture. 
                 New tabs and features can be easily added:
                 
-                - 🎞️ Video Trimming & Cutting
-                - 🎨 Color Grading
                 - 🎵 Audio Enhancement
                 - 📝 Subtitle Generation
-                - 🔄 Format Conversion
                 - And much more!
                 
                 Stay tuned for updates!
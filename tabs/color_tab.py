@@ -0,0 +1,199 @@
+"""
+Color Grading Tab
+Applies .cube 3D LUTs to images and videos
+"""
+import cv2
+import gradio as gr
+import time
+from pathlib import Path
+from config.config import RENDITIONS, PROGRESS_UPDATE_INTERVAL
+from utils.color_lut import load_lut
+from utils.image_pipeline import prepare_for_format
+from utils.video_encoder import MultiEncoder
+from utils.progress import ProgressThrottle
+from utils.stream_mux import probe_streams, plan_streams, mux_tracks, carried, summarize_tracks
+
+# UI label -> Lut3D interpolation method
+LUT_METHODS = {
+    "Tetrahedral (most accurate)": "tetrahedral",
+    "Trilinear": "trilinear"
+}
+
+
+class ColorTab:
+    """Handles colour grading with 3D LUTs"""
+    
+    # Supported file extensions
+    IMAGE_EXTS = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.tif']
+    VIDEO_EXTS = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v']
+    
+    def __init__(self, temp_manager):
+        self.temp_manager = temp_manager
+    
+    def grade_image(self, file_path, lut, method, strength):
+        """Grade one image, keeping its format, bit depth and alpha"""
+        img = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise IOError(f"Could not read {Path(file_path).name}")
+        
+        start = time.time()
+        graded = lut.apply(img, method, strength)
+        elapsed = time.time() - start
+        
+        ext = Path(file_path).suffix.lower()
+        output_path = self.temp_manager.get_temp_file_path(f"graded_image{ext}")
+        if not cv2.imwrite(str(output_path), prepare_for_format(graded, ext)):
+            raise IOError(f"Could not write {output_path.name}")
+        
+        info = f"✓ Image graded with {lut.title}\n"
+        info += f"Size: {img.shape[1]}x{img.shape[0]}\n"
+        info += f"⏱️ Grading time: {elapsed:.2f}s"
+        return str(output_path), info
+    
+    def grade_video(self, file_path, lut, method, strength, progress):
+        """Grade every frame of a video, re-encode it once and carry the audio and subtitle tracks across"""
+        source_streams = probe_streams(file_path)
+        
+        cap = cv2.VideoCapture(file_path)
+        if not cap.isOpened():
+            raise IOError("Could not open video file")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        name, spec = next((name, spec) for name, spec in RENDITIONS.items() if spec.get("default"))
+        spec = {key: value for key, value in spec.items() if key not in ("width", "height")}
+        encoded_dir = self.temp_manager.create_temp_subdir("graded")
+        
+        encoder = None
+        frame_count = 0
+        grading_time = 0
+        throttle = ProgressThrottle(PROGRESS_UPDATE_INTERVAL)
+        start = time.time()
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_start = time.time()
+                graded = lut.apply(frame, method, strength)
+                grading_time += time.time() - frame_start
+                if encoder is None:
+                    encoder = MultiEncoder({name: spec}, graded.shape[1], graded.shape[0], fps, encoded_dir)
+                encoder.write(graded)
+                frame_count += 1
+                if throttle.ready(force=frame_count == total_frames):
+                    progress(0.9 * frame_count / max(total_frames, 1), desc=f"Frame {frame_count}/{total_frames}")
+        except Exception:
+            if encoder is not None:
+                encoder.abort()
+            raise
+        finally:
+            cap.release()
+        
+        if encoder is None:
+            raise IOError("No frames could be read from the video")
+        progress(0.9, desc="Finishing encoder...")
+        encoded_path = encoder.close()[name]
+        
+        container = spec.get('container', 'mp4')
+        output_path = self.temp_manager.get_temp_file_path(f"graded_video.{container}")
+        if output_path.exists():
+            output_path.unlink()
+        tracks = plan_streams(source_streams, container, types=("audio", "subtitle"))
+        if carried(tracks):
+            progress(0.95, desc="Adding audio...")
+            mux_tracks(encoded_path, file_path, tracks, output_path, container)
+            encoded_path.unlink()
+        else:
+            encoded_path.rename(output_path)
+        
+        total_time = time.time() - start
+        info = f"✓ Video graded with {lut.title}\n"
+        info += f"Frames processed: {frame_count}\n"
+        info += f"Audio: {'✓ ' + summarize_tracks(tracks) if carried(tracks) else '✗ No audio track'}\n"
+        info += f"\n⏱️ Performance:\n"
+        info += f"  Total time: {total_time:.2f}s\n"
+        info += f"  Grading: {grading_time / frame_count * 1000:.1f}ms/frame"
+        return str(output_path), info
+    
+    def grade_file(self, input_file, lut_file, method_label, strength, progress=gr.Progress()):
+        """Grade an uploaded image or video with an uploaded LUT"""
+        hidden = gr.update(visible=False)
+        if input_file is None:
+            return None, None, "Please upload an image or video", hidden, hidden
+        if lut_file is None:
+            return None, None, "Please upload a .cube LUT", hidden, hidden
+        
+        file_path = input_file if isinstance(input_file, str) else input_file.name
+        ext = Path(file_path).suffix.lower()
+        try:
+            progress(0, desc="Loading LUT...")
+            lut = load_lut(lut_file if isinstance(lut_file, str) else lut_file.name)
+            method = LUT_METHODS.get(method_label, "tetrahedral")
+            
+            if ext in self.IMAGE_EXTS:
+                result, info = self.grade_image(file_path, lut, method, float(strength))
+                return result, None, info, gr.update(visible=True), hidden
+            if ext in self.VIDEO_EXTS:
+                result, info = self.grade_video(file_path, lut, method, float(strength), progress)
+                progress(1.0, desc="Done!")
+                return None, result, info, hidden, gr.update(visible=True)
+            return None, None, f"✗ Unsupported file format: {ext}", hidden, hidden
+        
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return None, None, f"✗ Error grading file: {str(e)}", hidden, hidden
+    
+    def create_tab(self):
+        """Create and return the Color Grading tab interface"""
+        with gr.Tab("🎨 Color Grading"):
+            gr.Markdown("""
+            Apply a 3D LUT (.cube, as exported by Resolve, Premiere and most LUT packs) to an
+            image or video. 8-bit footage goes through a table baked once per LUT, so each
+            frame costs a single lookup. To grade while upscaling, pick the LUT in the
+            upscaler tab instead: it is applied to every upscaled frame in the same pass.
+            """)
+            
+            with gr.Row():
+                with gr.Column():
+                    grade_input = gr.File(
+                        label="Upload Image or Video",
+                        file_types=["image", "video"]
+                    )
+                    lut_input = gr.File(
+                        label="LUT (.cube)",
+                        file_types=[".cube"]
+                    )
+                    grade_method = gr.Radio(
+                        choices=list(LUT_METHODS.keys()),
+                        value=next(iter(LUT_METHODS)),
+                        label="Interpolation"
+                    )
+                    grade_strength = gr.Slider(
+                        label="Strength",
+                        minimum=0,
+                        maximum=1,
+                        value=1,
+                        step=0.05,
+                        info="Blend between the original (0) and the fully graded result (1)"
+                    )
+                    grade_btn = gr.Button("🎨 Apply LUT", variant="primary", size="lg")
+                
+                with gr.Column():
+                    image_output = gr.Image(
+                        label="Graded Image",
+                        type="filepath",
+                        visible=False
+                    )
+                    video_output = gr.Video(
+                        label="Graded Video",
+                        visible=False
+                    )
+                    grade_info = gr.Textbox(label="Processing Info", lines=6)
+            
+            grade_btn.click(
+                fn=self.grade_file,
+                inputs=[grade_input, lut_input, grade_method, grade_strength],
+                outputs=[image_output, video_output, grade_info, image_output, video_output]
+            )
@@ -0,0 +1,101 @@
+"""
+Convert Tab
+Changes container and codecs, copying every stream the target container accepts
+"""
+import gradio as gr
+import time
+from pathlib import Path
+from utils.stream_mux import CONTAINERS, probe_streams, plan_streams, convert, describe_streams
+
+# UI label -> forced video encoder (None copies the video whenever the container accepts it)
+VIDEO_MODES = {
+    "Copy when possible": None,
+    "H.264": "libx264",
+    "HEVC": "libx265",
+    "VP9": "libvpx-vp9",
+    "AV1": "libsvtav1"
+}
+
+
+class ConvertTab:
+    """Handles container and codec conversion"""
+    
+    def __init__(self, temp_manager):
+        self.temp_manager = temp_manager
+    
+    def preview_plan(self, input_video, container, video_mode):
+        """Show what would be copied, transcoded or dropped"""
+        if input_video is None:
+            return ""
+        try:
+            plan = plan_streams(probe_streams(input_video), container, video_encoder=VIDEO_MODES.get(video_mode))
+        except Exception as e:
+            return f"✗ Could not read video: {str(e)}"
+        return describe_streams(plan)
+    
+    def convert_video(self, input_video, container, video_mode, progress=gr.Progress()):
+        """Convert an uploaded video in one ffmpeg run"""
+        if input_video is None:
+            return None, "Please upload a video"
+        
+        try:
+            output_path = self.temp_manager.get_temp_file_path(f"converted_video.{container}")
+            if output_path.exists():
+                output_path.unlink()
+            
+            progress(0.1, desc="Converting...")
+            start = time.time()
+            plan = convert(input_video, output_path, video_encoder=VIDEO_MODES.get(video_mode))
+            progress(1.0, desc="Done!")
+            
+            info = f"✓ Converted {Path(input_video).suffix.lstrip('.')} → {container}\n"
+            info += f"{describe_streams(plan)}\n"
+            info += f"\n⏱️ Total time: {time.time() - start:.2f}s"
+            return str(output_path), info
+        
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return None, f"✗ Error converting video: {str(e)}"
+    
+    def create_tab(self):
+        """Create and return the Format Conversion tab interface"""
+        with gr.Tab("🔄 Format Conversion"):
+            gr.Markdown("""
+            Change the container of a video. Every stream the target container can hold is
+            copied bit for bit; only the others are transcoded, so most conversions take
+            seconds. All audio and subtitle tracks are kept with their languages.
+            """)
+            
+            with gr.Row():
+                with gr.Column():
+                    convert_input = gr.Video(label="Input Video")
+                    with gr.Row():
+                        convert_container = gr.Dropdown(
+                            choices=list(CONTAINERS.keys()),
+                            value="mp4",
+                            label="Container"
+                        )
+                        convert_video_mode = gr.Dropdown(
+                            choices=list(VIDEO_MODES.keys()),
+                            value="Copy when possible",
+                            label="Video Codec"
+                        )
+                    convert_plan = gr.Textbox(label="Stream Plan", lines=5, interactive=False)
+                    convert_btn = gr.Button("🔄 Convert", variant="primary", size="lg")
+                
+                with gr.Column():
+                    convert_output = gr.File(label="Converted Video")
+                    convert_info = gr.Textbox(label="Processing Info", lines=6)
+            
+            for component in (convert_input, convert_container, convert_video_mode):
+                component.change(
+                    fn=self.preview_plan,
+                    inputs=[convert_input, convert_container, convert_video_mode],
+                    outputs=[convert_plan]
+                )
+            convert_btn.click(
+                fn=self.convert_video,
+                inputs=[convert_input, convert_container, convert_video_mode],
+                outputs=[convert_output, convert_info]
+            )
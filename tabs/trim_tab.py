@@ -0,0 +1,104 @@
+"""
+Trim Tab
+Cuts video excerpts with keyframe-aware stream copy
+"""
+import gradio as gr
+from pathlib import Path
+from config.config import TRIM_CRF, TRIM_PRESET
+from utils.smart_trim import probe_video, smart_trim, describe_trim
+
+# UI label -> smart_trim mode
+TRIM_MODES = {
+    "Smart (copy, re-encode cut points only)": "smart",
+    "Fast (copy only, start snaps to keyframe)": "fast",
+    "Accurate (re-encode everything)": "accurate"
+}
+
+
+class TrimTab:
+    """Handles video trimming and cutting"""
+    
+    def __init__(self, temp_manager):
+        self.temp_manager = temp_manager
+    
+    def inspect_video(self, input_video):
+        """Summarise duration and keyframe spacing of an uploaded video"""
+        if input_video is None:
+            return "", gr.update(), gr.update()
+        try:
+            info = probe_video(input_video)
+        except Exception as e:
+            return f"✗ Could not read video: {str(e)}", gr.update(), gr.update()
+        
+        keyframes = info["keyframes"]
+        gop = info["duration"] / len(keyframes) if keyframes else 0
+        summary = f"Duration: {info['duration']:.3f}s | {info['codec']} {info['width']}x{info['height']}\n"
+        summary += f"Keyframes: {len(keyframes)} (every {gop:.2f}s on average)"
+        return summary, gr.update(value=0, maximum=info["duration"]), gr.update(value=info["duration"],
+                                                                               maximum=info["duration"])
+    
+    def trim_video(self, input_video, start, end, mode_label, progress=gr.Progress()):
+        """Cut [start, end) out of a video"""
+        if input_video is None:
+            return None, "Please upload a video"
+        
+        try:
+            mode = TRIM_MODES.get(mode_label, "smart")
+            # Copied streams stay in the source container, smart_trim moves re-encodes to MP4 itself
+            output_path = self.temp_manager.get_temp_file_path(f"trimmed_video{Path(input_video).suffix.lower()}")
+            
+            progress(0.1, desc="Cutting...")
+            report = smart_trim(input_video, output_path, float(start or 0), float(end or 0) or None, mode=mode,
+                                work_dir=self.temp_manager.create_temp_subdir("trim_parts"),
+                                crf=TRIM_CRF, preset=TRIM_PRESET)
+            progress(1.0, desc="Done!")
+            
+            info = "✓ Video trimmed successfully\n"
+            if report["mode"] != mode:
+                info += f"ℹ️ Codec can't be cut losslessly, used {report['mode']} mode\n"
+            info += describe_trim(report)
+            return str(report["output"]), info
+        
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return None, f"✗ Error trimming video: {str(e)}"
+    
+    def create_tab(self):
+        """Create and return the Trim tab interface"""
+        with gr.Tab("✂️ Trim & Cut"):
+            gr.Markdown("""
+            Cut an excerpt without re-encoding the whole video. Between keyframes the
+            original stream is copied bit for bit; only the partial groups of pictures at
+            the cut points are re-encoded. To upscale just an excerpt, use the start/end
+            fields in the upscaler tab instead.
+            """)
+            
+            with gr.Row():
+                with gr.Column():
+                    trim_input = gr.Video(label="Input Video")
+                    video_summary = gr.Textbox(label="Video Info", lines=2, interactive=False)
+                    with gr.Row():
+                        trim_start = gr.Number(label="Start (s)", value=0, minimum=0)
+                        trim_end = gr.Number(label="End (s, 0 = until the end)", value=0, minimum=0)
+                    trim_mode = gr.Radio(
+                        choices=list(TRIM_MODES.keys()),
+                        value=next(iter(TRIM_MODES)),
+                        label="Cut Mode"
+                    )
+                    trim_btn = gr.Button("✂️ Trim", variant="primary", size="lg")
+                
+                with gr.Column():
+                    trim_output = gr.Video(label="Trimmed Video")
+                    trim_info = gr.Textbox(label="Processing Info", lines=6)
+            
+            trim_input.change(
+                fn=self.inspect_video,
+                inputs=[trim_input],
+                outputs=[video_summary, trim_start, trim_end]
+            )
+            trim_btn.click(
+                fn=self.trim_video,
+                inputs=[trim_input, trim_start, trim_end, trim_mode],
+                outputs=[trim_output, trim_info]
+            )
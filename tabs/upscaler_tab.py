@@ -8,57 +8,92 @@ from PIL import Image
 import torch
 from pathlib import Path
 import gradio as gr
-from basicsr.archs.rrdbnet_arch import RRDBNet
-from realesrgan import RealESRGANer
-from config.config import MODELS
-import ffmpeg
+from config.config import (MODELS, RENDITIONS, LONG_JOB_WARNING_SECONDS, PROGRESS_UPDATE_INTERVAL,
+                           DEVICE_MEMORY_FRACTION, BATCH_MEMORY_BUDGET_MB, SMALL_IMAGE_MAX_SIDE, MOSAIC_MARGIN,
+                           ALPHA_UPSCALE_MODE, LARGE_IMAGE_PIXELS, LARGE_IMAGE_TILE_SIZE, LARGE_IMAGE_TILE_OVERLAP,
+                           TARGET_RESOLUTIONS, AUTO_ANIMATION_THRESHOLD, AUTO_NOISE_THRESHOLD, AUTO_SAMPLES_PER_SCENE,
+                           FACE_ENHANCE_MODEL_URL, FACE_ENHANCE_WEIGHT, FACE_DETECT_INTERVAL, FACE_TRACK_MAX_ERROR,
+                           FACE_BATCH_FRAMES, CPU_BALANCE_ENABLED, CPU_BALANCE_PRESETS_ENABLED,
+                           CPU_BALANCE_PRESET_FLOOR, CPU_BALANCE_INTERVAL)
+from utils.temporal import TemporalUpscaler
+from utils.preview import sample_frames, center_crop, build_comparison_grid
+from utils.performance_model import PerformanceModel, format_duration
+from utils.video_encoder import MultiEncoder, rendition_filename
+from utils.batch_inference import enhance_batch, enhance_small_images
+from utils.resolution_planner import plan_route, model_family, describe_plan, prepare_input, finish_output
+from utils.tiled_upscale import TiledUpscaler, open_lazy, create_output_memmap, write_tiled_tiff, tifffile
+from utils.image_pipeline import (enhance_image, from_pil, from_rgb, to_rgb, is_plain_bgr, prepare_for_format,
+                                  describe_layout)
+from utils.bucket_scheduler import BucketScheduler, estimate_bytes_per_pixel
+from utils.model_factory import create_upsampler, model_architecture
+from utils.face_enhance import FaceEnhancer
+from utils.color_lut import load_lut
+from utils.stream_mux import plan_streams, mux_tracks, carried, summarize_tracks
+from utils.media_index import MediaIndex
+from utils.cpu_balancer import CpuBalancer, PRESET_ENCODERS
+from utils.content_classifier import analyze_scenes, plan_scenes, summarize_scenes, frame_features, classify, choose_model
+from utils.progress import ProgressThrottle
+from utils.frame_store import job_key
+from concurrent.futures import ThreadPoolExecutor
 import os
 import time
 import shutil
+import zipfile
+import threading
+import asyncio
 
 
 class UpscalerTab:
     """Handles image and video upscaling functionality"""
     
+    # Supported file extensions
+    IMAGE_EXTS = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.tif']
+    VIDEO_EXTS = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v']
+    
     def __init__(self, temp_manager, device_manager):
         self.temp_manager = temp_manager
         self.device_manager = device_manager
         self.current_model = None
         self.current_model_name = None
         self.upsampler = None
+        self.preview_upsamplers = {}
+        # Upsamplers already built this session, so per-scene model switches don't reload weights
+        self.loaded_upsamplers = {}
+        self.face_enhancers = {}
+        self.performance_model = PerformanceModel()
+        # File type, size, frame count and streams, cached across jobs by path, size and mtime
+        self.media_index = MediaIndex()
+        self.media_index.prune()
+        # Upscaling uses shared model state and fixed temp paths, one job at a time
+        self.processing_lock = threading.Lock()
+        # Optional pool of inference worker processes (set by the app)
+        self.worker_pool = None
+    
+    def create_upsampler(self, model_name, torch_device, tile=0):
+        """Build a RealESRGAN upsampler for a model on a torch device"""
+        return create_upsampler(model_name, torch_device, tile)
     
     def load_model(self, model_name, device):
         """Load RealESRGAN model"""
-        if self.current_model_name == model_name and self.upsampler is not None:
+        # Keyed by torch device, so a job placed on another GPU of the same kind gets its own instance
+        key = (model_name, str(self.device_manager.get_torch_device(device)))
+        if self.upsampler is not None and self.loaded_upsamplers.get(key) is self.upsampler:
             return f"✓ Model {model_name} already loaded"
         
         try:
-            model_config = MODELS[model_name]
-            scale = model_config['scale']
-            
             # Select device
             self.device_manager.set_device(device)
-            torch_device = self.device_manager.get_torch_device()
             
-            # Define model architecture
-            if 'anime' in model_name:
-                model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, 
-                               num_block=6, num_grow_ch=32, scale=scale)
-            else:
-                model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, 
-                               num_block=23, num_grow_ch=32, scale=scale)
+            if key in self.loaded_upsamplers:
+                self.upsampler = self.loaded_upsamplers[key]
+                self.current_model_name = model_name
+                return f"✓ Model {model_name} switched in on {device}"
+            
+            torch_device = self.device_manager.get_torch_device()
             
             # Initialize upsampler
-            self.upsampler = RealESRGANer(
-                scale=scale,
-                model_path=model_config['url'],
-                model=model,
-                tile=0,
-                tile_pad=10,
-                pre_pad=0,
-                half=True if str(torch_device) != 'cpu' else False,
-                device=str(torch_device)
-            )
+            self.upsampler = self.create_upsampler(model_name, torch_device)
+            self.loaded_upsamplers[key] = self.upsampler
             
             self.current_model_name = model_name
             
@@ -70,8 +105,60 @@ class UpscalerTab:
             self.current_model_name = None
             return f"✗ Error loading model: {str(e)}"
     
-    def upscale_image(self, input_image, model_name, device, input_format="png"):
-        """Upscale a single image"""
+    def get_preview_upsampler(self, model_name, device):
+        """
+        Get a cached upsampler dedicated to previews.
+        
+        Previews run while a job may hold the processing lock, so they never
+        select a device or share the job's upsampler: their own instance is
+        built on the requested device directly.
+        """
+        key = (model_name, device)
+        if key not in self.preview_upsamplers:
+            self.preview_upsamplers[key] = self.create_upsampler(
+                model_name, self.device_manager.get_torch_device(device))
+        return self.preview_upsamplers[key]
+    
+    def get_face_enhancer(self, scale, device):
+        """Get a cached GFPGAN face enhancer for an upscale factor, reset for a new job"""
+        key = (scale, device)
+        if key not in self.face_enhancers:
+            self.device_manager.set_device(device)
+            self.face_enhancers[key] = FaceEnhancer(
+                FACE_ENHANCE_MODEL_URL, scale, self.device_manager.get_torch_device(),
+                detect_interval=FACE_DETECT_INTERVAL, max_track_error=FACE_TRACK_MAX_ERROR,
+                weight=FACE_ENHANCE_WEIGHT)
+        face_enhancer = self.face_enhancers[key]
+        face_enhancer.reset()
+        return face_enhancer
+    
+    def media_info(self, file_path):
+        """Cached metadata of a file (empty if it can't be read)"""
+        try:
+            return self.media_index.get(file_path)
+        except OSError:
+            return {}
+    
+    def media_type(self, file_path, media=None):
+        """'image', 'video' or None, by content, falling back to the extension for unrecognised files"""
+        kind = (media if media is not None else self.media_info(file_path)).get("type")
+        if kind is None:
+            ext = Path(file_path).suffix.lower()
+            kind = "image" if ext in self.IMAGE_EXTS else "video" if ext in self.VIDEO_EXTS else None
+        return kind
+    
+    def upscale_image(self, input_image, model_name, device, input_format="png", bgr=False, target=None,
+                      face_enhance=False, lut=None):
+        """
+        Upscale a single image.
+        
+        Grayscale, alpha and 16-bit inputs keep their layout and bit depth
+        where the output format allows it. Arrays are taken as RGB(A) unless
+        bgr is set (OpenCV layout, e.g. from cv2.imread). target (a
+        TARGET_RESOLUTIONS spec) plans the cheapest route to that size.
+        face_enhance restores faces with GFPGAN (colour 8-bit images only).
+        lut (path to a .cube file) colour grades the upscaled image.
+        """
         if input_image is None:
             return None, "Please upload an image"
         
@@ -83,31 +170,53 @@ class UpscalerTab:
             if self.upsampler is None:
                 return None, f"✗ Failed to load model\n{load_msg}"
             
-            # Convert to numpy array if needed
+            # Work in OpenCV layout (BGR/BGRA/gray) at the input's bit depth
             if isinstance(input_image, Image.Image):
-                img = np.array(input_image)
+                img = from_pil(input_image)
             else:
-                img = input_image
-            
-            # Convert RGB to BGR for OpenCV
-            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+                img = np.asarray(input_image) if bgr else from_rgb(np.asarray(input_image))
             
-            # Upscale
-            output, _ = self.upsampler.enhance(img, outscale=MODELS[model_name]['scale'])
+            # Target-resolution mode: cheapest model/pre-scale/crop route to the requested size
+            plan = self.plan_target(img.shape[1], img.shape[0], target, model_name, device) if target else None
+            model_input = img
+            if plan is not None:
+                model_name = plan["model"]
+                load_msg = self.load_model(model_name, device)
+                if self.upsampler is None:
+                    return None, f"✗ Failed to load model\n{load_msg}"
+                model_input = prepare_input(img, plan)
             
-            # Convert back to RGB
-            output = cv2.cvtColor(output, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL Image
-            output_image = Image.fromarray(output)
+            if self.is_small_image(model_input):
+                # Fast path: mosaic tensor on the device, no colour conversions
+                output = self.upscale_arrays([model_input], model_name, device)[0]
+            else:
+                # One inference pass; alpha is resized or folded into the same batch
+                output = enhance_image(self.upsampler, model_input, outscale=MODELS[model_name]['scale'],
+                                       alpha_mode=ALPHA_UPSCALE_MODE)
+            face_enhancer = None
+            if face_enhance and is_plain_bgr(model_input):
+                face_enhancer = self.get_face_enhancer(MODELS[model_name]['scale'], device)
+                output = face_enhancer.enhance(model_input, output)
+            if plan is not None:
+                output = finish_output(output, plan)
+            grade = load_lut(lut) if lut else None
+            if grade is not None:
+                output = grade.apply(output)
             
             # Save to temp file with same format as input
             output_path = self.temp_manager.get_temp_file_path(f"upscaled_image.{input_format}")
-            output_image.save(output_path, format=input_format.upper())
+            if not cv2.imwrite(str(output_path), prepare_for_format(output, f".{input_format}")):
+                raise IOError(f"Could not write {output_path.name}")
             
             info = f"✓ Image upscaled successfully\n{load_msg}\n"
-            info += f"Original size: {img.shape[1]}x{img.shape[0]}\n"
+            info += f"Original size: {img.shape[1]}x{img.shape[0]} ({describe_layout(img)})\n"
             info += f"Upscaled size: {output.shape[1]}x{output.shape[0]}"
+            if plan is not None:
+                info += f"\nRoute: {describe_plan(plan)}"
+            if face_enhancer is not None:
+                info += f"\n{face_enhancer.get_summary()}"
+            if grade is not None:
+                info += f"\nColor grade: {grade.title}"
             
             # Return the file path instead of PIL Image to preserve format
             return output_path, info
@@ -115,54 +224,118 @@ class UpscalerTab:
         except Exception as e:
             return None, f"✗ Error upscaling image: {str(e)}"
     
-    def upscale_video(self, input_video, model_name, device, fps=None, progress=gr.Progress()):
-        """Upscale a video file"""
+    @staticmethod
+    def is_small_image(img):
+        """Whether an image goes through the small-image mosaic path"""
+        return is_plain_bgr(img) and max(img.shape[:2]) <= SMALL_IMAGE_MAX_SIDE
+    
+    def upscale_arrays(self, images, model_name, device, bgr=True):
+        """
+        Upscale in-memory images, returning arrays without touching disk.
+        
+        Small images are packed into mosaics and run in as few forward passes
+        as the memory budget allows; larger ones go through enhance one by
+        one. bgr=False takes and returns RGB.
+        """
+        load_msg = self.load_model(model_name, device)
+        if self.upsampler is None:
+            raise RuntimeError(load_msg)
+        
+        small = [i for i, img in enumerate(images) if self.is_small_image(img)]
+        results = [None] * len(images)
+        if small:
+            max_pixels = self.get_batch_memory_budget() // estimate_bytes_per_pixel(
+                self.upsampler.scale, self.upsampler.half, model_architecture(model_name))
+            outputs = enhance_small_images(self.upsampler, [images[i] for i in small], max_pixels,
+                                           margin=MOSAIC_MARGIN, bgr=bgr)
+            for i, output in zip(small, outputs):
+                results[i] = output
+        
+        for i, img in enumerate(images):
+            if results[i] is None:
+                output = enhance_image(self.upsampler, img if bgr else from_rgb(img),
+                                       outscale=MODELS[model_name]['scale'], alpha_mode=ALPHA_UPSCALE_MODE)
+                results[i] = output if bgr else to_rgb(output)
+        return results
+    
+    def plan_target(self, width, height, target, model_name, device):
+        """Plan the cheapest route to a target size, using measured speeds when known"""
+        if isinstance(target, str):
+            target = TARGET_RESOLUTIONS.get(target)
+        if not target:
+            return None
+        hardware_id = self.device_manager.get_hardware_id(device)
+        
+        def cost_of(name, in_width, in_height):
+            return self.performance_model.seconds_per_frame(name, hardware_id, in_width, in_height)
+        
+        # Measured and nominal costs don't mix, use measurements only if every candidate has them
+        family = model_family(model_name)
+        measured = all(cost_of(name, width, height) is not None for name in family)
+        return plan_route(width, height, target, model_name, cost_of=cost_of if measured else None)
+    
+    def upscale_video(self, input_video, model_name, device, fps=None, progress=gr.Progress(), temporal=False,
+                      use_frame_store=False, renditions=None, on_event=None, work_dir=None, target=None,
+                      auto_model=False, face_enhance=False, start_time=None, end_time=None, lut=None):
+        """
+        Upscale a video file.
+        
+        on_event, if given, receives structured progress dicts (stage, progress,
+        frame, fps, eta, ...) at the same throttled rate as the UI progress bar.
+        work_dir overrides where renditions are encoded before audio muxing.
+        target (a TARGET_RESOLUTIONS spec) plans the cheapest route to that size.
+        auto_model classifies every scene first and runs each one with the
+        cheapest model of the same scale that suits its content.
+        face_enhance restores faces with GFPGAN, detecting them on keyframes only.
+        start_time / end_time (seconds) limit the job to that range: decoding
+        seeks straight to it and only its frames and audio are processed.
+        lut (path to a .cube file) colour grades every upscaled frame before
+        it is encoded, so grading costs no extra decode/encode pass.
+        """
         if input_video is None:
             return None, "Please upload a video"
         
+        # In/out range, as ffmpeg input options for the audio and subtitle tracks
+        start_time = max(float(start_time or 0), 0.0)
+        end_time = float(end_time) if end_time else None
+        if end_time is not None and end_time <= start_time:
+            return None, "✗ The end of the range must come after its start"
+        range_args = {}
+        if start_time:
+            range_args["ss"] = start_time
+        if end_time is not None:
+            range_args["t"] = end_time - start_time
+        
+        # Progress goes to Gradio and, if requested, to a structured event callback
+        def report(fraction, desc, stage, **data):
+            progress(fraction, desc=desc)
+            if on_event is not None:
+                on_event({"stage": stage, "progress": round(fraction, 4), "message": desc, **data})
+        
+        # Optionally keep upscaled frames in a memory-mapped store, so a failed job run again resumes
+        # where it stopped (a finished job deletes it, its backing file is as large as the raw video)
+        frame_store = None
+        
         try:
-            progress(0, desc="Loading model...")
+            report(0, "Loading model...", "loading")
             load_msg = self.load_model(model_name, device)
             
             # Check if model loaded successfully
             if self.upsampler is None:
                 return None, f"✗ Failed to load model\n{load_msg}"
             
-            # Check if video has audio
-            progress(0.05, desc="Checking audio...")
-            audio_path = None
-            has_audio = False
-            
-            try:
-                probe = ffmpeg.probe(input_video)
-                audio_streams = [stream for stream in probe['streams'] if stream['codec_type'] == 'audio']
-                has_audio = len(audio_streams) > 0
-                
-                if has_audio:
-                    # Extract audio
-                    print("✓ Audio detected, extracting...")
-                    audio_path = self.temp_manager.get_temp_file_path("original_audio.aac")
-                    
-                    # Remove old audio file if exists
-                    if audio_path.exists():
-                        audio_path.unlink()
-                    
-                    (
-                        ffmpeg
-                        .input(input_video)
-                        .output(str(audio_path), acodec='copy', vn=None)
-                        .overwrite_output()
-                        .run(quiet=True, capture_stdout=True, capture_stderr=True)
-                    )
-                    print(f"✓ Audio extracted to {audio_path}")
-                else:
-                    print("ℹ️ No audio stream detected in video")
-            except Exception as e:
-                print(f"Warning: Could not extract audio: {e}")
-                has_audio = False
+            # Audio and subtitle tracks are muxed straight from the source at the end
+            report(0.05, "Checking audio...", "audio")
+            media = self.media_info(input_video)
+            if "error" in media:
+                print(f"Warning: Could not read the source streams: {media['error']}")
+            source_streams = media.get("streams", [])
+            has_audio = any(stream['codec_type'] == 'audio' for stream in source_streams)
+            if not has_audio:
+                print("ℹ️ No audio stream detected in video")
             
             # Open video
-            progress(0.1, desc="Opening video...")
+            report(0.1, "Opening video...", "opening")
             cap = cv2.VideoCapture(input_video)
             
             if not cap.isOpened():
@@ -170,7 +343,8 @@ class UpscalerTab:
             
             # Get video properties
             original_fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            # The container's frame count where it has one, OpenCV's may be an estimate
+            total_frames = media.get("frames") or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             
@@ -178,118 +352,321 @@ class UpscalerTab:
             if fps is None or fps == 0:
                 fps = original_fps
             
+            range_limited = bool(range_args)
+            if range_limited:
+                start_frame = min(int(round(start_time * original_fps)), total_frames)
+                end_frame = min(int(round(end_time * original_fps)), total_frames) if end_time else total_frames
+                if end_frame <= start_frame:
+                    cap.release()
+                    return None, f"✗ The range lies outside the video ({total_frames / original_fps:.2f}s long)"
+                if start_frame:
+                    # Jump straight to the range, the demuxer seeks to the keyframe before it
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+                total_frames = end_frame - start_frame
+            
+            # Target-resolution mode: cheapest model/pre-scale/crop route to the requested size
+            plan = self.plan_target(width, height, target, model_name, device) if target else None
+            if plan is not None and plan["model"] != model_name:
+                model_name = plan["model"]
+                load_msg = self.load_model(model_name, device)
+                if self.upsampler is None:
+                    return None, f"✗ Failed to load model\n{load_msg}"
+            
             # Calculate output dimensions
             scale = MODELS[model_name]['scale']
-            output_width = width * scale
-            output_height = height * scale
+            if plan is not None:
+                output_width, output_height = plan["output_size"]
+                model_width, model_height = plan["input_size"]
+            else:
+                output_width = width * scale
+                output_height = height * scale
+                model_width, model_height = width, height
+            
+            # Auto model mode: classify scenes up front, switch models at scene boundaries
+            scenes = None
+            if auto_model:
+                report(0.1, "Analyzing scenes...", "analyzing")
+                analysis_throttle = ProgressThrottle(PROGRESS_UPDATE_INTERVAL)
+                
+                def on_frame(index):
+                    if analysis_throttle.ready():
+                        report(0.1 + 0.05 * index / max(total_frames, index), f"Analyzing frame {index}/{total_frames}",
+                               "analyzing", frame=index, total_frames=total_frames)
+                
+                scenes = plan_scenes(analyze_scenes(input_video, samples_per_scene=AUTO_SAMPLES_PER_SCENE,
+                                                    start_frame=start_frame if range_limited else 0,
+                                                    max_frames=total_frames if range_limited else None,
+                                                    on_frame=on_frame),
+                                     scale, preferred=model_name, animation_threshold=AUTO_ANIMATION_THRESHOLD,
+                                     noise_threshold=AUTO_NOISE_THRESHOLD)
+                if on_event is not None:
+                    on_event({"stage": "scenes", "progress": 0.15, "scenes": scenes})
+            scene_index = 0
+            models_used = set()
             
-            progress(0.15, desc=f"Processing {total_frames} frames...")
+            report(0.15, f"Processing {total_frames} frames...", "processing", frame=0, total_frames=total_frames)
             
-            # Create frames directory
-            frames_dir = self.temp_manager.get_frames_dir()
-            output_frames_dir = self.temp_manager.create_temp_subdir("output_frames")
+            # Renditions are encoded live while frames are upscaled
+            if not renditions:
+                renditions = [name for name, spec in RENDITIONS.items() if spec.get('default')]
+            if isinstance(renditions, dict):
+                rendition_specs = dict(renditions)
+            else:
+                rendition_specs = {name: RENDITIONS[name] for name in renditions}
+            primary_rendition = next((name for name, spec in rendition_specs.items()
+                                      if spec.get('container', 'mp4') == 'mp4'),
+                                     next(name for name, spec in rendition_specs.items()
+                                          if spec.get('format') != 'hls'))
+            if work_dir is not None:
+                encoded_dir = Path(work_dir)
+                encoded_dir.mkdir(exist_ok=True, parents=True)
+            else:
+                encoded_dir = self.temp_manager.create_temp_subdir("encoded")
+            renditions_dir = self.temp_manager.get_temp_file_path("renditions")
+            if renditions_dir.exists():
+                shutil.rmtree(renditions_dir)
+            renditions_dir.mkdir(parents=True)
+            encoder = None
+            
+            # Temporal mode reuses upscaled detail between keyframes
+            temporal_upscaler = TemporalUpscaler(self.upsampler, scale) if temporal else None
+            
+            # Faces are detected on keyframes and tracked in between
+            face_enhancer = self.get_face_enhancer(scale, device) if face_enhance else None
+            
+            # Colour grading runs on each upscaled frame, 8-bit frames through a baked 256³ table
+            grade = load_lut(lut) if lut else None
+            
+            # Frames an earlier run of this same job left in the store are encoded straight from it
+            resume_frames = 0
+            if use_frame_store:
+                frame_store = self.temp_manager.open_frame_store(
+                    "output_frames", (output_height, output_width, 3), max(total_frames, 1),
+                    key=job_key(input_video, model=model_name, target=target, auto_model=auto_model,
+                                temporal=temporal, face_enhance=face_enhance, start=start_time, end=end_time,
+                                lut=lut))
+                resume_frames = min(len(frame_store), total_frames)
+            
+            # Live ETA seeded from past jobs on this hardware
+            hardware_id = self.device_manager.get_hardware_id(device)
+            estimator = self.performance_model.live_estimator(model_name, hardware_id, model_width, model_height,
+                                                              total_frames - resume_frames)
             
             # Extract and upscale frames with timing
+            throttle = ProgressThrottle(PROGRESS_UPDATE_INTERVAL)
             frame_count = 0
             total_processing_time = 0
-            start_time = time.time()
+            wall_start = time.time()
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_start = time.time()
-                
-                # Upscale frame
-                output_frame, _ = self.upsampler.enhance(frame, outscale=scale)
-                
-                frame_end = time.time()
-                frame_time = frame_end - frame_start
-                total_processing_time += frame_time
+            # Inference and the encoders share the CPU: split the cores and keep adjusting the split
+            balancer = None
+            
+            # Upscaled frames waiting to have their faces restored together: (model input, output, seconds)
+            pending = []
+            frames_read = 0
+            resumed = 0
+            
+            def emit(output_frame, frame_time=None):
+                """Encode a finished frame (frame_time None: it came from the frame store)"""
+                nonlocal encoder, balancer, frame_count, total_processing_time
+                # Hand the frame to every rendition encoder (inference runs once)
+                if encoder is None:
+                    # Only renditions whose preset may change are written in parts
+                    segmented_codecs = PRESET_ENCODERS if CPU_BALANCE_ENABLED and CPU_BALANCE_PRESETS_ENABLED else ()
+                    encoder = MultiEncoder(rendition_specs, output_frame.shape[1], output_frame.shape[0],
+                                           fps, encoded_dir, segmented_codecs=segmented_codecs)
+                    if CPU_BALANCE_ENABLED:
+                        # On CPU inference needs most cores, on accelerators the encoders do
+                        on_cpu = self.device_manager.get_torch_device().type == "cpu"
+                        balancer = CpuBalancer(encoder.encoders, encoder_share=0.25 if on_cpu else 0.75,
+                                               floor_preset=CPU_BALANCE_PRESET_FLOOR,
+                                               interval=CPU_BALANCE_INTERVAL)
+                        balancer.apply()
+                write_start = time.time()
+                encoder.write(output_frame)
+                if balancer is not None:
+                    balancer.observe(time.time() - write_start)
                 
-                # Save frame
-                output_frame_path = output_frames_dir / f"frame_{frame_count:06d}.png"
-                cv2.imwrite(str(output_frame_path), output_frame)
+                if frame_time is not None:
+                    if frame_store is not None:
+                        frame_store.write(frame_count, output_frame)
+                    total_processing_time += frame_time
+                    estimator.update(frame_time)
                 
                 frame_count += 1
-                avg_time_per_frame = total_processing_time / frame_count
-                remaining_frames = total_frames - frame_count
-                eta_seconds = remaining_frames * avg_time_per_frame
+                avg_time_per_frame = total_processing_time / max(frame_count - resumed, 1)
                 
-                progress(0.15 + (0.7 * frame_count / total_frames), 
-                        desc=f"Frame {frame_count}/{total_frames} | {avg_time_per_frame:.2f}s/frame | ETA: {eta_seconds:.1f}s")
+                # Throttled: per-frame callbacks and prints are measurable overhead on fast GPUs
+                if throttle.ready(force=frame_count == total_frames):
+                    eta = estimator.eta()
+                    report(0.15 + (0.7 * frame_count / max(total_frames, frame_count)),
+                           f"Frame {frame_count}/{total_frames} | {avg_time_per_frame:.2f}s/frame | ETA: {format_duration(eta)}",
+                           "processing", frame=frame_count, total_frames=total_frames,
+                           fps=round(frame_count / (time.time() - wall_start), 3), eta=eta)
+                    
+                    # Print to terminal
+                    if frame_time is not None:
+                        print(f"Frame {frame_count}/{total_frames} processed in {frame_time:.2f}s (avg: {avg_time_per_frame:.2f}s/frame)")
+            
+            try:
+                # Resumed frames are skipped without decoding; inference picks up after them
+                while resumed < resume_frames and cap.grab():
+                    emit(frame_store.read(resumed))
+                    resumed += 1
+                frames_read = resumed
                 
-                # Print to terminal
-                print(f"Frame {frame_count}/{total_frames} processed in {frame_time:.2f}s (avg: {avg_time_per_frame:.2f}s/frame)")
+                while True:
+                    frame = None
+                    if not (range_limited and frames_read >= total_frames):
+                        ret, frame = cap.read()
+                        if not ret:
+                            frame = None
+                    
+                    if frame is not None:
+                        frame_start = time.time()
+                        if scenes:
+                            while scene_index + 1 < len(scenes) and frames_read >= scenes[scene_index + 1]["start"]:
+                                scene_index += 1
+                            scene_model = scenes[scene_index]["model"]
+                            if scene_model != self.current_model_name:
+                                switch_msg = self.load_model(scene_model, device)
+                                if self.upsampler is None:
+                                    raise RuntimeError(switch_msg)
+                                if temporal_upscaler is not None:
+                                    temporal_upscaler.upsampler = self.upsampler
+                        models_used.add(self.current_model_name)
+                        if plan is not None:
+                            frame = prepare_input(frame, plan)
+                        
+                        # Upscale frame
+                        if temporal_upscaler is not None:
+                            output_frame, _ = temporal_upscaler.enhance(frame)
+                        else:
+                            output_frame, _ = self.upsampler.enhance(frame, outscale=scale)
+                        pending.append((frame, output_frame, time.time() - frame_start))
+                        frames_read += 1
+                        if face_enhancer is not None and len(pending) < FACE_BATCH_FRAMES:
+                            continue
+                    
+                    # Face crops of every pending frame go through GFPGAN in one pass
+                    if face_enhancer is not None and pending:
+                        batch_start = time.time()
+                        outputs = face_enhancer.enhance_batch([item[0] for item in pending],
+                                                              [item[1] for item in pending])
+                        share = (time.time() - batch_start) / len(pending)
+                        pending = [(item[0], output, item[2] + share) for item, output in zip(pending, outputs)]
+                    
+                    ready, pending = pending, []
+                    for _, output_frame, frame_time in ready:
+                        post_start = time.time()
+                        if plan is not None:
+                            output_frame = finish_output(output_frame, plan)
+                        if grade is not None:
+                            output_frame = grade.apply(output_frame)
+                        emit(output_frame, frame_time + time.time() - post_start)
+                    
+                    if frame is None:
+                        break
+            except Exception:
+                if encoder is not None:
+                    encoder.abort()
+                raise
+            finally:
+                cap.release()
+                if frame_store is not None:
+                    frame_store.flush()
+                if balancer is not None:
+                    balancer.restore()
             
-            cap.release()
+            if encoder is None:
+                return None, "✗ No frames could be read from the video"
             
-            total_time = time.time() - start_time
+            # Temporal mode skips inference on most frames, mixed models and face restoration blur
+            # the timing, keep them out of the model history
+            if temporal_upscaler is None and face_enhancer is None and grade is None and len(models_used) == 1 \
+                    and estimator.frames > 0:
+                self.performance_model.record(self.current_model_name, hardware_id, model_width, model_height,
+                                              estimator.frames, estimator.seconds)
+            
+            total_time = time.time() - wall_start
             print(f"\n✓ All frames processed in {total_time:.2f}s")
-            print(f"  Average: {total_processing_time/frame_count:.2f}s/frame")
-            
-            progress(0.85, desc="Encoding video...")
-            
-            # Reconstruct video (always same filename to avoid duplicates)
-            temp_video_path = self.temp_manager.get_temp_file_path("upscaled_video_no_audio.mp4")
-            output_video_path = self.temp_manager.get_temp_file_path("upscaled_video.mp4")
-            
-            # Remove old files if exist
-            if temp_video_path.exists():
-                temp_video_path.unlink()
-            if output_video_path.exists():
-                output_video_path.unlink()
-            
-            # Encode video without audio first
-            (
-                ffmpeg
-                .input(str(output_frames_dir / "frame_%06d.png"), framerate=fps)
-                .output(str(temp_video_path), vcodec='libx264', pix_fmt='yuv420p', crf=18)
-                .overwrite_output()
-                .run(quiet=True, capture_stdout=True, capture_stderr=True)
-            )
+            print(f"  Average: {total_processing_time / max(frame_count - resumed, 1):.2f}s/frame")
+            
+            report(0.85, "Finishing encoders...", "encoding")
+            encoded_paths = encoder.close()
             
-            # Combine with audio if available
-            if has_audio and audio_path and audio_path.exists():
-                progress(0.95, desc="Adding audio...")
-                print("✓ Combining video with original audio...")
+            # Mux audio and subtitles into every rendition (primary keeps the classic fixed filename)
+            output_paths = {}
+            track_plans = {}
+            for name, encoded_path in encoded_paths.items():
+                spec = rendition_specs[name]
+                if spec.get('format') == 'hls':
+                    # Segmented streams stay where they were written
+                    output_paths[name] = encoded_path
+                    continue
+                if name == primary_rendition:
+                    final_path = self.temp_manager.get_temp_file_path(f"upscaled_video.{spec.get('container', 'mp4')}")
+                else:
+                    final_path = renditions_dir / rendition_filename(name, spec)
                 
-                video = ffmpeg.input(str(temp_video_path))
-                audio = ffmpeg.input(str(audio_path))
+                # Remove old file if exists
+                if final_path.exists():
+                    final_path.unlink()
                 
-                (
-                    ffmpeg
-                    .output(video, audio, str(output_video_path), vcodec='copy', acodec='aac', strict='experimental')
-                    .overwrite_output()
-                    .run(quiet=True, capture_stdout=True, capture_stderr=True)
-                )
-                
-                # Clean up temp video
-                temp_video_path.unlink()
-                audio_path.unlink()
-                print("✓ Audio successfully added to upscaled video")
-            else:
-                # No audio, just rename temp video
-                temp_video_path.rename(output_video_path)
+                # Copy every track the container accepts, transcode only the rest
+                track_plan = plan_streams(source_streams, spec.get('container', 'mp4'), types=("audio", "subtitle"))
+                if carried(track_plan):
+                    report(0.95, f"Adding audio ({name})...", "muxing")
+                    print(f"✓ Combining {name} with the original audio/subtitle tracks...")
+                    mux_tracks(encoded_path, input_video, track_plan, final_path, spec.get('container', 'mp4'),
+                               source_args=range_args)
+                    
+                    # Clean up temp video
+                    encoded_path.unlink()
+                else:
+                    # No tracks to add, just move the encoded video
+                    encoded_path.rename(final_path)
+                output_paths[name] = final_path
+                track_plans[name] = track_plan
             
-            # Clean up output frames after encoding
-            try:
-                shutil.rmtree(output_frames_dir)
-                print(f"✓ Cleaned up output frames directory")
-            except Exception as e:
-                print(f"Warning: Could not clean up output frames: {e}")
+            output_video_path = output_paths[primary_rendition]
             
-            progress(1.0, desc="Done!")
+            report(1.0, "Done!", "done")
             
-            avg_time_per_frame = total_processing_time / frame_count
+            avg_time_per_frame = total_processing_time / max(frame_count - resumed, 1)
+            
+            # Encoded and muxed, nothing left to resume
+            if frame_store is not None:
+                frame_store.delete()
             
             info = f"✓ Video upscaled successfully\n{load_msg}\n"
             info += f"Frames processed: {frame_count}\n"
             info += f"Original size: {width}x{height}\n"
             info += f"Upscaled size: {output_width}x{output_height}\n"
+            if range_limited:
+                info += f"Range: {start_time:.2f}s - {start_time + frame_count / original_fps:.2f}s\n"
+            if plan is not None:
+                info += f"Route: {describe_plan(plan)}\n"
+            if scenes:
+                info += f"Auto model: {len(scenes)} scene(s), models used: {', '.join(sorted(models_used))}\n"
+                info += f"{summarize_scenes(scenes, fps=original_fps)}\n"
             info += f"FPS: {fps}\n"
-            info += f"Audio: {'✓ Preserved' if has_audio else '✗ No audio track'}\n"
+            info += f"Renditions: {', '.join(output_paths)}\n"
+            if resumed:
+                info += f"Resumed: {resumed} frame(s) taken from the frame store\n"
+            tracks = track_plans.get(primary_rendition, [])
+            if carried(tracks):
+                info += f"Audio: ✓ {summarize_tracks(tracks)}\n"
+            else:
+                info += f"Audio: {'✓ Preserved' if has_audio else '✗ No audio track'}\n"
+            if temporal_upscaler is not None:
+                info += f"{temporal_upscaler.get_summary()}\n"
+            if face_enhancer is not None:
+                info += f"{face_enhancer.get_summary()}\n"
+            if grade is not None:
+                info += f"Color grade: {grade.title}\n"
+            if balancer is not None:
+                info += f"{balancer.get_summary()}\n"
             info += f"\n⏱️ Performance:\n"
             info += f"  Total time: {total_time:.2f}s\n"
             info += f"  Average: {avg_time_per_frame:.2f}s/frame\n"
@@ -300,9 +677,18 @@ class UpscalerTab:
         except Exception as e:
             import traceback
             traceback.print_exc()
-            return None, f"✗ Error upscaling video: {str(e)}"
+            resume_note = ""
+            if frame_store is not None:
+                # Kept so the same job run again resumes; the next different job replaces it
+                frame_store.close()
+                resume_note = "\nUpscaled frames were kept, run the same job again to resume"
+            if on_event is not None:
+                on_event({"stage": "error", "message": str(e)})
+            return None, f"✗ Error upscaling video: {str(e)}{resume_note}"
     
-    def upscale_file(self, input_file, model_name, device, fps=None, progress=gr.Progress()):
+    def upscale_file(self, input_file, model_name, device, fps=None, temporal=False, use_frame_store=False,
+                     renditions=None, target=None, auto_model=False, face_enhance=False, start_time=None,
+                     end_time=None, lut=None, progress=gr.Progress()):
         """Unified upscaling function that auto-detects file type"""
         if input_file is None:
             return None, None, "Please upload a file", gr.update(visible=False), gr.update(visible=False)
@@ -311,30 +697,548 @@ class UpscalerTab:
         file_path = input_file if isinstance(input_file, str) else input_file.name
         ext = Path(file_path).suffix.lower()
         
-        # Image extensions
-        image_exts = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff', '.tif']
-        # Video extensions
-        video_exts = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v']
-        
-        if ext in image_exts:
-            # Process as image
-            from PIL import Image
-            img = Image.open(file_path)
-            # Use the same format as input (strip the dot from extension)
-            input_format = ext[1:]  # Remove the leading dot
+        with self.processing_lock:
+            return self._upscale_file(file_path, ext, model_name, device, fps, temporal, use_frame_store,
+                                      renditions, target, auto_model, face_enhance, start_time, end_time,
+                                      lut, progress)
+    
+    def _upscale_file(self, file_path, ext, model_name, device, fps, temporal, use_frame_store, renditions,
+                      target, auto_model, face_enhance, start_time, end_time, lut, progress):
+        """Dispatch an upscaling job by file type"""
+        # Drop renditions from a previous job
+        renditions_dir = self.temp_manager.get_temp_file_path("renditions")
+        if renditions_dir.exists():
+            shutil.rmtree(renditions_dir)
+        
+        # Decide by content, so misnamed and extension-less files go the right way
+        media = self.media_info(file_path)
+        kind = self.media_type(file_path, media)
+        
+        if kind == "image" and self.is_large_image(file_path):
+            # Too large to hold the output in RAM: tile by tile into a file
+            result, info = self.upscale_large_image(file_path, model_name, device, progress)
+            return None, None, info, gr.update(visible=False), gr.update(visible=False)
+        
+        if kind == "image":
+            # Process as image, keeping alpha and 16-bit depth
+            img = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+            # Use the same format as input (strip the dot from extension, or the detected format)
+            input_format = ext[1:] if ext in self.IMAGE_EXTS else media.get("format", "png")
             # Handle jpeg -> jpg conversion
             if input_format == 'jpeg':
                 input_format = 'jpg'
-            result, info = self.upscale_image(img, model_name, device, input_format)
+            if img is None:
+                result, info = self.upscale_image(Image.open(file_path), model_name, device, input_format,
+                                                  target=target, face_enhance=face_enhance, lut=lut)
+            else:
+                result, info = self.upscale_image(img, model_name, device, input_format, bgr=True, target=target,
+                                                  face_enhance=face_enhance, lut=lut)
             return result, None, info, gr.update(visible=True), gr.update(visible=False)
         
-        elif ext in video_exts:
+        elif kind == "video":
             # Process as video
-            result, info = self.upscale_video(file_path, model_name, device, fps, progress)
+            result, info = self.upscale_video(file_path, model_name, device, fps, progress, temporal=temporal,
+                                              use_frame_store=use_frame_store, renditions=renditions,
+                                              target=target, auto_model=auto_model, face_enhance=face_enhance,
+                                              start_time=start_time, end_time=end_time, lut=lut)
             return None, result, info, gr.update(visible=False), gr.update(visible=True)
         
         else:
-            return None, None, f"✗ Unsupported file format: {ext}", gr.update(visible=False), gr.update(visible=False)
+            return (None, None, f"✗ Unsupported file format: {ext or Path(file_path).name}", gr.update(visible=False),
+                    gr.update(visible=False))
+    
+    @staticmethod
+    def is_large_image(file_path):
+        """Whether an image file is big enough for out-of-core tiled upscaling"""
+        try:
+            with Image.open(file_path) as img:
+                width, height = img.size
+        except Image.DecompressionBombError:
+            return True
+        except Exception:
+            return False
+        return width * height > LARGE_IMAGE_PIXELS
+    
+    def upscale_large_image(self, file_path, model_name, device, progress=gr.Progress()):
+        """
+        Upscale a very large image without holding the output in RAM.
+        
+        Input tiles are read lazily, upscaled with feathered overlaps and
+        blended into a memory-mapped file, then written out as a tiled TIFF
+        (or kept as .npy without tifffile). The result is listed with the
+        job's extra output files. Returns (path, info).
+        """
+        try:
+            progress(0, desc="Loading model...")
+            load_msg = self.load_model(model_name, device)
+            if self.upsampler is None:
+                return None, f"✗ Failed to load model\n{load_msg}"
+            
+            image = open_lazy(file_path)
+            tiler = TiledUpscaler(self.upsampler, LARGE_IMAGE_TILE_SIZE, LARGE_IMAGE_TILE_OVERLAP,
+                                  alpha_mode=ALPHA_UPSCALE_MODE)
+            output_shape = tiler.output_shape(image)
+            output_bytes = int(np.prod(output_shape)) * image.dtype.itemsize
+            
+            # The memmap and the TIFF written from it both live on the temp volume
+            required = output_bytes * (2 if tifffile is not None else 1)
+            free = self.temp_manager.get_free_space()
+            if free < required:
+                return None, (f"✗ Not enough disk space for a {output_shape[1]}x{output_shape[0]} output: "
+                              f"need {required / 1024**3:.1f} GB, {free / 1024**3:.1f} GB free")
+            
+            renditions_dir = self.temp_manager.create_temp_subdir("renditions")
+            memmap_path = self.temp_manager.get_temp_file_path("tiled_output.npy")
+            output = create_output_memmap(memmap_path, output_shape, image.dtype)
+            
+            start_time = time.time()
+            throttle = ProgressThrottle(PROGRESS_UPDATE_INTERVAL)
+            
+            def on_tile(done, total):
+                if throttle.ready(force=done == total):
+                    progress(done / total * 0.9, desc=f"Tile {done}/{total}")
+            
+            tiler.upscale(image, output, on_tile)
+            
+            stem = Path(file_path).stem
+            if tifffile is not None:
+                progress(0.9, desc="Writing tiled TIFF...")
+                output_path = renditions_dir / f"{stem}_upscaled.tif"
+                write_tiled_tiff(output_path, output)
+                del output
+                memmap_path.unlink()
+            else:
+                output_path = renditions_dir / f"{stem}_upscaled.npy"
+                del output
+                shutil.move(str(memmap_path), str(output_path))
+            
+            total_time = time.time() - start_time
+            info = f"✓ Large image upscaled tile by tile\n{load_msg}\n"
+            info += f"Original size: {image.shape[1]}x{image.shape[0]} ({describe_layout(image)})\n"
+            info += f"Upscaled size: {output_shape[1]}x{output_shape[0]}\n"
+            info += f"Output: {output_path.name} ({output_bytes / 1024**3:.2f} GB uncompressed)\n"
+            if tifffile is None:
+                info += "Install tifffile to get a tiled TIFF instead of a .npy array\n"
+            info += f"\n⏱️ Total time: {total_time:.2f}s"
+            return output_path, info
+        
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return None, f"✗ Error upscaling large image: {str(e)}"
+    
+    def run_upscale_job(self, input_file, model_name, device, fps=None, temporal=False, use_frame_store=False,
+                        renditions=None, target=None, auto_model=False, face_enhance=False, start_time=None,
+                        end_time=None, lut=None, progress=gr.Progress()):
+        """Run upscale_file and collect the extra renditions, for the UI"""
+        outputs = self.upscale_file(input_file, model_name, device, fps, temporal, use_frame_store,
+                                    renditions, target, auto_model, face_enhance, start_time, end_time, lut,
+                                    progress)
+        return (*outputs, self.get_rendition_files())
+    
+    async def upscale_file_async(self, input_file, model_name, device, fps=None, temporal=False,
+                                 use_frame_store=False, renditions=None, target=None, auto_model=False,
+                                 face_enhance=False, start_time=None, end_time=None, lut=None,
+                                 progress=gr.Progress()):
+        """
+        Async UI handler.
+        
+        With a worker pool, the job runs in a separate inference process and
+        this coroutine only waits for it, keeping the web server free for
+        uploads, downloads and status. Otherwise it runs in a thread.
+        """
+        if self.worker_pool is None:
+            return await asyncio.to_thread(self.run_upscale_job, input_file, model_name, device, fps,
+                                           temporal, use_frame_store, renditions, target, auto_model,
+                                           face_enhance, start_time, end_time, lut, progress)
+        
+        if input_file is None:
+            return self.run_upscale_job(None, model_name, device)
+        
+        # Workers read the uploaded file themselves, only the path crosses the process boundary
+        file_path = input_file if isinstance(input_file, str) else input_file.name
+        
+        # Progress arrives on the pool's listener thread, where Gradio's request context
+        # is not set; hand it to this coroutine and report it from here
+        loop = asyncio.get_running_loop()
+        updates = asyncio.Queue()
+        
+        def on_progress(update):
+            loop.call_soon_threadsafe(updates.put_nowait, update)
+        
+        job = asyncio.ensure_future(self.worker_pool.run(
+            "run_upscale_job", file_path, model_name, device, fps, temporal, use_frame_store, renditions,
+            target, auto_model, face_enhance, start_time, end_time, lut, on_progress=on_progress))
+        try:
+            while not job.done():
+                next_update = asyncio.ensure_future(updates.get())
+                await asyncio.wait({job, next_update}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_update.done():
+                    next_update.cancel()
+                    continue
+                update = next_update.result()
+                if update["progress"] is not None:
+                    progress(update["progress"], desc=update["desc"])
+            return job.result()
+        except RuntimeError as e:
+            return (None, None, f"✗ Worker error: {e}", gr.update(visible=False), gr.update(visible=False),
+                    gr.update(value=None, visible=False))
+    
+    def get_batch_memory_budget(self):
+        """Bytes a batched forward pass may use on the current device"""
+        torch_device = self.device_manager.get_torch_device()
+        if torch_device.type == "cuda":
+            free, _ = torch.cuda.mem_get_info(torch_device)
+            return int(free * DEVICE_MEMORY_FRACTION)
+        return BATCH_MEMORY_BUDGET_MB * 1024**2
+    
+    def upscale_images(self, input_files, model_name, device, output_format="Keep original", batch_size=4,
+                       as_zip=True, auto_model=False, progress=gr.Progress()):
+        """
+        Upscale many images with one shared model.
+        
+        Images are decoded and encoded by a thread pool while the model works
+        through batches of resolution buckets (see BucketScheduler). Returns
+        (files, info) where files is a zip or the list of upscaled images.
+        auto_model classifies each image and groups them by the cheapest model
+        of the same scale that suits their content.
+        """
+        if not input_files:
+            return None, "Please upload one or more images"
+        
+        # Shares the model with single-file and API jobs
+        with self.processing_lock:
+            return self._upscale_images(input_files, model_name, device, output_format, batch_size, as_zip,
+                                        auto_model, progress)
+    
+    def _upscale_images(self, input_files, model_name, device, output_format, batch_size, as_zip, auto_model,
+                        progress):
+        """Body of upscale_images, run under the processing lock"""
+        try:
+            progress(0, desc="Loading model...")
+            load_msg = self.load_model(model_name, device)
+            
+            # Check if model loaded successfully
+            if self.upsampler is None:
+                return None, f"✗ Failed to load model\n{load_msg}"
+            
+            paths = [f if isinstance(f, str) else f.name for f in input_files]
+            # Type by content and size from the header, probed in parallel and cached across batches
+            progress(0, desc="Scanning images...")
+            media = self.media_index.scan(paths)
+            skipped = [p for p in paths if media[p].get("type") != "image"]
+            paths = [p for p in paths if media[p].get("type") == "image"]
+            if not paths:
+                return None, "✗ No supported images in the selection"
+            # Same-size images next to each other fill whole buckets within a decode chunk
+            paths.sort(key=lambda p: (media[p].get("height", 0), media[p].get("width", 0)))
+            
+            scale = MODELS[model_name]['scale']
+            batch_size = max(int(batch_size), 1)
+            
+            # Fresh output directory for this batch
+            output_dir = self.temp_manager.get_temp_file_path("batch_output")
+            if output_dir.exists():
+                shutil.rmtree(output_dir)
+            output_dir.mkdir(parents=True)
+            
+            used_names = set()
+            
+            def output_name(path):
+                if output_format != "Keep original":
+                    ext = f".{output_format}"
+                else:
+                    ext = Path(path).suffix.lower()
+                    if ext not in self.IMAGE_EXTS:
+                        # Misnamed or extension-less: keep the detected format
+                        ext = f".{media[path]['format']}"
+                name = f"{Path(path).stem}_upscaled{ext}"
+                counter = 1
+                while name in used_names:
+                    name = f"{Path(path).stem}_upscaled_{counter}{ext}"
+                    counter += 1
+                used_names.add(name)
+                return output_dir / name
+            
+            def decode(path):
+                image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                # Classify on the I/O threads, the model thread only groups by the result
+                chosen = model_name
+                if auto_model and image is not None and is_plain_bgr(image):
+                    profile = classify([frame_features(image)], AUTO_ANIMATION_THRESHOLD)
+                    chosen = choose_model(profile, scale, model_name, AUTO_NOISE_THRESHOLD) or model_name
+                return path, image, chosen
+            
+            def encode(output_path, image):
+                if not cv2.imwrite(str(output_path), prepare_for_format(image, output_path.suffix)):
+                    raise IOError(f"Could not write {output_path.name}")
+                return output_path
+            
+            # Decode the next chunk while the current one is on the model
+            chunk_size = max(batch_size * 8, 32)
+            chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+            failed = [Path(p).name for p in skipped]
+            written = []
+            model_counts = {}
+            done = 0
+            start_time = time.time()
+            
+            # Mixed sizes are padded into resolution buckets; batch sizes follow the memory budget
+            scheduler = BucketScheduler(
+                self.get_batch_memory_budget(),
+                estimate_bytes_per_pixel(self.upsampler.scale, self.upsampler.half, model_architecture(model_name)),
+                max_batch=batch_size
+            )
+            
+            def run_batch(ready):
+                nonlocal done
+                _, batch = ready
+                outputs = enhance_batch(self.upsampler, [image for image, _, _ in batch])
+                for (_, original_size, path), output in zip(batch, outputs):
+                    output = scheduler.crop(output, original_size, self.upsampler.scale)
+                    if scale != self.upsampler.scale:
+                        height, width = original_size
+                        output = cv2.resize(output, (int(width * scale), int(height * scale)),
+                                            interpolation=cv2.INTER_LANCZOS4)
+                    written.append(io_pool.submit(encode, output_name(path), output))
+                done += len(batch)
+                progress(done / len(paths), desc=f"Image {done}/{len(paths)}")
+            
+            # Icons, thumbnails and sprites are packed into mosaics instead
+            mosaic_pixels = scheduler.memory_budget // scheduler.bytes_per_pixel
+            small_items = []
+            small_pixels = 0
+            
+            def run_small():
+                nonlocal done, small_items, small_pixels
+                if not small_items:
+                    return
+                outputs = enhance_small_images(self.upsampler, [image for _, image in small_items],
+                                               mosaic_pixels, margin=MOSAIC_MARGIN)
+                for (path, image), output in zip(small_items, outputs):
+                    if scale != self.upsampler.scale:
+                        output = cv2.resize(output, (int(image.shape[1] * scale), int(image.shape[0] * scale)),
+                                            interpolation=cv2.INTER_LANCZOS4)
+                    written.append(io_pool.submit(encode, output_name(path), output))
+                done += len(small_items)
+                progress(done / len(paths), desc=f"Image {done}/{len(paths)}")
+                small_items = []
+                small_pixels = 0
+            
+            with ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 2) + 2)) as io_pool:
+                next_decodes = [io_pool.submit(decode, p) for p in chunks[0]]
+                for chunk_index in range(len(chunks)):
+                    decodes = next_decodes
+                    if chunk_index + 1 < len(chunks):
+                        next_decodes = [io_pool.submit(decode, p) for p in chunks[chunk_index + 1]]
+                    
+                    groups = {}
+                    for future in decodes:
+                        path, image, chosen = future.result()
+                        if image is None:
+                            failed.append(Path(path).name)
+                            done += 1
+                        else:
+                            groups.setdefault(chosen, []).append((path, image))
+                            model_counts[chosen] = model_counts.get(chosen, 0) + 1
+                    
+                    # The loaded model's group goes first, saving a switch per chunk
+                    for group_model, group in sorted(groups.items(), key=lambda g: g[0] != self.current_model_name):
+                        if group_model != self.current_model_name:
+                            # Queued buckets and mosaics belong to the current model
+                            for ready in scheduler.flush():
+                                run_batch(ready)
+                            run_small()
+                            switch_msg = self.load_model(group_model, device)
+                            if self.upsampler is None:
+                                raise RuntimeError(switch_msg)
+                        
+                        for path, image in group:
+                            if not is_plain_bgr(image):
+                                # Grayscale, alpha or 16-bit: own single pass at native layout
+                                output = enhance_image(self.upsampler, image, outscale=scale,
+                                                       alpha_mode=ALPHA_UPSCALE_MODE)
+                                written.append(io_pool.submit(encode, output_name(path), output))
+                                done += 1
+                                continue
+                            if self.is_small_image(image):
+                                small_items.append((path, image))
+                                small_pixels += (image.shape[0] + 2 * MOSAIC_MARGIN) * (image.shape[1] + 2 * MOSAIC_MARGIN)
+                                if small_pixels >= mosaic_pixels:
+                                    run_small()
+                                continue
+                            ready = scheduler.add(image, path)
+                            if ready is not None:
+                                run_batch(ready)
+                    
+                # Partially filled buckets and the last mosaic
+                for ready in scheduler.flush():
+                    run_batch(ready)
+                run_small()
+                
+                output_paths = []
+                for future in written:
+                    try:
+                        output_paths.append(future.result())
+                    except IOError as e:
+                        failed.append(str(e))
+            
+            total_time = time.time() - start_time
+            
+            if as_zip and output_paths:
+                progress(1.0, desc="Creating zip...")
+                zip_path = self.temp_manager.get_temp_file_path("upscaled_images.zip")
+                # Images are already compressed, store them as-is
+                with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+                    for output_path in output_paths:
+                        archive.write(output_path, output_path.name)
+                result = [str(zip_path)]
+            else:
+                result = [str(p) for p in output_paths]
+            
+            info = f"✓ {len(output_paths)} image(s) upscaled successfully\n{load_msg}\n"
+            if auto_model:
+                info += f"Auto model: {', '.join(f'{name} × {count}' for name, count in sorted(model_counts.items()))}\n"
+            if failed:
+                info += f"✗ {len(failed)} failed: {', '.join(failed[:10])}{' ...' if len(failed) > 10 else ''}\n"
+            info += f"\n⏱️ Performance:\n"
+            info += f"  Total time: {total_time:.2f}s\n"
+            info += f"  Speed: {len(output_paths) / max(total_time, 1e-6):.2f} images/s\n"
+            info += f"  Padding overhead: {scheduler.padding_waste * 100:.1f}%"
+            
+            return result or None, info
+            
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return None, f"✗ Error upscaling images: {str(e)}"
+    
+    def get_rendition_files(self):
+        """List the additional renditions (or large-image output) produced by the last job"""
+        renditions_dir = self.temp_manager.get_temp_file_path("renditions")
+        if not renditions_dir.exists():
+            return gr.update(value=None, visible=False)
+        files = sorted(str(path) for path in renditions_dir.iterdir() if path.is_file())
+        return gr.update(value=files or None, visible=bool(files))
+    
+    def estimate_job(self, input_file, model_name, device, target=None):
+        """Predict how long upscaling a file will take from past jobs"""
+        if input_file is None:
+            return ""
+        
+        file_path = input_file if isinstance(input_file, str) else input_file.name
+        
+        # Size and frame count come from the media index, probed once per file
+        media = self.media_info(file_path)
+        if media.get("type") not in ("image", "video"):
+            return f"✗ Unsupported file format: {Path(file_path).suffix.lower() or Path(file_path).name}"
+        if not media.get("width"):
+            return f"✗ Could not read file: {media.get('error', 'no size information')}"
+        width, height, frames = media["width"], media["height"], max(media.get("frames", 1), 1)
+        
+        # With a target size the model may change and run on a smaller input
+        route = ""
+        plan = self.plan_target(width, height, target, model_name, device) if target else None
+        if plan is not None:
+            model_name = plan["model"]
+            width, height = plan["input_size"]
+            route = f"\n🎯 Route: {describe_plan(plan)}"
+        
+        hardware_id = self.device_manager.get_hardware_id(device)
+        seconds = self.performance_model.predict(model_name, hardware_id, width, height, frames)
+        if seconds is None:
+            return f"No history yet for {model_name} on {device} - run a job to calibrate{route}"
+        
+        estimate = f"⏱️ Estimated time: {format_duration(seconds)} ({width}x{height}, {frames} frame(s)){route}"
+        if seconds > LONG_JOB_WARNING_SECONDS:
+            estimate += "\n⚠️ This is a multi-hour job - consider a lighter model or a faster device"
+        return estimate
+    
+    def preview_models(self, input_file, model_names, device, num_frames=4, crop_size=256, window_start=0,
+                       window_length=0):
+        """
+        Quickly preview several models on a few sampled frames.
+        
+        Only a centre crop of each sampled frame is upscaled, with all selected
+        models running in parallel. Videos are sampled over their whole length,
+        or over window_length seconds from window_start if given. Returns
+        (grid_path, info) where info holds a per-model throughput estimate for
+        the full file. Crop timings are kept out of the performance history,
+        which only holds full-frame jobs.
+        """
+        if input_file is None:
+            return None, "Please upload a file"
+        if not model_names:
+            return None, "Please select at least one model"
+        
+        file_path = input_file if isinstance(input_file, str) else input_file.name
+        kind = self.media_type(file_path)
+        
+        try:
+            start_time = time.time()
+            
+            # Sample frames (a still image is its own single sample)
+            if kind == "video":
+                frames, video_info = sample_frames(file_path, int(num_frames), float(window_start or 0),
+                                                   float(window_length or 0) or None)
+            elif kind == "image":
+                frame = cv2.imread(file_path, cv2.IMREAD_COLOR)
+                if frame is None:
+                    return None, f"✗ Could not read image: {file_path}"
+                frames = [frame]
+                video_info = {"total_frames": 1, "width": frame.shape[1], "height": frame.shape[0]}
+            else:
+                return None, f"✗ Unsupported file format: {Path(file_path).suffix.lower() or Path(file_path).name}"
+            
+            crops = [center_crop(frame, int(crop_size)) for frame in frames]
+            
+            # Load upsamplers up front so the parallel section only runs inference
+            upsamplers = {name: self.get_preview_upsampler(name, device) for name in model_names}
+            
+            def run_model(model_name):
+                upsampler = upsamplers[model_name]
+                scale = MODELS[model_name]['scale']
+                outputs = []
+                timed = 0.0
+                timed_pixels = 0
+                for index, crop in enumerate(crops):
+                    frame_start = time.time()
+                    output, _ = upsampler.enhance(crop, outscale=scale)
+                    # First call includes warm-up, exclude it when there is more than one sample
+                    if index > 0 or len(crops) == 1:
+                        timed += time.time() - frame_start
+                        timed_pixels += crop.shape[0] * crop.shape[1]
+                    outputs.append(output)
+                return model_name, outputs, timed / max(timed_pixels, 1)
+            
+            with ThreadPoolExecutor(max_workers=len(model_names)) as executor:
+                results = list(executor.map(run_model, model_names))
+            
+            grid = build_comparison_grid(crops, {name: outputs for name, outputs, _ in results})
+            grid_path = self.temp_manager.get_temp_file_path("preview_grid.png")
+            cv2.imwrite(str(grid_path), grid)
+            
+            # Extrapolate per-pixel speed to the full file
+            frame_pixels = video_info["width"] * video_info["height"]
+            total_frames = max(video_info["total_frames"], 1)
+            
+            info = f"✓ Preview of {len(crops)} sample(s) generated in {time.time() - start_time:.1f}s\n"
+            info += f"Source: {video_info['width']}x{video_info['height']}, {total_frames} frame(s)\n"
+            if kind == "video" and (window_start or window_length):
+                window_end = f"{float(window_start or 0) + float(window_length):.1f}s" if window_length else "end"
+                info += f"Sampled window: {float(window_start or 0):.1f}s - {window_end}\n"
+            info += "\n⏱️ Estimated full job time:\n"
+            for model_name, _, seconds_per_pixel in results:
+                seconds_per_frame = seconds_per_pixel * frame_pixels
+                info += f"  {model_name}: {seconds_per_frame:.2f}s/frame"
+                if total_frames > 1:
+                    info += f" | ~{seconds_per_frame * total_frames / 60:.1f} min total"
+                info += "\n"
+            
+            return str(grid_path), info
+            
+        except Exception as e:
+            return None, f"✗ Error generating preview: {str(e)}"
     
     def create_tab(self):
         """Create and return the Gradio tab interface"""
@@ -396,6 +1300,57 @@ class UpscalerTab:
                             maximum=120,
                             info="Only for videos. Output images keep original format."
                         )
+                        temporal_mode = gr.Checkbox(
+                            label="Temporal Mode (videos)",
+                            value=False,
+                            info="Reuse detail between frames: less shimmer, faster on slow-moving footage"
+                        )
+                        frame_store_mode = gr.Checkbox(
+                            label="Resumable (videos)",
+                            value=False,
+                            info="Keep upscaled frames on disk while encoding, so a failed job run again resumes"
+                        )
+                        auto_model_mode = gr.Checkbox(
+                            label="Auto Model (per scene)",
+                            value=False,
+                            info="Classify each scene and use the cheapest model of this scale that suits it"
+                        )
+                        face_enhance_mode = gr.Checkbox(
+                            label="Face Enhancement",
+                            value=False,
+                            info="Restore faces with GFPGAN (detected on keyframes, tracked in between)"
+                        )
+                    
+                    target_select = gr.Dropdown(
+                        choices=list(TARGET_RESOLUTIONS.keys()),
+                        value="Model native",
+                        label="Target Resolution",
+                        info="Plans the cheapest route (lighter model, pre-scale or crop) instead of upscaling past it"
+                    )
+                    
+                    # Only decode and upscale part of a video
+                    with gr.Row():
+                        range_start = gr.Number(label="Start (s, videos)", value=0, minimum=0)
+                        range_end = gr.Number(label="End (s, 0 = until the end)", value=0, minimum=0)
+                    
+                    lut_input = gr.File(
+                        label="Color Grade LUT (.cube, optional)",
+                        file_types=[".cube"],
+                        type="filepath"
+                    )
+                    
+                    rendition_select = gr.CheckboxGroup(
+                        choices=list(RENDITIONS.keys()),
+                        value=[name for name, spec in RENDITIONS.items() if spec.get("default")],
+                        label="Video Outputs",
+                        info="All selected renditions are encoded in parallel from a single upscale pass"
+                    )
+                    
+                    job_estimate = gr.Textbox(
+                        label="Job Estimate",
+                        lines=2,
+                        interactive=False
+                    )
                     
                     upscale_btn = gr.Button("🚀 Upscale", variant="primary", size="lg")
                 
@@ -410,17 +1365,142 @@ class UpscalerTab:
                         label="Upscaled Video",
                         visible=False
                     )
+                    renditions_output = gr.File(
+                        label="Additional Renditions",
+                        file_count="multiple",
+                        visible=False
+                    )
                     info_output = gr.Textbox(
                         label="Processing Info",
                         lines=6
                     )
             
+            # Refresh the time estimate whenever the job changes
+            for component in (file_input, model_dropdown, device_dropdown, target_select):
+                component.change(
+                    fn=self.estimate_job,
+                    inputs=[file_input, model_dropdown, device_dropdown, target_select],
+                    outputs=[job_estimate]
+                )
+            
             upscale_btn.click(
-                fn=self.upscale_file,
-                inputs=[file_input, model_dropdown, device_dropdown, video_fps],
-                outputs=[image_output, video_output, info_output, image_output, video_output]
+                fn=self.upscale_file_async,
+                inputs=[file_input, model_dropdown, device_dropdown, video_fps, temporal_mode, frame_store_mode,
+                        rendition_select, target_select, auto_model_mode, face_enhance_mode, range_start,
+                        range_end, lut_input],
+                outputs=[image_output, video_output, info_output, image_output, video_output, renditions_output],
+                concurrency_limit=max(1, self.worker_pool.num_workers if self.worker_pool else 1)
             )
             
+            # Batch image mode
+            with gr.Accordion("🗂️ Batch Image Upscaling", open=False):
+                gr.Markdown("""
+                Upscale many images in one go. The model is loaded once, images of the same size
+                are batched together and file decoding/encoding runs in the background.
+                """)
+                with gr.Row():
+                    with gr.Column():
+                        batch_input = gr.File(
+                            label="Input Images",
+                            file_count="multiple",
+                            file_types=["image"]
+                        )
+                        with gr.Row():
+                            batch_format = gr.Dropdown(
+                                choices=["Keep original", "png", "jpg", "webp"],
+                                value="Keep original",
+                                label="Output Format"
+                            )
+                            batch_size = gr.Slider(
+                                label="Batch Size",
+                                minimum=1,
+                                maximum=16,
+                                step=1,
+                                value=4,
+                                info="Same-size images per forward pass"
+                            )
+                        with gr.Row():
+                            batch_zip = gr.Checkbox(
+                                label="Download as ZIP",
+                                value=True
+                            )
+                            batch_auto_model = gr.Checkbox(
+                                label="Auto Model",
+                                value=False,
+                                info="Pick the cheapest fitting model per image"
+                            )
+                        batch_btn = gr.Button("🚀 Upscale All", variant="primary")
+                    
+                    with gr.Column():
+                        batch_output = gr.File(
+                            label="Upscaled Images",
+                            file_count="multiple"
+                        )
+                        batch_info = gr.Textbox(
+                            label="Batch Info",
+                            lines=6
+                        )
+                
+                batch_btn.click(
+                    fn=self.upscale_images,
+                    inputs=[batch_input, model_dropdown, device_dropdown, batch_format, batch_size, batch_zip,
+                            batch_auto_model],
+                    outputs=[batch_output, batch_info],
+                    api_name="upscale_images"
+                )
+            
+            # Quick preview before committing to a full job
+            with gr.Accordion("🔍 Quick Preview - Compare Models on Your File", open=False):
+                gr.Markdown("""
+                Upscale a few sampled frames with several models at once and get an estimate
+                of how long the full job would take with each one.
+                """)
+                with gr.Row():
+                    with gr.Column(scale=1):
+                        preview_model_select = gr.CheckboxGroup(
+                            choices=list(MODELS.keys()),
+                            value=["RealESRGAN_x4plus"],
+                            label="Models to Preview"
+                        )
+                        preview_frames = gr.Slider(
+                            label="Sampled Frames",
+                            minimum=1,
+                            maximum=8,
+                            step=1,
+                            value=3
+                        )
+                        preview_crop = gr.Slider(
+                            label="Crop Size (px)",
+                            minimum=64,
+                            maximum=512,
+                            step=32,
+                            value=256,
+                            info="Centre crop upscaled per sample - smaller is faster"
+                        )
+                        with gr.Row():
+                            preview_window_start = gr.Number(label="Window Start (s, videos)", value=0, minimum=0)
+                            preview_window_length = gr.Number(label="Window Length (s, 0 = whole video)", value=0,
+                                                              minimum=0)
+                        preview_btn = gr.Button("🔍 Preview", variant="secondary")
+                    
+                    with gr.Column(scale=2):
+                        preview_output = gr.Image(
+                            label="Side-by-Side Preview",
+                            type="filepath"
+                        )
+                        preview_info = gr.Textbox(
+                            label="Preview Info",
+                            lines=6
+                        )
+                
+                preview_btn.click(
+                    fn=self.preview_models,
+                    inputs=[file_input, preview_model_select, device_dropdown, preview_frames, preview_crop,
+                            preview_window_start, preview_window_length],
+                    outputs=[preview_output, preview_info],
+                    api_name="preview_models"
+                )
+            
             # Examples Section - Expandable
             gr.Markdown("---")
             
@@ -590,8 +1670,11 @@ class UpscalerTab:
             - **RealESRGAN_x2plus**: Use for subtle enhancement or when 4x is too much
             - **RealESRNet_x4plus**: Produces cleaner results with less enhancement
             - **RealESRGAN_x4plus_anime_6B**: Specifically trained for anime and cartoon content
+            - **realesr-general-x4v3** / **realesr-animevideov3**: Compact models, many times faster (best choice on CPU)
+            - **draft-...** models: No AI, near-instant resampling with edge sharpening for quick looks and proxy files
             - Supported image formats: JPG, PNG, WebP, BMP, TIFF
             - Supported video formats: MP4, AVI, MOV, MKV, WebM
             - Video processing may take several minutes depending on length and resolution
             - Use GPU/MPS acceleration for substantially faster processing
+            - **Temporal Mode** runs the model only on keyframes and scene cuts, warping detail in between
             """)
@@ -0,0 +1,57 @@
+"""
+Shared fixtures: a short synthetic clip and an upscaler whose state lives in a temporary directory
+"""
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Draft model: no weights to download, runs anywhere
+TEST_MODEL = "draft-lanczos-x2"
+
+
+def require_media_stack():
+    """Skip unless the video pipeline's dependencies and the ffmpeg binary are available"""
+    for module in ("numpy", "cv2", "torch", "gradio", "ffmpeg", "realesrgan"):
+        pytest.importorskip(module)
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg binary not found")
+
+
+@pytest.fixture
+def clip(tmp_path):
+    """1 second, 24 fps, 32x24 H.264 clip with an AAC audio track"""
+    require_media_stack()
+    path = tmp_path / "clip.mp4"
+    subprocess.run(["ffmpeg", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", "testsrc=size=32x24:rate=24",
+                    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+                    "-t", "1", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", str(path)],
+                   check=True)
+    return path
+
+
+@pytest.fixture
+def upscaler(tmp_path):
+    """UpscalerTab on CPU with temp files, media index and performance history under tmp_path"""
+    require_media_stack()
+    from tabs.upscaler_tab import UpscalerTab
+    from utils.device_manager import DeviceManager
+    from utils.media_index import MediaIndex
+    from utils.performance_model import PerformanceModel
+    from utils.temp_manager import TempManager
+    
+    temp_manager = TempManager(tmp_path / "temp")
+    temp_manager.initialize()
+    tab = UpscalerTab(temp_manager, DeviceManager())
+    tab.media_index = MediaIndex(tmp_path / "media_index.json")
+    tab.performance_model = PerformanceModel(tmp_path / "performance_history.json")
+    return tab
+
+
+def no_progress(*args, **kwargs):
+    """Stand-in for gr.Progress outside a Gradio event"""
@@ -0,0 +1,93 @@
+"""
+Color LUT
+.cube parsing and interpolation on the CPU, against LUTs with known results
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.color_lut import Lut3D, load_lut
+
+SIZE = 5
+
+
+def write_cube(path, function, size=SIZE):
+    """Write a .cube file sampling function(rgb) -> rgb, red changing fastest"""
+    lines = ['TITLE "test"', f"LUT_3D_SIZE {size}"]
+    for b in range(size):
+        for g in range(size):
+            for r in range(size):
+                rgb = np.array([r, g, b], dtype=np.float64) / (size - 1)
+                lines.append(" ".join(f"{value:.6f}" for value in function(rgb)))
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def linear_map(rgb):
+    """An affine colour transform, reproduced exactly by both interpolations"""
+    matrix = np.array([[0.6, 0.3, 0.1], [0.2, 0.5, 0.2], [0.1, 0.1, 0.7]])
+    return matrix @ rgb + 0.05
+
+
+@pytest.fixture
+def identity(tmp_path):
+    return load_lut(write_cube(tmp_path / "identity.cube", lambda rgb: rgb))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_parses_title_and_table(identity):
+    assert identity.title == "test"
+    assert identity.size == SIZE
+    # Indexed [blue][green][red]
+    assert np.allclose(identity.table[SIZE - 1, 0, 0], [0, 0, 1])
+
+
+@pytest.mark.parametrize("method", ["tetrahedral", "trilinear"])
+def test_identity_keeps_8bit(identity, rng, method):
+    image = rng.integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    assert np.array_equal(identity.apply(image, method), image)
+
+
+@pytest.mark.parametrize("method", ["tetrahedral", "trilinear"])
+def test_identity_keeps_16bit(identity, rng, method):
+    image = rng.integers(0, 65536, (16, 16, 3), dtype=np.uint16)
+    graded = identity.apply(image, method)
+    assert graded.dtype == np.uint16
+    assert np.abs(graded.astype(np.int32) - image).max() <= 1
+
+
+@pytest.mark.parametrize("method", ["tetrahedral", "trilinear"])
+def test_identity_keeps_float(identity, rng, method):
+    image = rng.random((16, 16, 3), dtype=np.float32)
+    assert np.allclose(identity.apply(image, method), image, atol=1e-5)
+
+
+def test_identity_keeps_bgra(identity, rng):
+    image = rng.integers(0, 256, (16, 16, 4), dtype=np.uint8)
+    graded = identity.apply(image)
+    assert graded.shape == image.shape
+    assert np.array_equal(graded, image)
+
+
+def test_tetrahedral_matches_trilinear_on_linear_lut(tmp_path, rng):
+    lut = Lut3D.from_file(write_cube(tmp_path / "linear.cube", linear_map))
+    rgb = rng.random((1000, 3), dtype=np.float32)
+    tetrahedral = lut.apply_rgb(rgb, "tetrahedral")
+    trilinear = lut.apply_rgb(rgb, "trilinear")
+    assert np.allclose(tetrahedral, trilinear, atol=1e-5)
+    assert np.allclose(trilinear, [linear_map(pixel) for pixel in rgb.astype(np.float64)], atol=1e-5)
+
+
+def test_apply_tensor_matches_apply(tmp_path, rng):
+    torch = pytest.importorskip("torch")
+    # Non-linear, so the grid_sample axis order has to match the table's
+    lut = Lut3D.from_file(write_cube(tmp_path / "gamma.cube", lambda rgb: rgb ** [0.5, 1.0, 2.0]))
+    image = rng.random((8, 12, 3), dtype=np.float32)  # BGR
+    expected = lut.apply(image, "trilinear")
+    tensor = torch.from_numpy(np.ascontiguousarray(image[..., ::-1].transpose(2, 0, 1)))[None]
+    graded = lut.apply_tensor(tensor)[0].numpy().transpose(1, 2, 0)[..., ::-1]
+    assert np.allclose(graded, expected, atol=1e-5)
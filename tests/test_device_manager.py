@@ -0,0 +1,68 @@
+"""
+Device Manager
+Least-loaded placement and memory limits, with CPU core groups as the devices
+"""
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from config.config import DEVICE_MEMORY_FRACTION
+from utils import cpu_topology
+from utils.device_manager import DeviceManager
+
+GiB = 1024 ** 3
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """CPU-only DeviceManager with groups cpu:0 (4 cores, 8 GiB) and cpu:1 (2 cores, 2 GiB)"""
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    monkeypatch.setattr(torch.backends.mps, "is_available", lambda: False)
+    monkeypatch.setattr(cpu_topology, "get_numa_nodes", lambda: {
+        0: {"cores": [0, 1, 2, 3], "memory": 8 * GiB},
+        1: {"cores": [4, 5], "memory": 2 * GiB}
+    })
+    return DeviceManager(cpu_group_size=None)
+
+
+def test_core_groups_are_devices(manager):
+    assert [device["id"] for device in manager.get_devices("CPU")] == ["cpu:0", "cpu:1"]
+    assert manager.get_device("cpu:1")["weight"] == 0.5
+    assert manager.get_device("cpu:1")["memory_limit"] == int(2 * GiB * DEVICE_MEMORY_FRACTION)
+
+
+def test_least_loaded_placement(manager):
+    # cpu:1 has half the cores, so each job there counts double
+    placed = [manager.acquire_device() for _ in range(3)]
+    assert placed == ["cpu:0", "cpu:1", "cpu:0"]
+    assert manager.get_load("cpu:0") == 2.0
+    assert manager.get_load("cpu:1") == 2.0
+    
+    for device_id in placed:
+        manager.release_device(device_id)
+    assert manager.get_load("cpu:0") == manager.get_load("cpu:1") == 0.0
+
+
+def test_memory_limits(manager):
+    # Does not fit in cpu:1's 1.8 GiB even though cpu:0 is busier
+    manager.acquire_device(cost=5.0)
+    assert manager.acquire_device(memory=3 * GiB) == "cpu:0"
+    # Left on cpu:0: 7.2 - 3 GiB
+    assert manager.acquire_device(memory=5 * GiB) is None
+    assert manager.acquire_device(memory=GiB) == "cpu:1"
+
+
+def test_device_slot_releases(manager):
+    with manager.device_slot(memory=GiB, device_ids=["cpu:1"]) as device_id:
+        assert device_id == "cpu:1"
+        assert manager.device_load["cpu:1"] == {"jobs": 1, "cost": 1.0, "memory": GiB}
+    assert manager.device_load["cpu:1"] == {"jobs": 0, "cost": 0.0, "memory": 0}
+    
+    with pytest.raises(RuntimeError):
+        with manager.device_slot(memory=10 * GiB):
+            pass
+
+
+def test_plan_workers_leaves_no_load(manager):
+    assert manager.plan_workers(3) == ["cpu:0", "cpu:1", "cpu:0"]
+    assert all(load["jobs"] == 0 for load in manager.device_load.values())
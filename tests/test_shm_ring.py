@@ -0,0 +1,88 @@
+"""
+Shared Memory Ring
+Sequence numbers, backpressure and hand-off between processes
+"""
+import multiprocessing as mp
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils.shm_ring import SharedFrameRing
+
+FRAME_SHAPE = (4, 6, 3)
+
+
+def make_frame(sequence):
+    """Frame whose every pixel encodes its sequence number"""
+    return np.full(FRAME_SHAPE, sequence % 256, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(FRAME_SHAPE, num_slots=2)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def test_frames_keep_their_sequence_numbers(ring):
+    # More frames than slots, so slots are reused
+    for sequence in (7, 8, 9, 10, 11):
+        assert ring.put(make_frame(sequence), sequence)
+        got_sequence, frame = ring.get()
+        assert got_sequence == sequence
+        assert np.array_equal(frame, make_frame(sequence))
+
+
+def test_full_ring_blocks_producer(ring):
+    assert ring.put(make_frame(0), 0)
+    assert ring.put(make_frame(1), 1)
+    assert ring.acquire_write(timeout=0.05) is None
+    assert not ring.put(make_frame(2), 2, timeout=0.05)
+    
+    # Reading one frame frees one slot
+    assert ring.get()[0] == 0
+    assert ring.put(make_frame(2), 2, timeout=0.05)
+    assert [ring.get()[0] for _ in range(2)] == [1, 2]
+
+
+def test_empty_ring_blocks_consumer(ring):
+    assert ring.acquire_read(timeout=0.05) is None
+    assert ring.get(timeout=0.05) is None
+
+
+def test_view_stays_valid_until_released(ring):
+    ring.put(make_frame(1), 1)
+    sequence, view = ring.acquire_read()
+    # The slot is not handed back yet, so the producer can fill only the other one
+    assert ring.put(make_frame(2), 2, timeout=0.05)
+    assert not ring.put(make_frame(3), 3, timeout=0.05)
+    assert sequence == 1 and np.array_equal(view, make_frame(1))
+    ring.release_read()
+
+
+def _produce(ring, frames):
+    """Producer process: whole frames, written in place"""
+    for sequence in range(frames):
+        np.copyto(ring.acquire_write(), make_frame(sequence))
+        ring.commit_write(sequence)
+    ring.close()
+
+
+def test_frames_cross_processes_in_order():
+    context = mp.get_context("spawn")
+    ring = SharedFrameRing(FRAME_SHAPE, num_slots=2, context=context)
+    producer = context.Process(target=_produce, args=(ring, 20))
+    producer.start()
+    try:
+        for expected in range(20):
+            item = ring.get(timeout=30)
+            assert item is not None, "producer stalled"
+            sequence, frame = item
+            assert sequence == expected
+            assert np.array_equal(frame, make_frame(expected))
+    finally:
+        producer.join(30)
+        ring.close()
+        ring.unlink()
+    assert producer.exitcode == 0
@@ -0,0 +1,38 @@
+"""
+Smart Trim
+Cuts of sources whose codec smart mode can't re-encode to match
+"""
+import shutil
+import subprocess
+import pytest
+
+ffmpeg = pytest.importorskip("ffmpeg")
+
+from utils.smart_trim import smart_trim
+
+
+@pytest.fixture
+def webm_clip(tmp_path):
+    """2 second VP9/Opus WebM clip"""
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg binary not found")
+    path = tmp_path / "clip.webm"
+    result = subprocess.run(["ffmpeg", "-loglevel", "error", "-y",
+                             "-f", "lavfi", "-i", "testsrc=size=64x48:rate=24",
+                             "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+                             "-t", "2", "-c:v", "libvpx-vp9", "-c:a", "libopus", str(path)],
+                            capture_output=True)
+    if result.returncode != 0:
+        pytest.skip("ffmpeg lacks libvpx-vp9/libopus")
+    return path
+
+
+def test_smart_mode_falls_back_to_mp4(webm_clip, tmp_path):
+    report = smart_trim(webm_clip, tmp_path / "trimmed.webm", 0.5, 1.5, mode="smart",
+                        work_dir=tmp_path / "parts")
+    
+    assert report["mode"] == "accurate"
+    assert report["output"].suffix == ".mp4"
+    assert report["output"].is_file()
+    codecs = {stream["codec_type"]: stream["codec_name"] for stream in ffmpeg.probe(str(report["output"]))["streams"]}
+    assert codecs == {"video": "h264", "audio": "aac"}
@@ -0,0 +1,25 @@
+"""
+Upscale Video
+End-to-end runs of UpscalerTab.upscale_video on a synthetic clip
+"""
+from pathlib import Path
+from conftest import TEST_MODEL, no_progress
+
+
+def test_upscale_video_succeeds(upscaler, clip):
+    result, info = upscaler.upscale_video(str(clip), TEST_MODEL, "CPU", progress=no_progress)
+    
+    assert result is not None, info
+    assert info.startswith("✓ Video upscaled successfully")
+    assert Path(result).is_file()
+    assert "Upscaled size: 64x48" in info
+    assert "Audio: ✓ 1 audio track(s), 1 copied" in info
+
+
+def test_upscale_video_reports_range(upscaler, clip):
+    result, info = upscaler.upscale_video(str(clip), TEST_MODEL, "CPU", progress=no_progress,
+                                          start_time=0.5, end_time=0.75)
+    
+    assert result is not None, info
+    assert "Frames processed: 6" in info
+    assert "Range: 0.50s - 0.75s" in info
@@ -0,0 +1,208 @@
+"""
+Batch Inference
+Runs several images (same-size batches or small-image mosaics) through a RealESRGAN model in one forward pass
+"""
+import math
+import cv2
+import numpy as np
+import torch
+from torch.nn import functional as F
+
+
+def _mod_scale(model_scale):
+    """Input size multiple RealESRGAN pads to for a given model scale"""
+    if model_scale == 2:
+        return 2
+    if model_scale == 1:
+        return 4
+    return None
+
+
+def forward_rgb(upsampler, tensor):
+    """
+    Run an (N, 3, H, W) float RGB tensor in [0, 1] through the model.
+    
+    Applies RealESRGANer's pre-pad and mod-pad and removes them again, so the
+    result is (N, 3, H * scale, W * scale) on the upsampler's device.
+    """
+    height, width = tensor.shape[2:]
+    model_scale = upsampler.scale
+    tensor = tensor.to(upsampler.device)
+    tensor = tensor.half() if upsampler.half else tensor.float()
+    
+    # Same padding as RealESRGANer.pre_process
+    if upsampler.pre_pad != 0:
+        tensor = F.pad(tensor, (0, upsampler.pre_pad, 0, upsampler.pre_pad), 'reflect')
+    mod_scale = _mod_scale(model_scale)
+    if mod_scale is not None:
+        _, _, h, w = tensor.size()
+        mod_pad_h = (mod_scale - h % mod_scale) % mod_scale
+        mod_pad_w = (mod_scale - w % mod_scale) % mod_scale
+        tensor = F.pad(tensor, (0, mod_pad_w, 0, mod_pad_h), 'reflect')
+    
+    with torch.no_grad():
+        output = upsampler.model(tensor)
+    
+    # Remove padding
+    return output[:, :, :height * model_scale, :width * model_scale]
+
+
+def enhance_batch(upsampler, images, outscale=None):
+    """
+    Upscale a list of same-size BGR uint8 images in a single forward pass.
+    
+    Mirrors RealESRGANer.enhance pre/post-processing (pre-pad, mod-pad,
+    outscale resize) for 3-channel 8-bit inputs. Falls back to per-image
+    enhance when the upsampler is configured for tiling or has no network
+    (classical draft resampling).
+    """
+    if not images:
+        return []
+    if upsampler.tile_size > 0 or upsampler.model is None or len(images) == 1:
+        return [upsampler.enhance(img, outscale=outscale)[0] for img in images]
+    
+    height, width = images[0].shape[:2]
+    for img in images:
+        if img.shape != images[0].shape:
+            raise ValueError("enhance_batch needs images of identical shape")
+    
+    batch = np.stack(images).astype(np.float32) / 255.0
+    batch = batch[..., ::-1]  # BGR -> RGB
+    tensor = torch.from_numpy(np.ascontiguousarray(batch.transpose(0, 3, 1, 2)))
+    
+    try:
+        output = forward_rgb(upsampler, tensor)
+    except RuntimeError as e:
+        if "out of memory" not in str(e):
+            raise
+        # Split the batch in half until it fits
+        del tensor
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        half = len(images) // 2
+        return enhance_batch(upsampler, images[:half], outscale) + enhance_batch(upsampler, images[half:], outscale)
+    
+    output = output.float().clamp_(0, 1).permute(0, 2, 3, 1).flip(-1)  # RGB -> BGR
+    output = (output * 255.0).round().byte().cpu().numpy()
+    
+    results = []
+    for out in output:
+        if outscale is not None and outscale != upsampler.scale:
+            out = cv2.resize(out, (int(width * outscale), int(height * outscale)),
+                             interpolation=cv2.INTER_LANCZOS4)
+        results.append(out)
+    return results
+
+
+def group_by_size(items, batch_size, key=lambda item: item.shape[:2]):
+    """Group items into batches of identical size, at most batch_size each"""
+    groups = {}
+    for item in items:
+        groups.setdefault(tuple(key(item)), []).append(item)
+    
+    batches = []
+    for group in groups.values():
+        for start in range(0, len(group), batch_size):
+            batches.append(group[start:start + batch_size])
+    return batches
+
+
+def pack_shelves(sizes, max_width):
+    """
+    Shelf-pack (height, width) boxes into rows no wider than max_width.
+    
+    Returns ([(y, x) per box], (canvas height, canvas width)).
+    """
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][0])
+    positions = [None] * len(sizes)
+    x = y = shelf_height = canvas_width = 0
+    for i in order:
+        height, width = sizes[i]
+        if x and x + width > max_width:
+            y += shelf_height
+            x = shelf_height = 0
+        positions[i] = (y, x)
+        x += width
+        shelf_height = max(shelf_height, height)
+        canvas_width = max(canvas_width, x)
+    return positions, (y + shelf_height, canvas_width)
+
+
+def enhance_mosaic(upsampler, images, margin=16, bgr=True):
+    """
+    Upscale many small 3-channel uint8 images in a single forward pass.
+    
+    Images are uploaded as uint8, converted on the device, padded by margin
+    pixels (reflected, like RealESRGAN's tile_pad) so neighbours don't bleed
+    into each other, and packed into one mosaic. The whole output comes back
+    in one device-to-host copy and is sliced per image. bgr=False takes and
+    returns RGB, skipping colour conversion entirely.
+    """
+    if not images:
+        return []
+    
+    scale = upsampler.scale
+    padded_sizes = [(img.shape[0] + 2 * margin, img.shape[1] + 2 * margin) for img in images]
+    area = sum(height * width for height, width in padded_sizes)
+    max_width = max(max(width for _, width in padded_sizes), int(math.sqrt(area)))
+    positions, (canvas_height, canvas_width) = pack_shelves(padded_sizes, max_width)
+    
+    # The model needs sides divisible by its mod scale
+    mod_scale = _mod_scale(scale) or 1
+    canvas_height = -(-canvas_height // mod_scale) * mod_scale
+    canvas_width = -(-canvas_width // mod_scale) * mod_scale
+    
+    dtype = torch.float16 if upsampler.half else torch.float32
+    canvas = torch.zeros((1, 3, canvas_height, canvas_width), dtype=dtype, device=upsampler.device)
+    for img, (y, x), (height, width) in zip(images, positions, padded_sizes):
+        tile = torch.from_numpy(np.ascontiguousarray(img)).to(upsampler.device)
+        if bgr:
+            tile = tile.flip(-1)  # BGR -> RGB
+        tile = tile.permute(2, 0, 1).unsqueeze(0).to(dtype).div_(255.0)
+        mode = 'reflect' if min(img.shape[:2]) > margin else 'replicate'
+        canvas[:, :, y:y + height, x:x + width] = F.pad(tile, (margin, margin, margin, margin), mode)
+    
+    try:
+        with torch.no_grad():
+            output = upsampler.model(canvas)
+    except RuntimeError as e:
+        if "out of memory" not in str(e) or len(images) == 1:
+            raise
+        del canvas
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        half = len(images) // 2
+        return (enhance_mosaic(upsampler, images[:half], margin, bgr)
+                + enhance_mosaic(upsampler, images[half:], margin, bgr))
+    
+    output = output[0].float().clamp_(0, 1).mul_(255.0).round_().byte().permute(1, 2, 0)
+    if bgr:
+        output = output.flip(-1)  # RGB -> BGR
+    output = output.cpu().numpy()
+    
+    results = []
+    for img, (y, x) in zip(images, positions):
+        top = (y + margin) * scale
+        left = (x + margin) * scale
+        results.append(output[top:top + img.shape[0] * scale, left:left + img.shape[1] * scale].copy())
+    return results
+
+
+def enhance_small_images(upsampler, images, max_pixels, margin=16, bgr=True):
+    """Upscale small images through as few mosaics as fit max_pixels input pixels each"""
+    if upsampler.model is None:
+        # Classical resampling has no forward pass to share
+        return [upsampler.enhance(img)[0] for img in images]
+    results = []
+    group = []
+    group_pixels = 0
+    for img in images:
+        pixels = (img.shape[0] + 2 * margin) * (img.shape[1] + 2 * margin)
+        if group and group_pixels + pixels > max_pixels:
+            results += enhance_mosaic(upsampler, group, margin, bgr)
+            group = []
+            group_pixels = 0
+        group.append(img)
+        group_pixels += pixels
+    results += enhance_mosaic(upsampler, group, margin, bgr)
+    return results
@@ -0,0 +1,106 @@
+"""
+Classical Upscale
+Draft-quality upscaling without a network: OpenCV Lanczos/bicubic resampling with edge-aware sharpening
+"""
+import cv2
+import numpy as np
+
+# MODELS[...]["interpolation"] -> OpenCV resampling filter
+INTERPOLATIONS = {
+    "lanczos": cv2.INTER_LANCZOS4,
+    "bicubic": cv2.INTER_CUBIC,
+    "linear": cv2.INTER_LINEAR
+}
+
+# Neighbourhood the sharpened result is clamped to, so edges get steeper without halos
+_CLAMP_KERNEL = np.ones((3, 3), np.uint8)
+
+
+class ClassicalUpsampler:
+    """
+    Stand-in for RealESRGANer that resamples instead of running a network.
+    
+    It has the attributes and enhance() the pipeline uses, so images,
+    videos, tiles and previews go through the same code paths as the AI
+    models. There is no model (model is None): batched and mosaic inference
+    fall back to per-image enhance(), which is the fast path here anyway.
+    Everything runs on the CPU through OpenCV's vectorized kernels,
+    whatever device is selected.
+    
+    Sharpening is an unsharp mask gated by local contrast: the detail layer
+    (image minus its Gaussian blur) is added back only where its luma clears
+    `threshold` of full scale, ramping in over another threshold, so edges
+    are crisped while flat areas and noise are left alone. The result is
+    clamped to each pixel's 3x3 neighbourhood range, which removes the
+    ringing of both Lanczos and the mask.
+    """
+    
+    def __init__(self, scale, interpolation="lanczos", sharpen=0.6, radius=1.0, threshold=0.01):
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation '{interpolation}'")
+        self.scale = scale
+        self.interpolation = INTERPOLATIONS[interpolation]
+        self.sharpen = sharpen
+        self.radius = radius
+        self.threshold = threshold
+        # Attributes the batch and tiling helpers read from a RealESRGANer
+        self.model = None
+        self.tile_size = 0
+        self.pre_pad = 0
+        self.half = False
+        self.device = "cpu"
+    
+    def sharpen_edges(self, image, outscale):
+        """Edge-aware unsharp mask of an image's colour channels (alpha is left untouched)"""
+        if self.sharpen <= 0:
+            return image
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        color = image[..., :-1] if channels in (2, 4) else image
+        if color.ndim == 3 and color.shape[2] == 1:
+            color = color[..., 0]
+        if image.dtype == np.uint16:
+            max_value = 65535.0
+        elif image.dtype.kind == "f":
+            max_value = 1.0
+        else:
+            max_value = 255.0
+        
+        # Resampling softens edges over about outscale pixels, the blur follows
+        sigma = self.radius * max(outscale / 2, 1.0)
+        color_f = color.astype(np.float32)
+        detail = color_f - cv2.GaussianBlur(color_f, (0, 0), sigma)
+        luma = cv2.cvtColor(detail, cv2.COLOR_BGR2GRAY) if detail.ndim == 3 else detail
+        threshold = self.threshold * max_value
+        mask = np.clip((np.abs(luma) - threshold) / threshold, 0, 1)
+        detail *= (mask[..., None] if detail.ndim == 3 else mask) * self.sharpen
+        detail += color_f
+        sharpened = np.clip(detail, cv2.erode(color_f, _CLAMP_KERNEL), cv2.dilate(color_f, _CLAMP_KERNEL))
+        if image.dtype.kind != "f":
+            sharpened = sharpened.round()
+        sharpened = sharpened.astype(image.dtype)
+        
+        if channels in (1, 3):
+            return sharpened.reshape(image.shape)
+        return np.concatenate([sharpened.reshape(image.shape[:2] + (channels - 1,)), image[..., -1:]], axis=2)
+    
+    def enhance(self, img, outscale=None, alpha_upsampler="bicubic"):
+        """
+        Upscale an image of any layout (gray, gray+alpha, BGR, BGRA; 8/16-bit or float).
+        
+        Returns (output, mode) like RealESRGANer.enhance. Alpha is resampled
+        with the colour in the same call; alpha_upsampler is accepted for
+        compatibility and ignored.
+        """
+        outscale = outscale or self.scale
+        height, width = img.shape[:2]
+        output = cv2.resize(img, (int(width * outscale), int(height * outscale)), interpolation=self.interpolation)
+        if img.ndim == 3 and output.ndim == 2:
+            output = output[..., None]
+        if output.dtype.kind == "f":
+            # Lanczos and bicubic overshoot, integer outputs are saturated by OpenCV
+            output = np.clip(output, 0, 1)
+        output = self.sharpen_edges(output, outscale)
+        
+        channels = 1 if img.ndim == 2 else img.shape[2]
+        mode = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}.get(channels, "RGB")
+        return output, mode
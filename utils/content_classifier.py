@@ -0,0 +1,157 @@
+"""
+Content Classifier
+Lightweight animation/live-action and noise analysis for automatic per-scene model selection
+"""
+import math
+import cv2
+import numpy as np
+from config.config import MODELS
+from utils.temporal import SceneCutDetector
+
+# Immerkær's noise estimation kernel (difference of two Laplacians)
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+def estimate_noise(gray):
+    """Standard deviation of Gaussian noise in a grayscale image (0-255 scale)"""
+    height, width = gray.shape
+    if height < 3 or width < 3:
+        return 0.0
+    response = cv2.filter2D(gray.astype(np.float32), -1, NOISE_KERNEL)[1:-1, 1:-1]
+    return float(np.abs(response).sum() * math.sqrt(math.pi / 2) / (6 * (width - 2) * (height - 2)))
+
+
+def frame_features(frame, analysis_size=320, noise_crop=256):
+    """
+    Cheap content features of a BGR frame.
+    
+    flat: share of pixels without local texture (cel-shaded art is mostly flat)
+    palette: distinct 15-bit colours per pixel (drawn content uses few colours)
+    noise: estimated noise sigma, measured on a full-resolution centre crop
+    """
+    height, width = frame.shape[:2]
+    factor = analysis_size / max(height, width)
+    small = cv2.resize(frame, (max(int(width * factor), 1), max(int(height * factor), 1)),
+                       interpolation=cv2.INTER_AREA) if factor < 1 else frame
+    gray_small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    
+    texture = np.abs(cv2.Laplacian(gray_small, cv2.CV_16S))
+    flat = float((texture < 4).mean())
+    
+    quantised = (small >> 3).astype(np.int32)
+    codes = (quantised[..., 0] << 10) | (quantised[..., 1] << 5) | quantised[..., 2]
+    palette = len(np.unique(codes)) / codes.size
+    
+    # Downscaling averages noise away, so measure it at full resolution
+    top = max((height - noise_crop) // 2, 0)
+    left = max((width - noise_crop) // 2, 0)
+    crop = cv2.cvtColor(frame[top:top + noise_crop, left:left + noise_crop], cv2.COLOR_BGR2GRAY)
+    
+    return {"flat": flat, "palette": palette, "noise": estimate_noise(crop)}
+
+
+def classify(features_list, animation_threshold=0.5):
+    """
+    Combine per-frame features into a content profile.
+    
+    Returns {"content": "animation" | "live_action", "animation_score", "noise"}.
+    The score blends flat-area share and palette size; both cut-offs come
+    from typical values at 320px (drawn content: >70% flat, <3% of colours).
+    """
+    flat = sum(f["flat"] for f in features_list) / len(features_list)
+    palette = sum(f["palette"] for f in features_list) / len(features_list)
+    noise = sorted(f["noise"] for f in features_list)[len(features_list) // 2]
+    
+    flat_score = min(max((flat - 0.3) / 0.4, 0.0), 1.0)
+    palette_score = min(max((0.15 - palette) / 0.12, 0.0), 1.0)
+    score = 0.5 * flat_score + 0.5 * palette_score
+    return {
+        "content": "animation" if score >= animation_threshold else "live_action",
+        "animation_score": round(score, 3),
+        "noise": round(noise, 2)
+    }
+
+
+def choose_model(profile, scale, preferred=None, noise_threshold=6.0):
+    """
+    Cheapest model of the given scale whose "content" covers the profile.
+    
+    Noisy sources (sigma above noise_threshold) skip models marked "clean_only"
+    (non-GAN models that keep noise as texture). With a preferred model, only
+    models of its architecture compete, so the quality tier stays the user's
+    choice. Ties go to the preferred model.
+    """
+    architecture = MODELS[preferred].get("architecture", "rrdbnet") if preferred else None
+    candidates = [name for name, info in MODELS.items()
+                  if info["scale"] == scale and profile["content"] in info.get("content", [])
+                  and architecture in (None, info.get("architecture", "rrdbnet"))]
+    if profile["noise"] > noise_threshold:
+        candidates = [name for name in candidates if not MODELS[name].get("clean_only")] or candidates
+    if not candidates:
+        return preferred
+    return min(candidates, key=lambda name: (MODELS[name].get("relative_cost", 1.0), name != preferred))
+
+
+def analyze_scenes(video_path, sample_interval=12, samples_per_scene=3, min_scene_frames=12,
+                   start_frame=0, max_frames=None, detector=None, on_frame=None):
+    """
+    Split a video into scenes and profile each one.
+    
+    Every frame goes through the scene-cut detector at a reduced size; up to
+    samples_per_scene frames per scene (sample_interval apart) are profiled.
+    Scenes shorter than min_scene_frames are merged into the previous one so
+    short flashes don't cause model switches. Only max_frames frames from
+    start_frame on are analysed. Returns a list of {"start", "end",
+    "features"} with end exclusive, counted from start_frame.
+    """
+    detector = detector or SceneCutDetector()
+    cap = cv2.VideoCapture(str(video_path))
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    scenes = []
+    index = 0
+    try:
+        while max_frames is None or index < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            small = cv2.resize(frame, (160, 90), interpolation=cv2.INTER_AREA)
+            if detector.is_cut(small):
+                if scenes and index - scenes[-1]["start"] < min_scene_frames:
+                    # Too short to be worth its own model: keep extending the previous scene
+                    pass
+                else:
+                    scenes.append({"start": index, "features": []})
+            scene = scenes[-1]
+            offset = index - scene["start"]
+            if offset % sample_interval == 0 and len(scene["features"]) < samples_per_scene:
+                scene["features"].append(frame_features(frame))
+            index += 1
+            if on_frame is not None:
+                on_frame(index)
+    finally:
+        cap.release()
+    
+    for i, scene in enumerate(scenes):
+        scene["end"] = scenes[i + 1]["start"] if i + 1 < len(scenes) else index
+    return scenes
+
+
+def plan_scenes(scenes, scale, preferred=None, animation_threshold=0.5, noise_threshold=6.0):
+    """Attach a content profile and the chosen model to every scene"""
+    for scene in scenes:
+        scene.update(classify(scene.pop("features"), animation_threshold))
+        scene["model"] = choose_model(scene, scale, preferred, noise_threshold)
+    return scenes
+
+
+def summarize_scenes(scenes, fps=None):
+    """Job-report lines for the per-scene model decisions"""
+    lines = []
+    for i, scene in enumerate(scenes, 1):
+        span = f"frames {scene['start']}-{scene['end'] - 1}"
+        if fps:
+            span += f" ({scene['start'] / fps:.1f}s-{scene['end'] / fps:.1f}s)"
+        lines.append(f"  Scene {i}: {span} | {scene['content'].replace('_', ' ')} "
+                     f"(score {scene['animation_score']:.2f}, noise σ {scene['noise']:.1f}) → {scene['model']}")
+    return "\n".join(lines)
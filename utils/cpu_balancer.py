@@ -0,0 +1,171 @@
+"""
+CPU Balancer
+Splits cores between torch inference threads and the video encoders while a job runs
+"""
+import time
+import torch
+from utils.cpu_topology import get_usable_cores
+
+# x264/x265 presets from fastest to slowest
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+# Encoders whose preset the balancer may change
+PRESET_ENCODERS = {"libx264", "libx265"}
+
+# Share of a window the frame loop may spend blocked on full encoder queues before encoding
+# counts as the bottleneck, and the share below which encoding has slack
+ENCODER_BOUND = 0.10
+ENCODER_IDLE = 0.01
+# An fps drop larger than this after a move undoes it
+REVERT_TOLERANCE = 0.05
+
+
+class CpuBalancer:
+    """
+    Hill-climbing split of CPU cores between inference and encoding.
+    
+    The frame loop reports how long each frame was blocked handing it to
+    the encoders (their queues were full). Every `interval` frames the
+    balancer compares the window's end-to-end fps with the previous one and either undoes its last move (if fps dropped) or moves
+    a core towards the bottleneck: encoder-bound windows take a torch thread
+    away, then step x264/x265 one preset faster (never past floor_preset);
+    inference-bound windows hand a core back to torch, then step the preset
+    back towards the configured one. Encoders are confined to their cores
+    with CPU affinity (Linux), torch through its thread count; preset
+    changes need segmented encoders (MultiEncoder's segmented_codecs, set
+    to PRESET_ENCODERS).
+    """
+    
+    def __init__(self, encoders, encoder_share=0.25, floor_preset="veryfast", interval=24, min_torch_threads=1,
+                 preset_cooldown=4, cores=None):
+        self.encoders = encoders
+        self.cores = list(cores or get_usable_cores())
+        self.interval = interval
+        self.min_torch_threads = min(min_torch_threads, len(self.cores))
+        self.preset_cooldown = preset_cooldown
+        self.original_threads = torch.get_num_threads()
+        
+        # Never give the encoders every core, and never fewer than one
+        self.encoder_cores = min(max(1, round(len(self.cores) * encoder_share)),
+                                 max(1, len(self.cores) - self.min_torch_threads))
+        # Presets only ever go faster than configured down to the floor, and back
+        self.floor = PRESETS.index(floor_preset)
+        self.base_presets = {}
+        for encoder in encoders:
+            preset = str(encoder.spec.get("preset", "medium"))
+            if encoder.segmented and encoder.spec["vcodec"] in PRESET_ENCODERS and preset in PRESETS:
+                self.base_presets[encoder.name] = PRESETS.index(preset)
+        self.preset_step = 0
+        
+        self.last_move = None
+        self.last_fps = None
+        self.windows_since_preset = preset_cooldown
+        self.stats = {"windows": 0, "moves": 0, "reverted": 0, "preset_changes": 0, "affinity": True}
+        self._reset_window()
+    
+    @property
+    def torch_threads(self):
+        """Threads torch may use, the cores the encoders don't have"""
+        return max(self.min_torch_threads, len(self.cores) - self.encoder_cores)
+    
+    def _reset_window(self):
+        self.frames = 0
+        self.blocked = 0.0
+        self.window_start = time.perf_counter()
+    
+    def apply(self):
+        """Push the current split to torch and the encoder processes"""
+        torch.set_num_threads(self.torch_threads)
+        encoder_cores = self.cores[-self.encoder_cores:]
+        for encoder in self.encoders:
+            self.stats["affinity"] = encoder.set_cores(encoder_cores) and self.stats["affinity"]
+    
+    def _apply_presets(self):
+        """Reconfigure the preset-capable encoders for the current preset step"""
+        changed = False
+        for encoder in self.encoders:
+            if encoder.name in self.base_presets:
+                base = self.base_presets[encoder.name]
+                index = min(base, max(min(self.floor, base), base + self.preset_step))
+                changed = encoder.reconfigure(preset=PRESETS[index]) or changed
+        if changed:
+            self.stats["preset_changes"] += 1
+            self.windows_since_preset = 0
+        return changed
+    
+    def _can_speed_up_preset(self):
+        return any(base + self.preset_step > self.floor for base in self.base_presets.values())
+    
+    def _move(self, move):
+        """Carry out ("cores", ±1) or ("preset", ±1), returns whether anything changed"""
+        kind, delta = move
+        if kind == "cores":
+            self.encoder_cores += delta
+            self.apply()
+            return True
+        self.preset_step += delta
+        return self._apply_presets()
+    
+    def observe(self, blocked_seconds):
+        """
+        Account one frame; blocked_seconds is how long handing it to the encoders took.
+        
+        Returns the move made at the end of a window (or None).
+        """
+        self.frames += 1
+        self.blocked += blocked_seconds
+        if self.frames < self.interval:
+            return None
+        
+        elapsed = time.perf_counter() - self.window_start
+        fps = self.frames / max(elapsed, 1e-9)
+        blocked_share = self.blocked / max(elapsed, 1e-9)
+        self.stats["windows"] += 1
+        self.windows_since_preset += 1
+        
+        move = None
+        if self.last_move is not None and self.last_fps and fps < self.last_fps * (1 - REVERT_TOLERANCE):
+            # The last move made things slower, take it back and hold for a window
+            undo = (self.last_move[0], -self.last_move[1])
+            self._move(undo)
+            self.stats["reverted"] += 1
+            self.last_move = None
+            self.last_fps = None
+            self._reset_window()
+            return undo
+        
+        if blocked_share > ENCODER_BOUND:
+            if self.torch_threads > self.min_torch_threads:
+                move = ("cores", 1)
+            elif self._can_speed_up_preset() and self.windows_since_preset >= self.preset_cooldown:
+                move = ("preset", -1)
+        elif blocked_share < ENCODER_IDLE:
+            if self.preset_step < 0 and self.windows_since_preset >= self.preset_cooldown:
+                # Spare encoder time goes back into quality first
+                move = ("preset", 1)
+            elif self.encoder_cores > 1:
+                move = ("cores", -1)
+        
+        if move is not None and self._move(move):
+            self.stats["moves"] += 1
+            self.last_move = move
+        else:
+            self.last_move = move = None
+        self.last_fps = fps
+        self._reset_window()
+        return move
+    
+    def restore(self):
+        """Give torch its original thread count back after the job"""
+        torch.set_num_threads(self.original_threads)
+    
+    def get_summary(self):
+        """Human readable summary of the final split"""
+        presets = {encoder.name: encoder.output_args.get("preset", "medium") for encoder in self.encoders
+                   if encoder.name in self.base_presets}
+        summary = (f"CPU split: {self.torch_threads} inference thread(s), {self.encoder_cores} encoder core(s) "
+                   f"of {len(self.cores)} ({self.stats['moves']} move(s), {self.stats['reverted']} reverted)")
+        if presets:
+            summary += f", encoder preset {', '.join(sorted(set(presets.values())))}"
+        if not self.stats["affinity"]:
+            summary += " [no CPU affinity on this platform, encoder cores not enforced]"
+        return summary
@@ -0,0 +1,168 @@
+"""
+CPU Topology
+Reads usable cores and NUMA nodes so CPU work can be split into core groups
+"""
+import os
+from pathlib import Path
+
+NODE_DIR = Path("/sys/devices/system/node")
+
+
+def parse_cpulist(cpulist):
+    """Parse a kernel cpulist string such as '0-3,8-11' into a sorted list"""
+    cores = set()
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cores.update(range(int(start), int(end) + 1))
+        else:
+            cores.add(int(part))
+    return sorted(cores)
+
+
+def get_usable_cores():
+    """Cores this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def get_total_memory():
+    """Total physical memory in bytes (0 if unknown)"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def get_numa_nodes():
+    """
+    Map NUMA node id -> {"cores": [...], "memory": bytes}.
+    
+    Only cores usable by this process are listed. Hosts without NUMA
+    information (or non-Linux) are reported as a single node 0.
+    """
+    usable = set(get_usable_cores())
+    nodes = {}
+    if NODE_DIR.exists():
+        for node_path in sorted(NODE_DIR.glob("node[0-9]*")):
+            try:
+                cores = [core for core in parse_cpulist((node_path / "cpulist").read_text()) if core in usable]
+            except OSError:
+                continue
+            if not cores:
+                continue
+            memory = 0
+            try:
+                for line in (node_path / "meminfo").read_text().splitlines():
+                    if "MemTotal" in line:
+                        memory = int(line.split()[-2]) * 1024
+                        break
+            except (OSError, ValueError, IndexError):
+                pass
+            nodes[int(node_path.name[4:])] = {"cores": cores, "memory": memory}
+    
+    if not nodes:
+        nodes[0] = {"cores": sorted(usable), "memory": get_total_memory()}
+    return nodes
+
+
+def split_core_groups(group_size=None):
+    """
+    Split usable cores into groups that never straddle a NUMA node.
+    
+    With group_size None each NUMA node is one group. Returns a list of
+    {"cores": [...], "numa_node": id, "memory": bytes} where memory is the
+    node's memory shared evenly between its groups.
+    """
+    groups = []
+    for node, info in get_numa_nodes().items():
+        cores = info["cores"]
+        size = group_size or len(cores)
+        chunks = [cores[i:i + size] for i in range(0, len(cores), size)]
+        for chunk in chunks:
+            groups.append({
+                "cores": chunk,
+                "numa_node": node,
+                "memory": info["memory"] // len(chunks) if info["memory"] else 0
+            })
+    return groups
+
+
+def worker_layout(num_workers):
+    """
+    Lay out num_workers CPU workers so none straddles a NUMA node.
+    
+    Workers are shared out between nodes in proportion to their core counts
+    and each node's cores are split evenly between its workers. Returns one
+    {"cores": [...], "numa_node": id} per worker; workers share cores only
+    when there are more workers than cores.
+    """
+    nodes = get_numa_nodes()
+    total_cores = sum(len(info["cores"]) for info in nodes.values())
+    
+    # Proportional share per node, at least one worker on each node while workers remain
+    shares = {node: max(1, round(num_workers * len(info["cores"]) / total_cores)) for node, info in nodes.items()}
+    while sum(shares.values()) > num_workers:
+        node = max(sorted(shares, reverse=True), key=lambda n: (shares[n], -len(nodes[n]["cores"])))
+        shares[node] -= 1
+        if shares[node] == 0:
+            del shares[node]
+    while sum(shares.values()) < num_workers:
+        node = max(nodes, key=lambda n: len(nodes[n]["cores"]) / (shares.get(n, 0) + 1))
+        shares[node] = shares.get(node, 0) + 1
+    
+    layout = []
+    for node, count in sorted(shares.items()):
+        cores = nodes[node]["cores"]
+        for index in range(count):
+            start = index * len(cores) // count
+            end = max((index + 1) * len(cores) // count, start + 1)
+            layout.append({"cores": cores[start:end], "numa_node": node})
+    return layout
+
+
+def format_cpulist(cores):
+    """Format cores as a kernel cpulist string such as '0-3,8'"""
+    ranges = []
+    for core in sorted(cores):
+        if ranges and core == ranges[-1][1] + 1:
+            ranges[-1][1] = core
+        else:
+            ranges.append([core, core])
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+def thread_env(num_threads):
+    """Environment variables that cap OpenMP/MKL/BLAS thread pools (set before importing torch)"""
+    value = str(num_threads)
+    return {
+        "OMP_NUM_THREADS": value,
+        "MKL_NUM_THREADS": value,
+        "OPENBLAS_NUM_THREADS": value,
+        "NUMEXPR_NUM_THREADS": value
+    }
+
+
+def worker_env(slot):
+    """Environment pinning a worker to one worker_layout slot"""
+    env = thread_env(len(slot["cores"]))
+    env["UPSCALER_CPU_CORES"] = format_cpulist(slot["cores"])
+    env["UPSCALER_NUMA_NODE"] = str(slot["numa_node"])
+    return env
+
+
+def pin_process(cores, pid=0):
+    """
+    Restrict a process (by default the calling one) to cores.
+    
+    Linux allocates pages on the node of the core that first touches them, so
+    pinning to one node's cores also keeps the process's memory on that node.
+    Returns False where affinity isn't supported.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return False
+    os.sched_setaffinity(pid, set(cores))
+    return True
@@ -4,14 +4,25 @@ Handles device selection and management for AI models (CPU, CUDA GPU, MPS)
 """
 import torch
 import platform
+import threading
+from contextlib import contextmanager
+from config.config import CPU_GROUP_SIZE, DEVICE_MEMORY_FRACTION
+from utils.cpu_topology import split_core_groups, worker_layout, worker_env
 
 
 class DeviceManager:
     """Manages compute device selection"""
     
-    def __init__(self):
+    def __init__(self, cpu_group_size=CPU_GROUP_SIZE):
         self.available_devices = self._detect_devices()
         self.current_device = self._get_default_device()
+        
+        # Schedulable devices: every CUDA index, MPS, and CPU core groups
+        self.cpu_group_size = cpu_group_size
+        self.devices = self._enumerate_devices()
+        self.device_load = {device["id"]: {"jobs": 0, "cost": 0.0, "memory": 0} for device in self.devices}
+        self.pinned_device_id = None
+        self.load_lock = threading.Lock()
     
     def _detect_devices(self):
         """Detect available compute devices"""
@@ -36,6 +47,154 @@ class DeviceManager:
         else:
             return "CPU"
     
+    def _enumerate_devices(self):
+        """List every schedulable device with its capacity and memory limit"""
+        devices = []
+        
+        if torch.cuda.is_available():
+            for index in range(torch.cuda.device_count()):
+                properties = torch.cuda.get_device_properties(index)
+                devices.append({
+                    "id": f"cuda:{index}",
+                    "kind": "GPU (CUDA)",
+                    "name": properties.name,
+                    "torch_device": f"cuda:{index}",
+                    "memory_limit": int(properties.total_memory * DEVICE_MEMORY_FRACTION),
+                    "weight": 1.0
+                })
+        
+        if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+            devices.append({
+                "id": "mps",
+                "kind": "MPS (Apple Silicon)",
+                "name": "Apple Silicon GPU",
+                "torch_device": "mps",
+                "memory_limit": 0,
+                "weight": 1.0
+            })
+        
+        # CPU core groups never straddle a NUMA node; weight follows core count
+        groups = split_core_groups(self.cpu_group_size)
+        max_cores = max(len(group["cores"]) for group in groups)
+        for index, group in enumerate(groups):
+            devices.append({
+                "id": f"cpu:{index}",
+                "kind": "CPU",
+                "name": f"CPU cores {group['cores'][0]}-{group['cores'][-1]} (NUMA node {group['numa_node']})",
+                "torch_device": "cpu",
+                "cores": group["cores"],
+                "numa_node": group["numa_node"],
+                "memory_limit": int(group["memory"] * DEVICE_MEMORY_FRACTION),
+                "weight": len(group["cores"]) / max_cores
+            })
+        
+        return devices
+    
+    def get_devices(self, kind=None):
+        """Get schedulable devices, optionally only of one kind (e.g. "CPU")"""
+        return [device for device in self.devices if kind is None or device["kind"] == kind]
+    
+    def get_device(self, device_id):
+        """Get a schedulable device by id"""
+        return next((device for device in self.devices if device["id"] == device_id), None)
+    
+    def get_load(self, device_id):
+        """Current load of a device: scheduled cost divided by its weight"""
+        device = self.get_device(device_id)
+        return self.device_load[device_id]["cost"] / device["weight"]
+    
+    def acquire_device(self, cost=1.0, memory=0, kinds=None, device_ids=None):
+        """
+        Place a job or segment on the least-loaded device.
+        
+        Candidates can be narrowed to some kinds or device ids. Devices whose
+        memory limit cannot fit `memory` more bytes are skipped (a limit of 0
+        means unknown/unlimited). Returns the device id, or None if nothing
+        fits. Call release_device with the same cost and memory.
+        """
+        with self.load_lock:
+            candidates = []
+            for device in self.devices:
+                if kinds is not None and device["kind"] not in kinds:
+                    continue
+                if device_ids is not None and device["id"] not in device_ids:
+                    continue
+                load = self.device_load[device["id"]]
+                if device["memory_limit"] and load["memory"] + memory > device["memory_limit"]:
+                    continue
+                candidates.append(((load["cost"] + cost) / device["weight"], load["jobs"], device["id"]))
+            
+            if not candidates:
+                return None
+            
+            _, _, device_id = min(candidates)
+            load = self.device_load[device_id]
+            load["jobs"] += 1
+            load["cost"] += cost
+            load["memory"] += memory
+            return device_id
+    
+    def release_device(self, device_id, cost=1.0, memory=0):
+        """Return capacity taken by acquire_device"""
+        with self.load_lock:
+            load = self.device_load[device_id]
+            load["jobs"] = max(load["jobs"] - 1, 0)
+            load["cost"] = max(load["cost"] - cost, 0.0)
+            load["memory"] = max(load["memory"] - memory, 0)
+    
+    @contextmanager
+    def device_slot(self, cost=1.0, memory=0, kinds=None, device_ids=None):
+        """Context manager around acquire_device/release_device"""
+        device_id = self.acquire_device(cost, memory, kinds, device_ids)
+        if device_id is None:
+            raise RuntimeError("No device has enough free memory for this job")
+        try:
+            yield device_id
+        finally:
+            self.release_device(device_id, cost, memory)
+    
+    def plan_workers(self, num_workers, kinds=None):
+        """
+        Spread num_workers long-running workers over devices, least-loaded first.
+        
+        Only plans: the load is released again, since the worker pool acquires
+        a device for each task it dispatches.
+        """
+        plan = [self.acquire_device(kinds=kinds) for _ in range(num_workers)]
+        for device_id in plan:
+            if device_id is not None:
+                self.release_device(device_id)
+        return plan
+    
+    def worker_envs(self, num_workers, cpu_layout=None):
+        """
+        Environment for each of num_workers inference worker processes.
+        
+        With accelerators, workers are spread over them and pinned by device
+        id. On CPU-only hosts each worker gets its own core set on one NUMA node
+        (cpu_layout, default worker_layout) with matching OMP/MKL thread counts.
+        """
+        accelerators = [kind for kind in ("GPU (CUDA)", "MPS (Apple Silicon)") if self.get_devices(kind)]
+        if accelerators:
+            return [{"UPSCALER_DEVICE_ID": device_id} for device_id in self.plan_workers(num_workers, kinds=accelerators)]
+        
+        return [worker_env(slot) for slot in cpu_layout or worker_layout(num_workers)]
+    
+    def pin_device(self, device_id):
+        """Pin this manager to one schedulable device (used inside worker processes)"""
+        device = self.get_device(device_id)
+        if device is None:
+            print(f"Warning: Device {device_id} not available")
+            return False
+        self.pinned_device_id = device_id
+        self.current_device = device["kind"]
+        print(f"✓ Pinned to device: {device['name']} ({device_id})")
+        return True
+    
+    def unpin_device(self):
+        """Undo pin_device, going back to each kind's default device"""
+        self.pinned_device_id = None
+    
     def get_available_devices(self):
         """Get list of available devices"""
         return self.available_devices
@@ -50,27 +209,44 @@ class DeviceManager:
             print(f"Warning: Device {device_name} not available")
             return False
     
-    def get_torch_device(self):
-        """Get PyTorch device object"""
-        if self.current_device == "GPU (CUDA)":
+    def get_torch_device(self, device_name=None):
+        """Get PyTorch device object (of the current device, or of device_name without selecting it)"""
+        device_name = device_name or self.current_device
+        # A pinned device of the selected kind wins (e.g. cuda:1 for a worker)
+        pinned = self.get_device(self.pinned_device_id) if self.pinned_device_id else None
+        if pinned is not None and pinned["kind"] == device_name:
+            return torch.device(pinned["torch_device"])
+        
+        if device_name == "GPU (CUDA)":
             return torch.device("cuda")
-        elif self.current_device == "MPS (Apple Silicon)":
+        elif device_name == "MPS (Apple Silicon)":
             return torch.device("mps")
         else:
             return torch.device("cpu")
     
+    def get_hardware_id(self, device_name=None):
+        """Get a stable identifier for the hardware behind a device name"""
+        device_name = device_name or self.current_device
+        if device_name == "GPU (CUDA)" and torch.cuda.is_available():
+            index = (self.get_torch_device().index or 0) if device_name == self.current_device else 0
+            return f"{device_name} {torch.cuda.get_device_name(index)}"
+        return f"{device_name} {platform.processor() or platform.machine()}"
+    
     def get_device_info(self):
         """Get information about current device"""
         info = {
             "current": self.current_device,
             "available": self.available_devices,
-            "platform": platform.system()
+            "platform": platform.system(),
+            "devices": [device["id"] for device in self.devices]
         }
         
         if self.current_device == "GPU (CUDA)":
+            index = self.get_torch_device().index or 0
             info["cuda_version"] = torch.version.cuda
-            info["gpu_name"] = torch.cuda.get_device_name(0)
-            info["gpu_memory"] = f"{torch.cuda.get_device_properties(0).total_memory / 1024**3:.2f} GB"
+            info["gpu_name"] = torch.cuda.get_device_name(index)
+            info["gpu_memory"] = f"{torch.cuda.get_device_properties(index).total_memory / 1024**3:.2f} GB"
+            info["gpu_count"] = torch.cuda.device_count()
         elif self.current_device == "MPS (Apple Silicon)":
             info["mps_available"] = True
         
@@ -0,0 +1,158 @@
+"""
+Frame Store
+Memory-mapped storage for large sets of fixed-size frames
+"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from pathlib import Path
+
+
+def job_key(source, **settings):
+    """Identify a job by its source file (path, size, mtime) and settings, to resume it from a store"""
+    stat = os.stat(source)
+    identity = [str(Path(source).resolve()), stat.st_size, stat.st_mtime_ns, sorted(settings.items())]
+    return hashlib.sha1(json.dumps(identity, default=str).encode()).hexdigest()
+
+
+class FrameStore:
+    """
+    Stores fixed-size frames in a single memory-mapped file.
+    
+    Frame N lives at offset N * frame_bytes, so reads and writes are O(1) and
+    reads return views into the mapping without copying. A small JSON header
+    plus a written-flags array make the store reopenable, e.g. to resume a job;
+    `key` (see job_key) records which job the frames belong to.
+    
+    Growing checks free disk space like TempManager.create_frame_store does,
+    keeping `reserve_bytes` free.
+    """
+    
+    def __init__(self, path, frame_shape, capacity, dtype=np.uint8, mode="w+", key=None, reserve_bytes=0):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".index.npy")
+        self.header_path = self.path.with_suffix(".json")
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = max(int(capacity), 1)
+        self.frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.key = key
+        self.reserve_bytes = reserve_bytes
+        
+        if mode == "w+":
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            self._write_header()
+            self.written = np.lib.format.open_memmap(self.index_path, mode="w+", dtype=np.bool_,
+                                                     shape=(self.capacity,))
+        else:
+            self.written = np.load(self.index_path, mmap_mode="r+")
+        self.frames = np.memmap(self.path, dtype=self.dtype, mode=mode,
+                                shape=(self.capacity,) + self.frame_shape)
+    
+    @classmethod
+    def open(cls, path, reserve_bytes=0):
+        """Open an existing store"""
+        path = Path(path)
+        with open(path.with_suffix(".json"), "r") as f:
+            header = json.load(f)
+        return cls(path, header["frame_shape"], header["capacity"], header["dtype"], mode="r+",
+                   key=header.get("key"), reserve_bytes=reserve_bytes)
+    
+    @staticmethod
+    def required_bytes(frame_shape, capacity, dtype=np.uint8):
+        """Disk space needed for a store of this geometry"""
+        return int(np.prod(frame_shape)) * np.dtype(dtype).itemsize * int(capacity)
+    
+    def _write_header(self):
+        """Persist the store geometry"""
+        with open(self.header_path, "w") as f:
+            json.dump({
+                "frame_shape": list(self.frame_shape),
+                "dtype": self.dtype.str,
+                "capacity": self.capacity,
+                "key": self.key
+            }, f)
+    
+    def _grow(self, capacity):
+        """Extend the backing files to hold at least `capacity` frames"""
+        needed = self.frame_bytes * (capacity - self.capacity)
+        free = shutil.disk_usage(self.path.parent).free
+        if needed + self.reserve_bytes > free:
+            raise OSError(
+                f"Not enough disk space to grow frame store '{self.path.stem}': "
+                f"needs {needed / 1024**3:.2f} GB more, {free / 1024**3:.2f} GB free"
+            )
+        
+        self.flush()
+        written = np.array(self.written[:self.capacity])
+        del self.frames
+        del self.written
+        
+        self.capacity = capacity
+        with open(self.path, "r+b") as f:
+            f.truncate(self.frame_bytes * capacity)
+        self.written = np.lib.format.open_memmap(self.index_path, mode="w+", dtype=np.bool_,
+                                                 shape=(capacity,))
+        self.written[:len(written)] = written
+        self.frames = np.memmap(self.path, dtype=self.dtype, mode="r+",
+                                shape=(capacity,) + self.frame_shape)
+        self._write_header()
+    
+    def write(self, index, frame):
+        """Write a frame at `index`, growing the store if needed"""
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match store shape {self.frame_shape}")
+        if index >= self.capacity:
+            self._grow(max(index + 1, self.capacity * 2))
+        self.frames[index] = frame
+        self.written[index] = True
+    
+    def read(self, index):
+        """Read a frame as a zero-copy view into the mapping"""
+        if index >= self.capacity or not self.written[index]:
+            raise IndexError(f"Frame {index} has not been written")
+        return self.frames[index]
+    
+    def has_frame(self, index):
+        """Check whether a frame has been written"""
+        return index < self.capacity and bool(self.written[index])
+    
+    def __len__(self):
+        """Number of contiguous frames written from index 0"""
+        missing = np.flatnonzero(~self.written)
+        return int(missing[0]) if len(missing) else self.capacity
+    
+    def iter_frames(self, start=0, stop=None):
+        """Iterate over contiguous written frames"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for index in range(start, stop):
+            yield self.frames[index]
+    
+    def write_to(self, stream, start=0, stop=None):
+        """Write raw frames to a binary stream (e.g. an encoder's stdin) without copying"""
+        count = 0
+        for frame in self.iter_frames(start, stop):
+            stream.write(memoryview(frame).cast("B"))
+            count += 1
+        return count
+    
+    def flush(self):
+        """Flush pending writes to disk"""
+        self.frames.flush()
+        self.written.flush()
+    
+    def close(self):
+        """Flush and release the mapping"""
+        if hasattr(self, "frames"):
+            self.flush()
+            del self.frames
+            del self.written
+    
+    def delete(self):
+        """Close the store and remove its files"""
+        self.close()
+        for path in (self.path, self.index_path, self.header_path):
+            if path.exists():
+                path.unlink()
@@ -0,0 +1,142 @@
+"""
+Image Pipeline
+Channel-layout and bit-depth aware upscaling (grayscale, alpha, 16-bit) in one inference pass
+"""
+import cv2
+import numpy as np
+import torch
+from utils.batch_inference import forward_rgb
+
+# Extensions that can store an alpha channel / 16 bits per channel
+ALPHA_FORMATS = {".png", ".tif", ".tiff", ".webp"}
+HIGH_BIT_FORMATS = {".png", ".tif", ".tiff"}
+
+
+def describe_layout(img):
+    """Human-readable channel layout and bit depth, e.g. 'RGBA 16-bit'"""
+    channels = 1 if img.ndim == 2 else img.shape[2]
+    name = {1: "Grayscale", 2: "Grayscale + alpha", 3: "RGB", 4: "RGBA"}.get(channels, f"{channels}-channel")
+    return f"{name} {img.dtype.itemsize * 8}-bit"
+
+
+def is_plain_bgr(img):
+    """Whether an image is ordinary 3-channel 8-bit colour (eligible for batching)"""
+    return img.ndim == 3 and img.shape[2] == 3 and img.dtype == np.uint8
+
+
+def from_rgb(img):
+    """Reorder an RGB/RGBA array to OpenCV's BGR/BGRA (grayscale is returned as-is)"""
+    if img.ndim == 3 and img.shape[2] in (3, 4):
+        order = [2, 1, 0, 3] if img.shape[2] == 4 else [2, 1, 0]
+        return np.ascontiguousarray(img[..., order])
+    return img
+
+
+def to_rgb(img):
+    """Reorder a BGR/BGRA array to RGB/RGBA (the channel swap is its own inverse)"""
+    return from_rgb(img)
+
+
+def from_pil(image):
+    """
+    Convert a PIL image to a numpy array in OpenCV layout (BGR/BGRA/gray).
+    
+    Palette and other exotic modes are expanded first; 16-bit grayscale
+    stays 16-bit.
+    """
+    if image.mode in ("I;16", "I;16B", "I;16L", "I"):
+        return np.clip(np.array(image), 0, 65535).astype(np.uint16)
+    if image.mode == "L":
+        return np.array(image)
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = "A" in image.mode or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    
+    return from_rgb(np.array(image))
+
+
+def prepare_for_format(img, ext):
+    """Convert an image to what an output format can store (alpha, 16 bits, channel count)"""
+    ext = ext.lower()
+    if img.dtype.kind == "f":
+        max_value = 65535 if ext in HIGH_BIT_FORMATS else 255
+        img = (np.clip(img, 0, 1) * max_value).round().astype(np.uint16 if max_value == 65535 else np.uint8)
+    if img.ndim == 3 and img.shape[2] == 2:
+        # Encoders take gray, BGR or BGRA only
+        img = np.dstack([img[..., 0]] * 3 + [img[..., 1]]) if ext in ALPHA_FORMATS else img[..., 0]
+    if img.ndim == 3 and img.shape[2] == 4 and ext not in ALPHA_FORMATS:
+        img = img[..., :3]
+    if img.dtype == np.uint16 and ext not in HIGH_BIT_FORMATS:
+        img = (img.astype(np.float32) / 257.0).round().astype(np.uint8)
+    return img
+
+
+def enhance_image(upsampler, img, outscale=None, alpha_mode="resize"):
+    """
+    Upscale an image of any common layout with a single inference pass.
+    
+    Accepts OpenCV-layout grayscale, gray+alpha, BGR or BGRA images in 8 or
+    16 bits (or float in [0, 1]) and returns the same layout and bit depth.
+    The alpha channel is either resized cheaply ("resize") or folded into the
+    same forward pass as the colour as a second batch item ("model"), so
+    there is never a second model pass.
+    """
+    if upsampler.tile_size > 0 or upsampler.model is None:
+        # Tiled models use RealESRGANer's own handling, classical (draft) upsamplers take every layout as is
+        return upsampler.enhance(img, outscale=outscale,
+                                 alpha_upsampler="realesrgan" if alpha_mode == "model" else "bicubic")[0]
+    
+    if img.dtype == np.uint16:
+        max_value = 65535.0
+    elif img.dtype.kind == "f":
+        max_value = 1.0
+    else:
+        max_value = 255.0
+    height, width = img.shape[:2]
+    channels = 1 if img.ndim == 2 else img.shape[2]
+    
+    # Split colour and alpha, normalise to float RGB
+    alpha = None
+    if channels == 1:
+        color = np.repeat(img.reshape(height, width, 1), 3, axis=2)
+    elif channels == 2:
+        color = np.repeat(img[..., :1], 3, axis=2)
+        alpha = img[..., 1]
+    else:
+        color = img[..., 2::-1]  # BGR(A) -> RGB
+        if channels == 4:
+            alpha = img[..., 3]
+    
+    batch = [color.astype(np.float32) / max_value]
+    if alpha is not None and alpha_mode == "model":
+        batch.append(np.repeat(alpha[..., None].astype(np.float32) / max_value, 3, axis=2))
+    tensor = torch.from_numpy(np.ascontiguousarray(np.stack(batch).transpose(0, 3, 1, 2)))
+    output = forward_rgb(upsampler, tensor).float().clamp_(0, 1).permute(0, 2, 3, 1).cpu().numpy()
+    
+    out_height, out_width = output.shape[1:3]
+    color_out = output[0]
+    if channels <= 2:
+        color_out = cv2.cvtColor(color_out, cv2.COLOR_RGB2GRAY)[..., None]
+    else:
+        color_out = color_out[..., ::-1]  # RGB -> BGR
+    
+    if alpha is None:
+        result = color_out
+    else:
+        if alpha_mode == "model":
+            alpha_out = cv2.cvtColor(output[1], cv2.COLOR_RGB2GRAY)
+        else:
+            alpha_out = cv2.resize(alpha.astype(np.float32) / max_value, (out_width, out_height),
+                                   interpolation=cv2.INTER_LINEAR)
+        result = np.concatenate([color_out, alpha_out[..., None]], axis=2)
+    
+    result = result * max_value
+    if img.dtype.kind != "f":
+        result = result.round().astype(img.dtype)
+    if channels == 1:
+        result = result[..., 0]
+    
+    if outscale is not None and outscale != upsampler.scale:
+        result = cv2.resize(result, (int(width * outscale), int(height * outscale)),
+                            interpolation=cv2.INTER_LANCZOS4)
+    return result
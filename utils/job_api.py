@@ -0,0 +1,368 @@
+"""
+Job API
+HTTP job interface with Server-Sent Events progress streaming, independent of Gradio
+
+Endpoints:
+    POST /jobs                         Submit {"input_path", "model", "device", "fps", "temporal", "renditions",
+                                       "target", "auto_model", "face_enhance", "start", "end", "lut",
+                                       "draft_under_load"}
+    GET  /jobs                         List jobs
+    GET  /jobs/<id>                    Job status
+    GET  /jobs/<id>/events             Progress events as an SSE stream (honours Last-Event-ID)
+    GET  /jobs/<id>/segments           Segments of the live HLS stream encoded so far
+    GET  /jobs/<id>/files/<path>       Download a segment, the playlist or a finished output
+"""
+import json
+import queue
+import shutil
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from config.config import (MODELS, RENDITIONS, JOB_STREAM_RENDITION, TARGET_RESOLUTIONS, DRAFT_FALLBACK_QUEUE_DEPTH,
+                           JOB_RETENTION_COUNT, JOB_RETENTION_HOURS)
+from utils.video_encoder import rendition_filename, finished_segments
+from utils.model_factory import draft_model
+
+
+STREAM_RENDITION_NAME = "Stream"
+
+
+class Job:
+    """One upscaling job and its event history"""
+    
+    def __init__(self, job_id, request, job_dir):
+        self.id = job_id
+        self.request = request
+        self.job_dir = job_dir
+        self.status = "queued"
+        self.events = []
+        self.outputs = []
+        self.info = None
+        self.created = time.time()
+        self.finished_at = None
+        self.condition = threading.Condition()
+    
+    @property
+    def finished(self):
+        """Whether the job has stopped for good"""
+        return self.status in ("done", "failed")
+    
+    @property
+    def playlist_path(self):
+        """HLS playlist of the live stream"""
+        return self.job_dir / rendition_filename(STREAM_RENDITION_NAME, JOB_STREAM_RENDITION)
+    
+    def add_event(self, event):
+        """Append an event and wake up listeners"""
+        with self.condition:
+            self.events.append(dict(event, id=len(self.events), time=time.time()))
+            self.condition.notify_all()
+    
+    def set_status(self, status):
+        """Update status and wake up listeners"""
+        with self.condition:
+            self.status = status
+            if self.finished:
+                self.finished_at = time.time()
+            self.condition.notify_all()
+    
+    def wait_events(self, after, timeout):
+        """Return events with id >= after, waiting up to timeout for new ones"""
+        with self.condition:
+            if len(self.events) <= after and not self.finished:
+                self.condition.wait(timeout)
+            return self.events[after:]
+    
+    def to_dict(self):
+        """JSON-friendly job summary"""
+        last = self.events[-1] if self.events else {}
+        return {
+            "id": self.id,
+            "status": self.status,
+            "request": self.request,
+            "created": self.created,
+            "last_event": last,
+            "outputs": self.outputs,
+            "info": self.info
+        }
+
+
+class JobManager:
+    """
+    Queues video jobs and runs them one at a time on the shared upscaler.
+    
+    Finished jobs are kept for listing and downloads until there are more
+    than retention_count of them or they are older than retention_hours;
+    then the job and its directory are deleted.
+    """
+    
+    def __init__(self, upscaler, temp_manager, retention_count=JOB_RETENTION_COUNT,
+                 retention_hours=JOB_RETENTION_HOURS):
+        self.upscaler = upscaler
+        self.temp_manager = temp_manager
+        self.retention_count = retention_count
+        self.retention_seconds = retention_hours * 3600
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._worker, name="job-worker", daemon=True)
+        self.worker.start()
+    
+    def submit(self, request):
+        """Validate a request and queue it, returning the Job"""
+        input_path = request.get("input_path")
+        if not input_path or not Path(input_path).is_file():
+            raise ValueError(f"Input file not found: {input_path}")
+        model_name = request.setdefault("model", "RealESRGAN_x4plus")
+        if model_name not in MODELS:
+            raise ValueError(f"Unknown model: {model_name}")
+        for name in request.get("renditions") or []:
+            if name not in RENDITIONS:
+                raise ValueError(f"Unknown rendition: {name}")
+        if request.get("target") and request["target"] not in TARGET_RESOLUTIONS:
+            raise ValueError(f"Unknown target resolution: {request['target']}")
+        request.setdefault("device", self.upscaler.device_manager.current_device)
+        
+        job_id = uuid.uuid4().hex[:12]
+        job = Job(job_id, request, self.temp_manager.create_temp_subdir(f"jobs/{job_id}"))
+        self.prune()
+        with self.jobs_lock:
+            self.jobs[job_id] = job
+        job.add_event({"stage": "queued", "progress": 0})
+        self.queue.put(job)
+        return job
+    
+    def get(self, job_id):
+        """Get a job by id"""
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+    
+    def list_jobs(self):
+        """All jobs, oldest first"""
+        with self.jobs_lock:
+            return list(self.jobs.values())
+    
+    def prune(self):
+        """Delete finished jobs past the retention count or age, with their directories"""
+        now = time.time()
+        with self.jobs_lock:
+            finished = sorted((job for job in self.jobs.values() if job.finished), key=lambda job: job.finished_at)
+            expired = finished[:max(len(finished) - self.retention_count, 0)]
+            expired += [job for job in finished[len(expired):] if now - job.finished_at > self.retention_seconds]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+        return len(expired)
+    
+    def _worker(self):
+        """Run queued jobs in order"""
+        while True:
+            job = self.queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                job.add_event({"stage": "error", "message": str(e)})
+                job.set_status("failed")
+            self.prune()
+    
+    def _run(self, job):
+        """Run one job on the upscaler"""
+        request = job.request
+        names = request.get("renditions") or [name for name, spec in RENDITIONS.items() if spec.get("default")]
+        renditions = {name: RENDITIONS[name] for name in names}
+        renditions[STREAM_RENDITION_NAME] = JOB_STREAM_RENDITION
+        
+        # Under a long queue, jobs that opted in trade quality for getting through it quickly
+        model_name = request["model"]
+        fallback = None
+        waiting = self.queue.qsize()
+        if request.get("draft_under_load") and waiting >= DRAFT_FALLBACK_QUEUE_DEPTH:
+            draft = draft_model(MODELS[model_name]["scale"])
+            if draft is not None and draft != model_name:
+                fallback = f"Draft fallback: {waiting} job(s) queued, ran {draft} instead of {model_name}"
+                job.add_event({"stage": "draft_fallback", "progress": 0, "model": draft,
+                               "requested_model": model_name, "queued": waiting})
+                model_name = draft
+        
+        device_manager = self.upscaler.device_manager
+        with self.upscaler.processing_lock, device_manager.device_slot(kinds=[request["device"]]) as device_id:
+            job.set_status("running")
+            job.add_event({"stage": "placed", "progress": 0, "device": device_id})
+            
+            # Drop renditions from a previous job
+            renditions_dir = self.temp_manager.get_temp_file_path("renditions")
+            if renditions_dir.exists():
+                shutil.rmtree(renditions_dir)
+            
+            # Run on the device the job was placed on (e.g. the least-loaded of several GPUs)
+            device_manager.pin_device(device_id)
+            try:
+                result, info = self.upscaler.upscale_video(
+                    request["input_path"], model_name, request["device"], request.get("fps"),
+                    progress=lambda *args, **kwargs: None,
+                    temporal=bool(request.get("temporal")),
+                    renditions=renditions,
+                    on_event=job.add_event,
+                    work_dir=job.job_dir,
+                    target=request.get("target"),
+                    auto_model=bool(request.get("auto_model")),
+                    face_enhance=bool(request.get("face_enhance")),
+                    start_time=request.get("start"),
+                    end_time=request.get("end"),
+                    lut=request.get("lut")
+                )
+            finally:
+                device_manager.unpin_device()
+            job.info = f"{info}\n{fallback}" if fallback else info
+            if result is None:
+                job.set_status("failed")
+                return
+            
+            # Keep finished outputs with the job, the fixed temp paths are reused by the next one
+            outputs = [Path(result)]
+            if renditions_dir.exists():
+                outputs += sorted(path for path in renditions_dir.iterdir() if path.is_file())
+            for path in outputs:
+                shutil.move(str(path), str(job.job_dir / path.name))
+                job.outputs.append(path.name)
+        
+        job.add_event({"stage": "complete", "progress": 1.0, "outputs": job.outputs})
+        job.set_status("done")
+
+
+class JobAPIServer:
+    """Threaded HTTP server exposing a JobManager"""
+    
+    def __init__(self, manager, host, port, keepalive_seconds=15):
+        self.manager = manager
+        self.keepalive_seconds = keepalive_seconds
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def url(self):
+        """Base URL of the server"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="job-api", daemon=True)
+        self.thread.start()
+        print(f"✓ Job API listening on {self.url}")
+    
+    def stop(self):
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def _make_handler(self):
+        """Build the request handler class bound to this server"""
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                # Keep the terminal for job output
+                pass
+            
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _get_job(self, job_id):
+                job = server.manager.get(job_id)
+                if job is None:
+                    self._send_json({"error": f"Unknown job: {job_id}"}, 404)
+                return job
+            
+            def do_POST(self):
+                if self.path.rstrip("/") != "/jobs":
+                    return self._send_json({"error": "Not found"}, 404)
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    job = server.manager.submit(request)
+                except (ValueError, json.JSONDecodeError) as e:
+                    return self._send_json({"error": str(e)}, 400)
+                self._send_json(job.to_dict(), 201)
+            
+            def do_GET(self):
+                parts = [part for part in self.path.split("?")[0].split("/") if part]
+                if parts == ["jobs"]:
+                    return self._send_json([job.to_dict() for job in server.manager.list_jobs()])
+                if len(parts) < 2 or parts[0] != "jobs":
+                    return self._send_json({"error": "Not found"}, 404)
+                
+                job = self._get_job(parts[1])
+                if job is None:
+                    return
+                if len(parts) == 2:
+                    return self._send_json(job.to_dict())
+                if parts[2] == "events":
+                    return self._stream_events(job)
+                if parts[2] == "segments":
+                    return self._send_json({
+                        "playlist": f"/jobs/{job.id}/files/{job.playlist_path.relative_to(job.job_dir).as_posix()}",
+                        "segments": finished_segments(job.playlist_path),
+                        "complete": job.finished
+                    })
+                if parts[2] == "files" and len(parts) > 3:
+                    return self._send_file(job, "/".join(parts[3:]))
+                self._send_json({"error": "Not found"}, 404)
+            
+            def _send_file(self, job, relative_path):
+                # Segments live next to the playlist
+                base = job.job_dir.resolve()
+                path = (base / relative_path).resolve()
+                if not path.is_file():
+                    path = (job.playlist_path.parent / relative_path).resolve()
+                if base not in path.parents or not path.is_file():
+                    return self._send_json({"error": "File not found"}, 404)
+                
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(path.stat().st_size))
+                self.end_headers()
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, self.wfile)
+            
+            def _stream_events(self, job):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                
+                # Resume after the last event the client saw; a malformed id replays everything
+                try:
+                    next_id = max(int(self.headers.get("Last-Event-ID", -1)) + 1, 0)
+                except ValueError:
+                    next_id = 0
+                try:
+                    self.wfile.write(b"retry: 2000\n\n")
+                    while True:
+                        events = job.wait_events(next_id, server.keepalive_seconds)
+                        for event in events:
+                            message = f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+                            self.wfile.write(message.encode("utf-8"))
+                            next_id = event["id"] + 1
+                        if not events:
+                            if job.finished:
+                                break
+                            self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+        
+        return Handler
@@ -0,0 +1,276 @@
+"""
+Media Index
+Content-sniffed media metadata, probed in parallel and cached on disk by path, size and modification time
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import ffmpeg
+from PIL import Image
+from config.config import MEDIA_INDEX_FILE, MEDIA_PROBE_WORKERS, MEDIA_INDEX_SAVE_INTERVAL
+
+# Bumped when the stored fields change, older entries are re-probed
+INDEX_VERSION = 1
+
+# ISO-BMFF brands of still images (HEIF/AVIF), everything else with an ftyp box is video
+IMAGE_BRANDS = {b"heic", b"heix", b"mif1", b"msf1", b"avif", b"avis"}
+
+
+def sniff_type(path):
+    """
+    ("image" | "video", format) from a file's leading bytes, or (None, None).
+    
+    Magic numbers, not extensions: a PNG saved as .jpg or a video without an
+    extension are still recognised.
+    """
+    with open(path, "rb") as f:
+        head = f.read(512)
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image", "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image", "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image", "webp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image", "tiff"
+    if head[:2] == b"BM" and len(head) >= 26:
+        return "image", "bmp"
+    if head[4:8] == b"ftyp":
+        if head[8:12] in IMAGE_BRANDS:
+            return None, None
+        return "video", "mov" if head[8:12] == b"qt  " else "mp4"
+    if head[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+        return "video", "mov"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video", "webm" if b"webm" in head[:64] else "mkv"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video", "avi"
+    if head.startswith(b"FLV"):
+        return "video", "flv"
+    if head.startswith(b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"):
+        return "video", "wmv"
+    if len(head) > 376 and head[0] == head[188] == head[376] == 0x47:
+        return "video", "ts"
+    return None, None
+
+
+def _frame_rate(rate):
+    """ffprobe rational ("30000/1001") to float"""
+    try:
+        num, _, den = str(rate).partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def probe_video(path):
+    """Display size, frame rate, frame count, duration and streams of a video"""
+    probe = ffmpeg.probe(str(path))
+    video = next((stream for stream in probe["streams"] if stream["codec_type"] == "video"
+                  and not stream.get("disposition", {}).get("attached_pic")), None)
+    if video is None:
+        raise ValueError("No video stream")
+    width, height = int(video.get("width", 0)), int(video.get("height", 0))
+    # Decoders apply rotation metadata, report the size frames come out at
+    rotation = int(float(video.get("tags", {}).get("rotate", 0) or 0))
+    for side_data in video.get("side_data_list", []):
+        rotation = int(float(side_data.get("rotation", rotation)))
+    if abs(rotation) % 180 == 90:
+        width, height = height, width
+    
+    fps = _frame_rate(video.get("avg_frame_rate")) or _frame_rate(video.get("r_frame_rate"))
+    duration = float(video.get("duration") or probe["format"].get("duration") or 0)
+    frames = int(video.get("nb_frames") or 0) or int(round(duration * fps))
+    streams = [{
+        "index": stream["index"],
+        "codec_type": stream.get("codec_type"),
+        "codec_name": stream.get("codec_name"),
+        "tags": {"language": stream["tags"]["language"]} if stream.get("tags", {}).get("language") else {},
+        "disposition": {"attached_pic": stream.get("disposition", {}).get("attached_pic", 0)}
+    } for stream in probe["streams"]]
+    return {
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "frames": frames,
+        "duration": duration,
+        "codec": video.get("codec_name"),
+        "has_audio": any(stream["codec_type"] == "audio" for stream in streams),
+        "streams": streams
+    }
+
+
+def probe_image(path):
+    """Size and mode (layout, bit depth) of an image from its header, pixels are not decoded"""
+    with Image.open(path) as img:
+        width, height = img.size
+        mode = img.mode
+    return {"width": width, "height": height, "mode": mode, "frames": 1, "duration": 0.0}
+
+
+def probe_file(path):
+    """Metadata of one file: type and format by content, then type-specific fields"""
+    entry = {"type": None, "format": None}
+    try:
+        entry["type"], entry["format"] = sniff_type(path)
+        if entry["type"] == "video":
+            entry.update(probe_video(path))
+        elif entry["type"] == "image":
+            entry.update(probe_image(path))
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+
+class MediaIndex:
+    """
+    Persistent metadata cache for media files.
+    
+    Entries are keyed by resolved path and stay valid while the file's size
+    and modification time match, so re-scanning a library only probes new
+    and changed files. Stale files are probed on a thread pool (ffprobe runs
+    as a subprocess, so threads overlap fully).
+    
+    Scans save once at the end. Single-file lookups save at most every
+    save_interval seconds; anything still unsaved is written on exit.
+    """
+    
+    def __init__(self, index_file=MEDIA_INDEX_FILE, max_workers=MEDIA_PROBE_WORKERS,
+                 save_interval=MEDIA_INDEX_SAVE_INTERVAL):
+        self.index_file = index_file
+        self.max_workers = max_workers
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+        # One save at a time: they share the temp file and must not replace a newer index
+        self.save_lock = threading.Lock()
+        self.entries = self._load()
+        self.stats = {"cached": 0, "probed": 0}
+        self.dirty = False
+        self.last_save = 0.0
+        
+        atexit.register(self.flush)
+    
+    def _load(self):
+        """Load the index from disk"""
+        try:
+            if self.index_file.exists():
+                with open(self.index_file, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    return data["files"]
+        except Exception as e:
+            print(f"Warning: Could not load media index: {e}")
+        return {}
+    
+    def _save(self):
+        """Write the index to disk"""
+        try:
+            self.index_file.parent.mkdir(exist_ok=True, parents=True)
+            # Write-then-rename so concurrent worker processes never see a partial file
+            temp_file = self.index_file.with_suffix(f".{os.getpid()}.tmp")
+            with self.save_lock:
+                with self.lock:
+                    data = {"version": INDEX_VERSION, "files": dict(self.entries)}
+                    self.dirty = False
+                    self.last_save = time.monotonic()
+                with open(temp_file, "w") as f:
+                    json.dump(data, f)
+                os.replace(temp_file, self.index_file)
+        except Exception as e:
+            print(f"Warning: Could not save media index: {e}")
+    
+    def flush(self):
+        """Save entries added since the last save"""
+        if self.dirty:
+            self._save()
+    
+    @staticmethod
+    def _key(path):
+        """Index key and current (size, mtime) of a file"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        return str(path), stat.st_size, stat.st_mtime_ns
+    
+    def _cached(self, key, size, mtime):
+        """The stored entry if the file is unchanged, else None"""
+        entry = self.entries.get(key)
+        if entry is not None and entry["size"] == size and entry["mtime"] == mtime:
+            return entry
+        return None
+    
+    def _probe(self, key, size, mtime):
+        """Probe a file and store the result"""
+        entry = probe_file(key)
+        entry.update(size=size, mtime=mtime)
+        with self.lock:
+            self.entries[key] = entry
+            self.stats["probed"] += 1
+            self.dirty = True
+        return entry
+    
+    def get(self, path):
+        """Metadata of one file, probing it only if it is new or changed"""
+        key, size, mtime = self._key(path)
+        entry = self._cached(key, size, mtime)
+        if entry is not None:
+            self.stats["cached"] += 1
+            return entry
+        entry = self._probe(key, size, mtime)
+        # Batch jobs look files up one by one, don't rewrite the whole index after each
+        if time.monotonic() - self.last_save >= self.save_interval:
+            self._save()
+        return entry
+    
+    def scan(self, paths, on_progress=None):
+        """
+        Metadata of many files as {path: entry}, probing stale ones in parallel.
+        
+        Unreadable paths map to an entry with type None and an error.
+        on_progress(done, total) is called as probes finish.
+        """
+        results = {}
+        stale = []
+        for path in paths:
+            try:
+                key, size, mtime = self._key(path)
+            except OSError as e:
+                results[path] = {"type": None, "format": None, "error": str(e)}
+                continue
+            entry = self._cached(key, size, mtime)
+            if entry is None:
+                stale.append((path, key, size, mtime))
+            else:
+                results[path] = entry
+                self.stats["cached"] += 1
+        
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [(path, pool.submit(self._probe, key, size, mtime)) for path, key, size, mtime in stale]
+                for done, (path, future) in enumerate(futures, 1):
+                    results[path] = future.result()
+                    if on_progress is not None:
+                        on_progress(done, len(stale))
+            self._save()
+        return results
+    
+    def scan_directory(self, root, on_progress=None):
+        """Scan every file below a directory (hidden files and folders are skipped)"""
+        paths = []
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+            paths.extend(os.path.join(directory, name) for name in filenames if not name.startswith("."))
+        return self.scan(paths, on_progress)
+    
+    def prune(self):
+        """Forget files that no longer exist, returns how many were removed"""
+        with self.lock:
+            missing = [key for key in self.entries if not os.path.exists(key)]
+            for key in missing:
+                del self.entries[key]
+        if missing:
+            self._save()
+        return len(missing)
@@ -0,0 +1,71 @@
+"""
+Model Factory
+Builds upscaling networks and upsamplers from the architecture each entry of config.MODELS declares
+"""
+from basicsr.archs.rrdbnet_arch import RRDBNet
+from realesrgan import RealESRGANer
+from realesrgan.archs.srvgg_arch import SRVGGNetCompact
+from config.config import MODELS
+from utils.classical_upscale import ClassicalUpsampler
+
+
+def build_rrdbnet(config):
+    """RRDBNet (ESRGAN): residual-in-residual dense blocks, strongest restoration, heaviest to run"""
+    return RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=config.get("num_feat", 64),
+                   num_block=config.get("num_block", 23), num_grow_ch=32, scale=config["scale"])
+
+
+def build_srvgg(config):
+    """SRVGGNetCompact: plain conv stack at input resolution plus pixel shuffle, an order of magnitude cheaper"""
+    return SRVGGNetCompact(num_in_ch=3, num_out_ch=3, num_feat=config.get("num_feat", 64),
+                           num_conv=config.get("num_conv", 32), upscale=config["scale"], act_type="prelu")
+
+
+# Architecture name (MODELS[...]["architecture"]) -> network builder
+ARCHITECTURES = {
+    "rrdbnet": build_rrdbnet,
+    "srvgg": build_srvgg
+}
+
+
+def model_architecture(model_name):
+    """Architecture of a registered model (RRDBNet unless stated otherwise)"""
+    return MODELS[model_name].get("architecture", "rrdbnet")
+
+
+def build_network(model_name):
+    """Instantiate the (untrained) network for a registered model"""
+    architecture = model_architecture(model_name)
+    if architecture not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture '{architecture}' for model {model_name}")
+    return ARCHITECTURES[architecture](MODELS[model_name])
+
+
+def is_draft(model_name):
+    """Whether a model is a classical (no network) draft-quality resampler"""
+    return model_architecture(model_name) == "classical"
+
+
+def draft_model(scale):
+    """Cheapest draft model of an upscale factor, or None"""
+    drafts = [name for name, info in MODELS.items() if info["scale"] == scale and is_draft(name)]
+    return min(drafts, key=lambda name: MODELS[name].get("relative_cost", 1.0), default=None)
+
+
+def create_upsampler(model_name, torch_device, tile=0):
+    """Build a RealESRGAN upsampler for a model on a torch device (weights are downloaded on first use)"""
+    model_config = MODELS[model_name]
+    if is_draft(model_name):
+        # No network and no weights, OpenCV resamples on the CPU whatever the device
+        return ClassicalUpsampler(model_config["scale"], model_config.get("interpolation", "lanczos"),
+                                  model_config.get("sharpen", 0.6))
+    return RealESRGANer(
+        scale=model_config["scale"],
+        model_path=model_config["url"],
+        model=build_network(model_name),
+        tile=tile,
+        tile_pad=10,
+        pre_pad=0,
+        half=str(torch_device) != "cpu",
+        device=str(torch_device)
+    )
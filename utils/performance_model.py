@@ -0,0 +1,170 @@
+"""
+Performance Model
+Learns upscaling throughput per (model, device, resolution, tile size) from past jobs
+to predict job duration before and during processing
+"""
+import json
+import os
+import threading
+import time
+from config.config import PERFORMANCE_FILE
+
+
+class PerformanceModel:
+    """Stores per-hardware throughput history and predicts job durations"""
+    
+    # Weight of the newest job in the running average
+    SMOOTHING = 0.3
+    
+    def __init__(self, history_file=PERFORMANCE_FILE):
+        self.history_file = history_file
+        self.lock = threading.Lock()
+        self.entries = self._load()
+    
+    def _load(self):
+        """Load history from disk"""
+        try:
+            if self.history_file.exists():
+                with open(self.history_file, "r") as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load performance history: {e}")
+        return {}
+    
+    def _save(self):
+        """Write history to disk"""
+        try:
+            self.history_file.parent.mkdir(exist_ok=True, parents=True)
+            # Write-then-rename so concurrent worker processes never see a partial file
+            temp_file = self.history_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_file, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(temp_file, self.history_file)
+        except Exception as e:
+            print(f"Warning: Could not save performance history: {e}")
+    
+    @staticmethod
+    def make_key(model_name, device, width, height, tile=0):
+        """Key identifying one performance bucket"""
+        return f"{model_name}|{device}|{width}x{height}|tile{tile}"
+    
+    def record(self, model_name, device, width, height, frames, seconds, tile=0):
+        """Record a finished job (or sample) of `frames` frames taking `seconds`"""
+        if frames <= 0 or seconds <= 0:
+            return
+        
+        seconds_per_frame = seconds / frames
+        key = self.make_key(model_name, device, width, height, tile)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = {
+                    "model": model_name,
+                    "device": device,
+                    "width": width,
+                    "height": height,
+                    "tile": tile,
+                    "seconds_per_frame": seconds_per_frame,
+                    "frames": 0,
+                    "jobs": 0
+                }
+            else:
+                entry["seconds_per_frame"] += self.SMOOTHING * (seconds_per_frame - entry["seconds_per_frame"])
+            entry["frames"] += frames
+            entry["jobs"] += 1
+            entry["updated"] = time.time()
+            self.entries[key] = entry
+            self._save()
+    
+    def seconds_per_frame(self, model_name, device, width, height, tile=0):
+        """
+        Predicted seconds per frame, or None if nothing comparable was seen.
+        
+        Exact buckets are used as-is. Otherwise the time is scaled by pixel
+        count from other resolutions of the same model on the same device.
+        """
+        with self.lock:
+            entry = self.entries.get(self.make_key(model_name, device, width, height, tile))
+            if entry is not None:
+                return entry["seconds_per_frame"]
+            
+            # Frame-weighted average of seconds per pixel across other resolutions
+            weighted = 0.0
+            total_frames = 0
+            for entry in self.entries.values():
+                if entry["model"] == model_name and entry["device"] == device:
+                    pixels = entry["width"] * entry["height"]
+                    weighted += entry["seconds_per_frame"] / pixels * entry["frames"]
+                    total_frames += entry["frames"]
+        
+        if total_frames == 0:
+            return None
+        return weighted / total_frames * width * height
+    
+    def predict(self, model_name, device, width, height, frames, tile=0):
+        """Predicted job duration in seconds, or None if unknown"""
+        seconds_per_frame = self.seconds_per_frame(model_name, device, width, height, tile)
+        if seconds_per_frame is None:
+            return None
+        return seconds_per_frame * frames
+    
+    def live_estimator(self, model_name, device, width, height, total_frames, tile=0):
+        """Create a live ETA estimator seeded with the prediction for this job"""
+        prior = self.seconds_per_frame(model_name, device, width, height, tile)
+        return LiveEstimator(total_frames, prior)
+
+
+class LiveEstimator:
+    """
+    Live ETA that blends the prior prediction with observed frame times.
+    
+    The prior counts as `prior_weight` frames, so early noisy frames (and the
+    model warm-up) do not swing the estimate. The first update is treated as
+    warm-up and only used until real measurements arrive.
+    """
+    
+    def __init__(self, total_frames, prior_seconds_per_frame=None, prior_weight=10):
+        self.total_frames = total_frames
+        self.prior = prior_seconds_per_frame
+        self.prior_weight = prior_weight if prior_seconds_per_frame is not None else 0
+        self.processed = 0
+        self.frames = 0
+        self.seconds = 0.0
+        self.warmup_seconds = None
+    
+    def update(self, frame_seconds, frames=1):
+        """Add processed frames and their processing time"""
+        self.processed += frames
+        if self.warmup_seconds is None:
+            self.warmup_seconds = frame_seconds / frames
+            return
+        self.frames += frames
+        self.seconds += frame_seconds
+    
+    def seconds_per_frame(self):
+        """Current blended estimate, or None before any data"""
+        if self.frames == 0 and self.prior is None:
+            return self.warmup_seconds
+        prior_total = (self.prior or 0.0) * self.prior_weight
+        return (prior_total + self.seconds) / (self.prior_weight + self.frames)
+    
+    def eta(self):
+        """Estimated seconds remaining, or None if unknown"""
+        seconds_per_frame = self.seconds_per_frame()
+        if seconds_per_frame is None:
+            return None
+        return max(self.total_frames - self.processed, 0) * seconds_per_frame
+
+
+def format_duration(seconds):
+    """Format seconds as a short human readable duration"""
+    if seconds is None:
+        return "unknown"
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
@@ -0,0 +1,21 @@
+"""
+Progress Helpers
+Rate limiting for progress callbacks, terminal output and job events
+"""
+import time
+
+
+class ProgressThrottle:
+    """Lets an update through at most once per interval"""
+    
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.last_update = None
+    
+    def ready(self, force=False):
+        """Return True if an update may be sent now"""
+        now = time.monotonic()
+        if force or self.last_update is None or now - self.last_update >= self.interval:
+            self.last_update = now
+            return True
+        return False
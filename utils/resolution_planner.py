@@ -0,0 +1,135 @@
+"""
+Resolution Planner
+Plans the cheapest model route to a requested output resolution instead of upscaling past it
+"""
+import cv2
+from config.config import MODELS
+
+
+def resolve_target(width, height, target):
+    """
+    Output size and source region for a target spec.
+    
+    target is {"scale": s}, {"height": h} (width follows the aspect ratio) or
+    {"width": w, "height": h, "mode": "fill"} (centre crop to that aspect).
+    Returns ((output width, output height), (x, y, w, h) source region).
+    """
+    region = (0, 0, width, height)
+    if "scale" in target:
+        out_width, out_height = width * target["scale"], height * target["scale"]
+    elif target.get("mode") == "fill":
+        out_width, out_height = target["width"], target["height"]
+        # Largest centred source region with the target's aspect ratio
+        crop_width = min(width, round(height * out_width / out_height))
+        crop_height = min(height, round(width * out_height / out_width))
+        region = ((width - crop_width) // 2, (height - crop_height) // 2, crop_width, crop_height)
+    else:
+        out_height = target["height"]
+        out_width = width * out_height / height
+    # Encoders want even dimensions
+    return (int(round(out_width / 2)) * 2, int(round(out_height / 2)) * 2), region
+
+
+def model_family(model_name):
+    """Models that give the same look and can stand in for each other"""
+    family = MODELS[model_name].get("family", model_name)
+    return [name for name, info in MODELS.items() if info.get("family", name) == family]
+
+
+def plan_route(width, height, target, model_name, cost_of=None, min_prescale=0.5, prescale_penalty=1.0):
+    """
+    Pick the cheapest way to produce the target output.
+    
+    Candidates are every model of the selected model's family, each either
+    run as-is or on a pre-downscaled input (down to min_prescale) so it lands
+    on the target directly, and only on the region that survives a crop.
+    cost_of(model_name, width, height) may return measured seconds per frame
+    (None if unknown); otherwise MODELS' relative_cost per input pixel is used.
+    Pre-downscaling throws input detail away, so when ranking routes its cost
+    counts up to (1 + prescale_penalty) times higher. The baseline is what a
+    plain run costs: the selected model on the full frame.
+    """
+    (out_width, out_height), region = resolve_target(width, height, target)
+    _, _, region_width, region_height = region
+    needed = max(out_width / region_width, out_height / region_height)
+    
+    def cost(name, in_width, in_height):
+        if cost_of is not None:
+            seconds = cost_of(name, in_width, in_height)
+            if seconds is not None:
+                return seconds
+        return MODELS[name].get("relative_cost", 1.0) * in_width * in_height
+    
+    baseline = cost(model_name, width, height)
+    routes = []
+    for name in model_family(model_name):
+        scale = MODELS[name]["scale"]
+        prescale = min(needed / scale, 1.0)
+        if prescale < min_prescale:
+            continue
+        in_width = max(int(round(region_width * prescale)), 1)
+        in_height = max(int(round(region_height * prescale)), 1)
+        routes.append({
+            "model": name,
+            "region": None if region == (0, 0, width, height) else region,
+            "prescale": prescale,
+            "input_size": (in_width, in_height),
+            "model_output": (in_width * scale, in_height * scale),
+            "output_size": (out_width, out_height),
+            "cost": cost(name, in_width, in_height),
+            # Upscaling to the target after the model loses detail, keep it as a last resort
+            "undershoots": scale * prescale < needed - 1e-6
+        })
+    
+    if not routes:
+        # Nothing in the family fits: fall back to the selected model on the full region
+        scale = MODELS[model_name]["scale"]
+        routes.append({
+            "model": model_name, "region": None if region == (0, 0, width, height) else region,
+            "prescale": 1.0, "input_size": (region_width, region_height),
+            "model_output": (region_width * scale, region_height * scale),
+            "output_size": (out_width, out_height),
+            "cost": cost(model_name, region_width, region_height), "undershoots": scale < needed
+        })
+    
+    # Cheapest first; prefer routes that reach the target natively and discard less input
+    plan = min(routes, key=lambda route: (route["undershoots"],
+                                          route["cost"] * (1 + prescale_penalty * (1 - route["prescale"])),
+                                          -route["prescale"]))
+    plan["baseline_cost"] = baseline
+    plan["saved"] = max(1 - plan["cost"] / baseline, 0.0) if baseline else 0.0
+    return plan
+
+
+def describe_plan(plan):
+    """One-line summary of a plan for the UI"""
+    steps = []
+    if plan["region"] is not None:
+        x, y, w, h = plan["region"]
+        steps.append(f"crop {w}x{h}")
+    if plan["prescale"] < 1.0:
+        steps.append(f"pre-scale to {plan['input_size'][0]}x{plan['input_size'][1]}")
+    steps.append(f"{plan['model']} → {plan['model_output'][0]}x{plan['model_output'][1]}")
+    if plan["model_output"] != plan["output_size"]:
+        steps.append(f"resize to {plan['output_size'][0]}x{plan['output_size'][1]}")
+    return " → ".join(steps) + f" (≈{plan['saved'] * 100:.0f}% less compute)"
+
+
+def prepare_input(frame, plan):
+    """Crop and pre-scale a source frame for the planned model"""
+    if plan["region"] is not None:
+        x, y, w, h = plan["region"]
+        frame = frame[y:y + h, x:x + w]
+    if plan["prescale"] < 1.0:
+        frame = cv2.resize(frame, plan["input_size"], interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def finish_output(output, plan):
+    """Resize the model's output to the exact target size"""
+    out_width, out_height = plan["output_size"]
+    if output.shape[1] == out_width and output.shape[0] == out_height:
+        return output
+    shrinking = output.shape[1] > out_width
+    return cv2.resize(output, (out_width, out_height),
+                      interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4)
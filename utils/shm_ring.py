@@ -0,0 +1,130 @@
+"""
+Shared Memory Ring
+Fixed-slot ring buffer for handing frames between processes without pickling
+"""
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Single-producer / single-consumer ring of frame slots in shared memory.
+    
+    Each slot holds one frame of a fixed geometry plus its sequence number.
+    Two semaphores provide backpressure: the producer blocks when all slots
+    are full, the consumer blocks when all are empty. Frames are read and
+    written in place through numpy views, so nothing is pickled or copied
+    through a pipe.
+    
+    Create the ring in the parent, pass it to child processes as a Process
+    argument (it pickles to its shared memory name and semaphores), and call
+    close() everywhere and unlink() once in the owner.
+    """
+    
+    HEADER_DTYPE = np.int64
+    
+    def __init__(self, frame_shape, num_slots=4, dtype=np.uint8, context=None, _state=None):
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.num_slots = num_slots
+        self.frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        # Slot layout: [sequence number (int64)] [frame bytes], 64-byte aligned
+        header_bytes = np.dtype(self.HEADER_DTYPE).itemsize
+        self.slot_bytes = -(-(header_bytes + self.frame_bytes) // 64) * 64
+        
+        if _state is None:
+            context = context or mp.get_context("spawn")
+            self.block = shared_memory.SharedMemory(create=True, size=self.slot_bytes * num_slots)
+            self.free_slots = context.Semaphore(num_slots)
+            self.filled_slots = context.Semaphore(0)
+            self.owner = True
+        else:
+            self.block = shared_memory.SharedMemory(name=_state["name"])
+            self.free_slots = _state["free_slots"]
+            self.filled_slots = _state["filled_slots"]
+            self.owner = False
+        
+        self._frames = []
+        self._sequences = []
+        for slot in range(num_slots):
+            offset = slot * self.slot_bytes
+            self._sequences.append(np.ndarray((1,), dtype=self.HEADER_DTYPE, buffer=self.block.buf, offset=offset))
+            self._frames.append(np.ndarray(self.frame_shape, dtype=self.dtype, buffer=self.block.buf,
+                                           offset=offset + header_bytes))
+        self.write_index = 0
+        self.read_index = 0
+    
+    def __reduce__(self):
+        """Pickle as a handle to the same shared memory and semaphores"""
+        state = {"name": self.block.name, "free_slots": self.free_slots, "filled_slots": self.filled_slots}
+        return (_attach_ring, (self.frame_shape, self.num_slots, self.dtype.str, state))
+    
+    def acquire_write(self, timeout=None):
+        """
+        Reserve the next free slot for writing.
+        
+        Returns a writable view of the slot's frame, or None on timeout. Fill
+        it in place and call commit_write() to publish it.
+        """
+        if not self.free_slots.acquire(timeout=timeout):
+            return None
+        return self._frames[self.write_index % self.num_slots]
+    
+    def commit_write(self, sequence):
+        """Publish the reserved slot with its sequence number"""
+        self._sequences[self.write_index % self.num_slots][0] = sequence
+        self.write_index += 1
+        self.filled_slots.release()
+    
+    def put(self, frame, sequence, timeout=None):
+        """Copy a frame into the next slot (the one copy a producer can't avoid)"""
+        slot = self.acquire_write(timeout)
+        if slot is None:
+            return False
+        slot[...] = frame
+        self.commit_write(sequence)
+        return True
+    
+    def acquire_read(self, timeout=None):
+        """
+        Wait for the next filled slot.
+        
+        Returns (sequence, view) or None on timeout. The view stays valid until
+        release_read() hands the slot back to the producer.
+        """
+        if not self.filled_slots.acquire(timeout=timeout):
+            return None
+        slot = self.read_index % self.num_slots
+        return int(self._sequences[slot][0]), self._frames[slot]
+    
+    def release_read(self):
+        """Return the slot being read to the producer"""
+        self.read_index += 1
+        self.free_slots.release()
+    
+    def get(self, timeout=None):
+        """Copy the next frame out of the ring, returning (sequence, frame) or None"""
+        item = self.acquire_read(timeout)
+        if item is None:
+            return None
+        sequence, view = item
+        frame = view.copy()
+        self.release_read()
+        return sequence, frame
+    
+    def close(self):
+        """Release this process's mapping"""
+        self._frames = []
+        self._sequences = []
+        self.block.close()
+    
+    def unlink(self):
+        """Free the shared memory (owner only, after all processes closed)"""
+        if self.owner:
+            self.block.unlink()
+
+
+def _attach_ring(frame_shape, num_slots, dtype, state):
+    """Rebuild a ring handle in another process"""
+    return SharedFrameRing(frame_shape, num_slots, dtype, _state=state)
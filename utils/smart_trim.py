@@ -0,0 +1,192 @@
+"""
+Smart Trimming
+Keyframe-aware cutting: stream copy between keyframes, re-encode only the partial GOPs at the cut points
+"""
+import shutil
+from pathlib import Path
+import ffmpeg
+from utils.stream_mux import CONTAINERS, ENCODER_ARGS
+
+# Encoders that produce streams which concatenate with a copied stream of the same codec
+REENCODERS = {"h264": "libx264", "hevc": "libx265"}
+# x264 profile names for the profiles ffprobe reports
+H264_PROFILES = {"Baseline": "baseline", "Constrained Baseline": "baseline", "Main": "main", "High": "high"}
+# Timestamps this close count as the same instant (well under one frame)
+TOLERANCE = 0.001
+
+
+def probe_video(path):
+    """
+    Codec parameters, duration and keyframe times of a video's first video stream.
+    
+    Keyframes come from packet flags, so the file is only demuxed, never
+    decoded. Times are relative to the container start, as ffmpeg's -ss is.
+    """
+    probe = ffmpeg.probe(str(path), select_streams="v:0", show_entries="packet=pts_time,flags")
+    if not probe.get("streams"):
+        raise ValueError(f"No video stream in {Path(path).name}")
+    stream = probe["streams"][0]
+    offset = float(probe["format"].get("start_time", 0) or 0)
+    keyframes = sorted(float(packet["pts_time"]) - offset for packet in probe.get("packets", [])
+                       if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A"))
+    return {
+        "codec": stream.get("codec_name"),
+        "profile": stream.get("profile"),
+        "level": stream.get("level"),
+        "pix_fmt": stream.get("pix_fmt", "yuv420p"),
+        "width": int(stream.get("width", 0)),
+        "height": int(stream.get("height", 0)),
+        "duration": float(probe["format"].get("duration", 0) or 0),
+        "keyframes": keyframes
+    }
+
+
+def plan_trim(keyframes, start, end, duration, mode="smart"):
+    """
+    Split the range [start, end) into ("copy" | "encode", from, to) segments.
+    
+    smart: copy from the first keyframe at or after start to the last one
+    before end, re-encode only the fragments outside them. fast: copy from
+    the keyframe at or before start (the cut may start early, nothing is
+    re-encoded). accurate: re-encode the whole range.
+    """
+    to_end = end >= duration - TOLERANCE
+    if mode == "accurate":
+        return [("encode", start, end)]
+    if mode == "fast":
+        snapped = max((k for k in keyframes if k <= start + TOLERANCE), default=0.0)
+        return [("copy", snapped, end)]
+    
+    first = next((k for k in keyframes if start - TOLERANCE <= k < end - TOLERANCE), None)
+    if first is None:
+        # The range lies inside one GOP
+        return [("encode", start, end)]
+    
+    segments = []
+    if first - start > TOLERANCE:
+        segments.append(("encode", start, first))
+    last = max(k for k in keyframes if first <= k < end + TOLERANCE)
+    if to_end or abs(end - last) <= TOLERANCE:
+        # The end falls on a keyframe (or the end of the file): copy all the way
+        segments.append(("copy", first, end))
+    else:
+        if last > first:
+            segments.append(("copy", first, last))
+        segments.append(("encode", last, end))
+    return segments
+
+
+def _encode_args(info, crf, preset):
+    """Encoder settings matching the source stream so encoded and copied segments join"""
+    args = {"vcodec": REENCODERS[info["codec"]], "crf": crf, "preset": preset, "pix_fmt": info["pix_fmt"]}
+    if info["codec"] == "h264":
+        if info["profile"] in H264_PROFILES:
+            args["profile:v"] = H264_PROFILES[info["profile"]]
+        if info["level"] and info["level"] > 0:
+            args["level"] = f"{info['level'] / 10:.1f}"
+    return args
+
+
+def _run(stream):
+    """Run an ffmpeg graph quietly, overwriting its output"""
+    stream.global_args("-loglevel", "error", "-nostats").overwrite_output().run(
+        quiet=True, capture_stdout=True, capture_stderr=True)
+
+
+def smart_trim(input_path, output_path, start, end=None, mode="smart", work_dir=None, crf=16, preset="medium"):
+    """
+    Cut [start, end) seconds out of a video.
+    
+    Video segments are written as MPEG-TS (parameter sets in-band, so copied
+    and re-encoded parts join cleanly), concatenated with the concat demuxer
+    and muxed with every audio track of the range by stream copy. Sources
+    whose codec can't be re-encoded to match fall back to accurate mode.
+    Accurate mode always writes H.264 MP4 (output_path's suffix is replaced),
+    transcoding audio to AAC unless every track is already MP4-compatible.
+    Returns a report dict (mode, output path, segments, copied and encoded
+    seconds).
+    """
+    input_path, output_path = Path(input_path), Path(output_path)
+    info = probe_video(input_path)
+    duration = info["duration"]
+    end = duration if not end or end > duration else end
+    if start < 0 or end - start <= TOLERANCE:
+        raise ValueError(f"Empty range {start:.3f}s - {end:.3f}s (video is {duration:.3f}s long)")
+    if mode == "smart" and info["codec"] not in REENCODERS:
+        mode = "accurate"
+    
+    segments = plan_trim(info["keyframes"], start, end, duration, mode)
+    # Fast mode may move the start back to a keyframe, audio follows the video
+    start = segments[0][1]
+    audio_codecs = [stream.get("codec_name") for stream in ffmpeg.probe(str(input_path))["streams"]
+                    if stream["codec_type"] == "audio"]
+    has_audio = bool(audio_codecs)
+    if mode == "accurate":
+        # The fallback decides the container: the source's may not hold H.264
+        output_path = output_path.with_suffix(".mp4")
+    mux_args = {"movflags": "+faststart"} if output_path.suffix.lower() in (".mp4", ".m4v", ".mov") else {}
+    
+    if mode == "accurate":
+        # One straight encode of the range (any source codec)
+        source = ffmpeg.input(str(input_path), ss=start, t=end - start)
+        streams = [source.video]
+        audio_args = {}
+        if has_audio:
+            streams.append(source.audio)
+            if all(codec in CONTAINERS["mp4"]["audio"] for codec in audio_codecs):
+                audio_args["acodec"] = "copy"
+            else:
+                encoder = CONTAINERS["mp4"]["encoders"]["audio"]
+                audio_args["acodec"] = encoder
+                audio_args.update({f"{key}:a": value for key, value in ENCODER_ARGS[encoder].items()})
+        _run(ffmpeg.output(*streams, str(output_path), vcodec="libx264", crf=crf, preset=preset,
+                           pix_fmt="yuv420p", **audio_args, **mux_args))
+    else:
+        work_dir = Path(work_dir) if work_dir else output_path.parent / f".{output_path.stem}_trim"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            parts = []
+            for index, (action, seg_start, seg_end) in enumerate(segments):
+                part = work_dir / f"part_{index:03d}.ts"
+                source = ffmpeg.input(str(input_path), ss=seg_start, t=seg_end - seg_start)
+                if action == "copy":
+                    _run(source.video.output(str(part), vcodec="copy", format="mpegts"))
+                else:
+                    _run(source.video.output(str(part), format="mpegts", **_encode_args(info, crf, preset)))
+                parts.append(part)
+            
+            concat_list = work_dir / "parts.txt"
+            concat_list.write_text("".join(f"file '{part.as_posix()}'\n" for part in parts))
+            video = ffmpeg.input(str(concat_list), format="concat", safe=0).video
+            streams = [video]
+            if has_audio:
+                streams.append(ffmpeg.input(str(input_path), ss=start, t=end - start).audio)
+            _run(ffmpeg.output(*streams, str(output_path), vcodec="copy", acodec="copy",
+                               avoid_negative_ts="make_zero", **mux_args))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    copied = sum(b - a for action, a, b in segments if action == "copy")
+    return {
+        "mode": mode,
+        "output": output_path,
+        "segments": segments,
+        "start": start,
+        "end": end,
+        "copied": copied,
+        "encoded": sum(b - a for action, a, b in segments if action == "encode"),
+        "keyframes": len(info["keyframes"])
+    }
+
+
+def describe_trim(report):
+    """Multi-line summary of a trim for the UI"""
+    lines = [f"Range: {report['start']:.3f}s - {report['end']:.3f}s ({report['end'] - report['start']:.3f}s), "
+             f"mode: {report['mode']}"]
+    for action, a, b in report["segments"]:
+        lines.append(f"  {'Stream copy' if action == 'copy' else 'Re-encode'}: {a:.3f}s - {b:.3f}s")
+    total = report["copied"] + report["encoded"]
+    if total > 0:
+        lines.append(f"Re-encoded {report['encoded']:.2f}s of {total:.2f}s "
+                     f"({report['encoded'] / total * 100:.0f}%), the rest was copied bit for bit")
+    return "\n".join(lines)
@@ -0,0 +1,220 @@
+"""
+Stream Muxing
+Decides per stream between stream copy and transcoding for a target container and runs it as one ffmpeg call
+"""
+from pathlib import Path
+import ffmpeg
+
+# What each container takes as-is (ffprobe codec names, None = any codec of that type), the
+# encoder for streams it can't take and the muxer name
+CONTAINERS = {
+    "mp4": {
+        "video": {"h264", "hevc", "av1", "vp9", "mpeg4", "mpeg2video", "mjpeg", "png"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "alac", "opus"},
+        "subtitle": {"mov_text"},
+        "encoders": {"video": "libx264", "audio": "aac", "subtitle": "mov_text"},
+        "format": "mp4"
+    },
+    "mov": {
+        "video": {"h264", "hevc", "av1", "mpeg4", "mpeg2video", "mjpeg", "png", "prores", "dnxhd", "qtrle"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "alac", "pcm_s16le", "pcm_s24le", "pcm_f32le"},
+        "subtitle": {"mov_text"},
+        "encoders": {"video": "libx264", "audio": "aac", "subtitle": "mov_text"},
+        "format": "mov"
+    },
+    "mkv": {
+        "video": None,
+        "audio": None,
+        "subtitle": {"subrip", "ass", "ssa", "webvtt", "hdmv_pgs_subtitle", "dvd_subtitle", "dvb_subtitle"},
+        "encoders": {"video": "libx264", "audio": "aac", "subtitle": "ass"},
+        "format": "matroska"
+    },
+    "webm": {
+        "video": {"vp8", "vp9", "av1"},
+        "audio": {"opus", "vorbis"},
+        "subtitle": {"webvtt"},
+        "encoders": {"video": "libvpx-vp9", "audio": "libopus", "subtitle": "webvtt"},
+        "format": "webm"
+    },
+    "avi": {
+        "video": {"h264", "mpeg4", "mjpeg", "msmpeg4v3", "mpeg2video"},
+        "audio": {"mp3", "ac3", "pcm_s16le"},
+        "subtitle": set(),
+        "encoders": {"video": "libx264", "audio": "libmp3lame", "subtitle": None},
+        "format": "avi"
+    }
+}
+CONTAINER_EXTS = {".mp4": "mp4", ".m4v": "mp4", ".mov": "mov", ".mkv": "mkv", ".webm": "webm", ".avi": "avi"}
+
+# Subtitle codecs that are text and can be converted into each other (bitmap subtitles can't)
+TEXT_SUBTITLES = {"subrip", "ass", "ssa", "webvtt", "mov_text", "text"}
+
+# Settings for transcoded streams, by encoder
+ENCODER_ARGS = {
+    "libx264": {"crf": 18, "preset": "medium", "pix_fmt": "yuv420p"},
+    "libx265": {"crf": 22, "preset": "medium", "pix_fmt": "yuv420p", "tag": "hvc1"},
+    "libvpx-vp9": {"crf": 31, "b": 0, "pix_fmt": "yuv420p", "row-mt": 1},
+    "libsvtav1": {"crf": 30, "preset": 8, "pix_fmt": "yuv420p"},
+    "aac": {"b": "192k"},
+    "libopus": {"b": "160k"},
+    "libmp3lame": {"b": "192k"}
+}
+
+STREAM_TYPES = ("video", "audio", "subtitle")
+
+
+def container_for(path):
+    """Container key for an output path, from its extension"""
+    ext = Path(path).suffix.lower()
+    if ext not in CONTAINER_EXTS:
+        raise ValueError(f"Unsupported container: {ext or Path(path).name}")
+    return CONTAINER_EXTS[ext]
+
+
+def probe_streams(path):
+    """ffprobe stream info of every stream in a file"""
+    return ffmpeg.probe(str(path))["streams"]
+
+
+def plan_streams(streams, container, types=STREAM_TYPES, video_encoder=None):
+    """
+    Decide what happens to each probed stream when writing `container`.
+    
+    Streams the container accepts are copied, others are transcoded with its
+    default encoder. video_encoder forces a video transcode (e.g. to shrink
+    the file). Bitmap subtitles that can't be copied, cover art that would
+    need re-encoding, data and attachment streams, and stream types not in
+    `types` are dropped. Returns one dict per stream (index, type, codec,
+    action: copy | transcode | drop, encoder, reason).
+    """
+    spec = CONTAINERS[container]
+    plan = []
+    for stream in streams:
+        kind = stream.get("codec_type")
+        codec = stream.get("codec_name", "unknown")
+        entry = {"index": stream["index"], "type": kind, "codec": codec, "action": "copy", "encoder": None,
+                 "reason": "", "language": stream.get("tags", {}).get("language")}
+        accepted = spec.get(kind)
+        cover_art = kind == "video" and stream.get("disposition", {}).get("attached_pic")
+        
+        if kind not in types or kind not in STREAM_TYPES:
+            entry.update(action="drop", reason="not carried")
+        elif kind == "video" and video_encoder and not cover_art:
+            entry.update(action="transcode", encoder=video_encoder, reason="re-encode requested")
+        elif accepted is None or codec in accepted:
+            entry["reason"] = f"{container} accepts {codec}"
+        elif cover_art:
+            entry.update(action="drop", reason=f"{container} can't hold {codec} cover art")
+        elif kind == "subtitle" and (codec not in TEXT_SUBTITLES or spec["encoders"]["subtitle"] is None):
+            entry.update(action="drop", reason=f"{codec} subtitles can't be converted for {container}")
+        else:
+            entry.update(action="transcode", encoder=spec["encoders"][kind],
+                         reason=f"{container} doesn't accept {codec}")
+        plan.append(entry)
+    return plan
+
+
+def run_plan(inputs, output_path, container, metadata_from=0):
+    """
+    Write the planned streams of one or more inputs into `output_path` in a single ffmpeg run.
+    
+    inputs is a list of (path, input options, plan). Streams are mapped in
+    order, each with its own codec (copy or encoder) and encoder settings;
+    stream metadata (language, title, disposition) follows the stream.
+    Global metadata and chapters come from inputs[metadata_from].
+    """
+    streams = []
+    output_args = {}
+    for path, input_args, plan in inputs:
+        source = ffmpeg.input(str(path), **input_args)
+        for entry in plan:
+            if entry["action"] == "drop":
+                continue
+            n = len(streams)
+            streams.append(source[str(entry["index"])])
+            if entry["action"] == "copy":
+                output_args[f"c:{n}"] = "copy"
+            else:
+                output_args[f"c:{n}"] = entry["encoder"]
+                for key, value in ENCODER_ARGS.get(entry["encoder"], {}).items():
+                    output_args[f"{key}:{n}"] = value
+    if not streams:
+        raise ValueError("Nothing to write, every stream was dropped")
+    
+    output_args["format"] = CONTAINERS[container]["format"]
+    if container in ("mp4", "mov"):
+        output_args["movflags"] = "+faststart"
+    (
+        ffmpeg
+        .output(*streams, str(output_path), map_metadata=metadata_from, map_chapters=metadata_from,
+                **output_args)
+        .global_args("-loglevel", "error", "-nostats")
+        .overwrite_output()
+        .run(quiet=True, capture_stdout=True, capture_stderr=True)
+    )
+
+
+def mux_tracks(video_path, source_path, plan, output_path, container, source_args=None):
+    """
+    Combine an encoded video with the planned audio/subtitle tracks of its source.
+    
+    The video is always copied. source_args (e.g. ss/t) select the range of
+    the source the video was made from.
+    """
+    video_plan = [{"index": 0, "type": "video", "action": "copy"}]
+    run_plan([(video_path, {}, video_plan), (source_path, source_args or {}, plan)], output_path, container,
+             metadata_from=1)
+
+
+def convert(input_path, output_path, video_encoder=None, streams=None):
+    """
+    Convert a file to the container of `output_path`, copying every stream it accepts.
+    
+    Returns the plan that was carried out.
+    """
+    container = container_for(output_path)
+    plan = plan_streams(streams if streams is not None else probe_streams(input_path), container,
+                        video_encoder=video_encoder)
+    run_plan([(input_path, {}, plan)], output_path, container)
+    return plan
+
+
+def carried(plan, kind=None):
+    """Entries of a plan that end up in the output, optionally of one stream type"""
+    return [entry for entry in plan if entry["action"] != "drop" and (kind is None or entry["type"] == kind)]
+
+
+def summarize_tracks(plan):
+    """One-line summary of what happened to the audio and subtitle tracks"""
+    parts = []
+    for kind in ("audio", "subtitle"):
+        entries = [entry for entry in plan if entry["type"] == kind]
+        if not entries:
+            continue
+        text = f"{len(entries)} {kind} track(s), {sum(entry['action'] == 'copy' for entry in entries)} copied"
+        transcoded = sum(entry["action"] == "transcode" for entry in entries)
+        dropped = sum(entry["action"] == "drop" for entry in entries)
+        if transcoded:
+            text += f", {transcoded} transcoded"
+        if dropped:
+            text += f", {dropped} dropped"
+        parts.append(text)
+    return "; ".join(parts)
+
+
+def describe_streams(plan):
+    """Multi-line summary of a plan for the UI"""
+    lines = []
+    for entry in plan:
+        language = f" [{entry['language']}]" if entry.get("language") else ""
+        if entry["action"] == "copy":
+            action = "copy"
+        elif entry["action"] == "transcode":
+            action = f"transcode → {entry['encoder']}"
+        else:
+            action = "drop"
+        lines.append(f"  #{entry['index']} {entry['type']} {entry['codec']}{language}: {action} ({entry['reason']})")
+    copied = sum(entry["action"] == "copy" for entry in plan)
+    transcoded = sum(entry["action"] == "transcode" for entry in plan)
+    lines.append(f"{copied} stream(s) copied, {transcoded} transcoded, {len(plan) - copied - transcoded} dropped")
+    return "\n".join(lines)
@@ -6,15 +6,17 @@ import shutil
 import atexit
 from pathlib import Path
 from config.config import TEMP_DIR
+from utils.frame_store import FrameStore
 
 
 class TempManager:
     """Manages temporary files and directories"""
     
-    def __init__(self):
-        self.temp_dir = TEMP_DIR
+    def __init__(self, temp_dir=None):
+        self.temp_dir = Path(temp_dir) if temp_dir is not None else TEMP_DIR
         self.frames_dir = self.temp_dir / "frames"
         self.output_dir = self.temp_dir / "output"
+        self.frame_stores_dir = self.temp_dir / "frame_stores"
         
         # Register cleanup on exit
         atexit.register(self.cleanup)
@@ -57,3 +59,42 @@ class TempManager:
     def get_temp_file_path(self, filename):
         """Get path for a temp file"""
         return self.temp_dir / filename
+    
+    def get_free_space(self):
+        """Get free disk space (bytes) on the temp volume"""
+        self.temp_dir.mkdir(exist_ok=True, parents=True)
+        return shutil.disk_usage(self.temp_dir).free
+    
+    def create_frame_store(self, name, frame_shape, capacity, reserve_bytes=512 * 1024**2, key=None):
+        """Create a memory-mapped frame store, checking free disk space first"""
+        required = FrameStore.required_bytes(frame_shape, capacity)
+        free = self.get_free_space()
+        if required + reserve_bytes > free:
+            raise OSError(
+                f"Not enough disk space for frame store '{name}': "
+                f"needs {required / 1024**3:.2f} GB, {free / 1024**3:.2f} GB free"
+            )
+        
+        store = FrameStore(self.frame_stores_dir / f"{name}.frames", frame_shape, capacity, key=key,
+                           reserve_bytes=reserve_bytes)
+        print(f"✓ Frame store '{name}' created ({required / 1024**3:.2f} GB, {capacity} frames)")
+        return store
+    
+    def open_frame_store(self, name, frame_shape, capacity, key, reserve_bytes=512 * 1024**2):
+        """
+        Reopen the frame store an earlier run of the same job left, or create a new one.
+        
+        A store of another job (key) or frame shape is deleted and replaced.
+        """
+        path = self.frame_stores_dir / f"{name}.frames"
+        if path.with_suffix(".json").exists():
+            try:
+                store = FrameStore.open(path, reserve_bytes)
+            except (OSError, ValueError, KeyError):
+                store = None
+            if store is not None and store.key == key and store.frame_shape == tuple(frame_shape):
+                print(f"✓ Frame store '{name}' reopened ({len(store)} frames to resume from)")
+                return store
+            if store is not None:
+                store.delete()
+        return self.create_frame_store(name, frame_shape, capacity, reserve_bytes, key)
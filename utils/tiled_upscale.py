@@ -0,0 +1,182 @@
+"""
+Tiled Upscaling
+Out-of-core upscaling of very large images: lazy input tiles, feathered overlaps, memory-mapped output
+"""
+import math
+from pathlib import Path
+import cv2
+import numpy as np
+from utils.image_pipeline import enhance_image
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+
+def open_lazy(path):
+    """
+    Open an image as an array that can be sliced without decoding all of it.
+    
+    .npy files (OpenCV channel order) and uncompressed TIFFs (with tifffile
+    installed) are memory mapped; anything else is decoded once with OpenCV. The input is only
+    1/scale² of the output, so that is the smaller of the two.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".npy":
+        return np.load(path, mmap_mode="r")
+    if tifffile is not None and suffix in (".tif", ".tiff"):
+        try:
+            image = tifffile.memmap(path, mode="r")
+            # TIFF stores RGB(A), the pipeline works in OpenCV's BGR(A)
+            return _SwapRBView(image) if image.ndim == 3 and image.shape[2] in (3, 4) else image
+        except ValueError:
+            # Compressed or tiled TIFFs can't be mapped
+            pass
+    image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise IOError(f"Could not read {path.name}")
+    return image
+
+
+def _ramp(length, overlap, rise, fall):
+    """1-D feather weights: ramps up over the first overlap, down over the last"""
+    weights = np.ones(length, dtype=np.float32)
+    # Half-pixel offsets keep every weight strictly between 0 and 1
+    ramp = (np.arange(overlap, dtype=np.float32) + 0.5) / overlap
+    if rise:
+        weights[:overlap] = ramp
+    if fall:
+        weights[length - overlap:] = ramp[::-1]
+    return weights
+
+
+def tile_grid(length, tile_size, overlap):
+    """Tile start positions along one axis (stride tile_size, each tile overlap longer)"""
+    count = max(math.ceil((length - overlap) / tile_size), 1)
+    return [i * tile_size for i in range(count)]
+
+
+class TiledUpscaler:
+    """
+    Upscales an image tile by tile into a memory-mapped output.
+    
+    Neighbouring tiles overlap by `overlap` input pixels and are cross-faded
+    with linear ramps whose weights sum to one. Tiles are processed in raster
+    order and blended into the output incrementally: each tile is mixed with
+    what is already there by its share of the weight accumulated so far, so
+    only one tile is ever held in memory and the result equals the full
+    weighted sum. Peak memory depends on tile size, not image size.
+    """
+    
+    def __init__(self, upsampler, tile_size=512, overlap=32, alpha_mode="resize"):
+        self.upsampler = upsampler
+        self.scale = upsampler.scale
+        self.tile_size = tile_size
+        # Rising and falling ramps of a tile must not meet
+        self.overlap = max(min(overlap, tile_size // 2), 1)
+        self.alpha_mode = alpha_mode
+    
+    def output_shape(self, image):
+        """Shape of the upscaled image"""
+        return (image.shape[0] * self.scale, image.shape[1] * self.scale) + tuple(image.shape[2:])
+    
+    def upscale(self, image, output, on_tile=None):
+        """
+        Upscale image (array-like, sliced lazily) into output (e.g. np.memmap).
+        
+        on_tile(done, total) is called after each tile.
+        """
+        height, width = image.shape[:2]
+        overlap = self.overlap
+        rows = tile_grid(height, self.tile_size, overlap)
+        cols = tile_grid(width, self.tile_size, overlap)
+        total = len(rows) * len(cols)
+        done = 0
+        
+        for r, y in enumerate(rows):
+            y_end = height if r == len(rows) - 1 else y + self.tile_size + overlap
+            for c, x in enumerate(cols):
+                x_end = width if c == len(cols) - 1 else x + self.tile_size + overlap
+                tile = np.ascontiguousarray(image[y:y_end, x:x_end])
+                result = enhance_image(self.upsampler, tile, alpha_mode=self.alpha_mode)
+                self._blend(output, result, y * self.scale, x * self.scale, r > 0, r < len(rows) - 1,
+                            c > 0, c < len(cols) - 1)
+                done += 1
+                if on_tile is not None:
+                    on_tile(done, total)
+        
+        if hasattr(output, "flush"):
+            output.flush()
+        return output
+    
+    def _blend(self, output, result, top, left, has_top, has_bottom, has_left, has_right):
+        """Mix one upscaled tile into the output by its share of the accumulated weight"""
+        overlap = self.overlap * self.scale
+        tile_height, tile_width = result.shape[:2]
+        rise_top = _ramp(tile_height, overlap, has_top, False)[:, None]
+        fall_bottom = _ramp(tile_height, overlap, False, has_bottom)[:, None]
+        rise_left = _ramp(tile_width, overlap, has_left, False)[None, :]
+        fall_right = _ramp(tile_width, overlap, False, has_right)[None, :]
+        
+        # Weight of this tile, and of the tiles above / to the left already blended in
+        weight = rise_top * fall_bottom * rise_left * fall_right
+        previous = (1 - rise_top) + rise_top * fall_bottom * (1 - rise_left)
+        alpha = weight / (previous + weight)
+        
+        region = output[top:top + tile_height, left:left + tile_width]
+        if result.ndim == 3:
+            alpha = alpha[..., None]
+        # Where no earlier tile contributed (alpha == 1) the old contents are ignored
+        blended = region.astype(np.float32) * (1 - alpha) + result.astype(np.float32) * alpha
+        if np.issubdtype(output.dtype, np.integer):
+            blended = np.clip(blended.round(), 0, np.iinfo(output.dtype).max)
+        region[...] = blended.astype(output.dtype)
+
+
+def create_output_memmap(path, shape, dtype):
+    """Create a .npy file mapped into memory for the output"""
+    return np.lib.format.open_memmap(str(path), mode="w+", dtype=dtype, shape=tuple(shape))
+
+
+def write_tiled_tiff(path, data, tile=256):
+    """Write a (memory-mapped) array as a tiled TIFF without loading it whole"""
+    if tifffile is None:
+        raise ImportError("tifffile is required for tiled TIFF output (pip install tifffile)")
+    photometric = "minisblack" if data.ndim == 2 or data.shape[2] < 3 else "rgb"
+    if photometric == "rgb":
+        # TIFF stores RGB(A); swap channels tile by tile while writing
+        data = _SwapRBView(data)
+    tifffile.imwrite(str(path), _iter_tiles(data, tile), shape=data.shape, dtype=data.dtype,
+                     tile=(tile, tile), photometric=photometric,
+                     extrasamples=["unassalpha"] if data.ndim == 3 and data.shape[2] == 4 else None,
+                     bigtiff=True)
+
+
+class _SwapRBView:
+    """Read-only view of a 3/4-channel array whose slices come back with red and blue swapped"""
+    
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.ndim = data.ndim
+    
+    def __getitem__(self, key):
+        block = self.data[key]
+        order = [2, 1, 0, 3] if block.shape[-1] == 4 else [2, 1, 0]
+        return block[..., order]
+
+
+def _iter_tiles(data, tile):
+    """Yield tile-sized blocks in TIFF order, padding edge tiles with zeros"""
+    height, width = data.shape[:2]
+    for y in range(0, height, tile):
+        for x in range(0, width, tile):
+            block = np.asarray(data[y:y + tile, x:x + tile])
+            if block.shape[0] != tile or block.shape[1] != tile:
+                padded = np.zeros((tile, tile) + block.shape[2:], dtype=block.dtype)
+                padded[:block.shape[0], :block.shape[1]] = block
+                block = padded
+            yield block
@@ -0,0 +1,262 @@
+"""
+Video Encoder
+Fans a single stream of upscaled frames out to several ffmpeg encoders in parallel
+"""
+import queue
+import re
+import threading
+import numpy as np
+import ffmpeg
+from pathlib import Path
+from utils.cpu_topology import pin_process
+
+
+def rendition_filename(name, spec, base_name="upscaled_video"):
+    """Build an output filename for a rendition"""
+    slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+    if spec.get("format") == "hls":
+        # Segmented renditions get their own directory of segments
+        return f"{base_name}_{slug}/playlist.m3u8"
+    return f"{base_name}_{slug}.{spec.get('container', 'mp4')}"
+
+
+def finished_segments(playlist_path):
+    """List segment files an HLS playlist already references"""
+    playlist_path = Path(playlist_path)
+    if not playlist_path.exists():
+        return []
+    with open(playlist_path, "r") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+class RenditionEncoder:
+    """
+    One ffmpeg process fed with raw BGR frames from a background thread.
+    
+    With segmented=True the stream is written as MPEG-TS parts that are
+    joined on close, so encoder settings (e.g. the x264 preset) can change
+    mid-job: reconfigure() finishes the current part, and the next frame
+    starts a new one with the new settings (so no part is ever empty).
+    HLS renditions are never segmented.
+    """
+    
+    def __init__(self, name, spec, width, height, fps, output_path, queue_size=4, segmented=False):
+        self.name = name
+        self.spec = spec
+        self.output_path = Path(output_path)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.width, self.height, self.fps = width, height, fps
+        self.segmented = segmented and spec.get("format") != "hls"
+        self.parts = []
+        self.processes = []
+        self.cores = None
+        self.tag = None
+        
+        output_args = {"vcodec": spec["vcodec"], "pix_fmt": spec.get("pix_fmt", "yuv420p")}
+        for key in ("crf", "preset", "b:v", "profile:v", "tag:v", "threads"):
+            if key in spec:
+                output_args[key] = spec[key]
+        if spec.get("x264_params"):
+            output_args["x264-params"] = spec["x264_params"]
+        if spec.get("format") == "hls":
+            # Segmented output: finished segments are listed in the playlist while encoding runs
+            segment_seconds = spec.get("segment_seconds", 4)
+            self.output_path.parent.mkdir(exist_ok=True, parents=True)
+            output_args.update({
+                "f": "hls",
+                "hls_time": segment_seconds,
+                "hls_list_size": 0,
+                "hls_segment_filename": str(self.output_path.parent / "segment_%05d.ts"),
+                "force_key_frames": f"expr:gte(t,n_forced*{segment_seconds})"
+            })
+        if self.segmented:
+            # The codec tag belongs to the final container, not the MPEG-TS parts
+            self.tag = output_args.pop("tag:v", None)
+            output_args["format"] = "mpegts"
+        self.output_args = output_args
+        
+        self.process = self._start(output_args)
+        self.thread = threading.Thread(target=self._run, name=f"encoder-{name}", daemon=True)
+        self.thread.start()
+    
+    def _start(self, output_args):
+        """Launch an ffmpeg process for the next part (or the whole output)"""
+        if self.segmented:
+            target = self.output_path.with_name(f".{self.output_path.stem}_part{len(self.parts):03d}.ts")
+            self.parts.append(target)
+        else:
+            target = self.output_path
+        
+        stream = ffmpeg.input("pipe:", format="rawvideo", pix_fmt="bgr24",
+                              s=f"{self.width}x{self.height}", framerate=self.fps)
+        # Downscale inside the encoder process, never upscale past the source
+        target_height = self.spec.get("height")
+        if target_height and target_height < self.height:
+            stream = stream.filter("scale", -2, target_height, flags="lanczos")
+        
+        process = (
+            stream
+            .output(str(target), **output_args)
+            .global_args("-loglevel", "error", "-nostats")
+            .overwrite_output()
+            .run_async(pipe_stdin=True)
+        )
+        self.processes.append(process)
+        if self.cores is not None:
+            pin_process(self.cores, process.pid)
+        return process
+    
+    def _run(self):
+        """Feed queued frames into ffmpeg until the end-of-stream marker"""
+        next_args = self.output_args
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                # Keep draining so producers never block on a dead encoder
+                continue
+            try:
+                if isinstance(item, dict):
+                    # New settings: finish this part, the next frame starts the following one
+                    if self.process is not None:
+                        self.process.stdin.close()
+                        self.process = None
+                    next_args = item
+                else:
+                    if self.process is None:
+                        self.process = self._start(next_args)
+                    self.process.stdin.write(memoryview(np.ascontiguousarray(item)).cast("B"))
+            except (BrokenPipeError, OSError) as e:
+                self.error = e
+        try:
+            if self.process is not None:
+                self.process.stdin.close()
+        except OSError:
+            pass
+    
+    def write(self, frame):
+        """Queue a frame, blocking if the encoder is falling behind"""
+        if self.error is not None:
+            raise RuntimeError(f"Encoder '{self.name}' failed: {self.error}")
+        self.queue.put(frame)
+    
+    def reconfigure(self, **overrides):
+        """
+        Change encoder settings from the next frame on.
+        
+        Only segmented encoders can do this; returns False otherwise or if
+        nothing changes.
+        """
+        if not self.segmented or all(self.output_args.get(key) == value for key, value in overrides.items()):
+            return False
+        self.output_args = {**self.output_args, **overrides}
+        self.queue.put(dict(self.output_args))
+        return True
+    
+    def set_cores(self, cores):
+        """Restrict this encoder's ffmpeg processes to cores (Linux only), returns False where unsupported"""
+        self.cores = list(cores)
+        supported = True
+        for process in self.processes:
+            if process.poll() is None:
+                try:
+                    supported = pin_process(self.cores, process.pid) and supported
+                except (ProcessLookupError, OSError):
+                    pass
+        return supported
+    
+    def _join_parts(self):
+        """Concatenate the MPEG-TS parts into the final container by stream copy"""
+        concat_list = self.output_path.with_name(f".{self.output_path.stem}_parts.txt")
+        concat_list.write_text("".join(f"file '{part.as_posix()}'\n" for part in self.parts))
+        output_args = {"c": "copy"}
+        if self.tag:
+            output_args["tag:v"] = self.tag
+        if self.output_path.suffix.lower() in (".mp4", ".m4v", ".mov"):
+            output_args["movflags"] = "+faststart"
+        try:
+            (
+                ffmpeg
+                .input(str(concat_list), format="concat", safe=0)
+                .output(str(self.output_path), **output_args)
+                .global_args("-loglevel", "error", "-nostats")
+                .overwrite_output()
+                .run(quiet=True, capture_stdout=True, capture_stderr=True)
+            )
+        finally:
+            self._remove_parts()
+            concat_list.unlink(missing_ok=True)
+    
+    def _remove_parts(self):
+        """Delete the MPEG-TS parts"""
+        for part in self.parts:
+            part.unlink(missing_ok=True)
+    
+    def close(self):
+        """Flush remaining frames and wait for ffmpeg to finish"""
+        self.queue.put(None)
+        self.thread.join()
+        return_codes = [process.wait() for process in self.processes]
+        if self.error is not None or any(return_codes):
+            self._remove_parts()
+            raise RuntimeError(f"Encoder '{self.name}' failed (exit code {max(return_codes, key=abs)})")
+        if self.segmented:
+            self._join_parts()
+        return self.output_path
+    
+    def abort(self):
+        """Stop the encoder without waiting for a valid output"""
+        self.error = self.error or "aborted"
+        for process in self.processes:
+            process.kill()
+        self.queue.put(None)
+        self.thread.join()
+        self._remove_parts()
+
+
+class MultiEncoder:
+    """
+    Encodes one frame stream into several renditions at once.
+    
+    Every frame is produced once and shared by reference with all encoders;
+    each encoder runs in its own ffmpeg process so they encode in parallel.
+    Only renditions whose vcodec is in segmented_codecs are segmented, all
+    others write straight to their container (MPEG-TS can't carry every
+    codec, e.g. ProRes or AV1, and the join is an extra remux).
+    """
+    
+    def __init__(self, renditions, width, height, fps, output_dir, segmented_codecs=()):
+        self.encoders = []
+        try:
+            for name, spec in renditions.items():
+                output_path = Path(output_dir) / rendition_filename(name, spec)
+                self.encoders.append(RenditionEncoder(name, spec, width, height, fps, output_path,
+                                                      segmented=spec["vcodec"] in segmented_codecs))
+        except Exception:
+            self.abort()
+            raise
+    
+    def write(self, frame):
+        """Send a frame to every encoder"""
+        for encoder in self.encoders:
+            encoder.write(frame)
+    
+    def close(self):
+        """Finish all encoders and return a dict of rendition name -> output path"""
+        outputs = {}
+        errors = []
+        for encoder in self.encoders:
+            try:
+                outputs[encoder.name] = encoder.close()
+            except (RuntimeError, ffmpeg.Error) as e:
+                errors.append(str(e))
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return outputs
+    
+    def abort(self):
+        """Kill all encoders"""
+        for encoder in self.encoders:
+            encoder.abort()
@@ -0,0 +1,416 @@
+"""
+Inference Worker Pool
+Runs upscaling jobs in separate worker processes so the web server process stays responsive
+"""
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+from pathlib import Path
+import numpy as np
+from config.config import WORKER_RING_SLOTS, WORKER_RING_FRAME_BYTES
+from utils.cpu_topology import parse_cpulist, pin_process
+from utils.shm_ring import SharedFrameRing
+
+# Output ring slots are this many times larger than input slots (room for a 2x upscale)
+OUTPUT_RING_FACTOR = 4
+
+
+def frame_to_shared(frame):
+    """Copy a frame into a new shared memory block, returning (block, descriptor)"""
+    block = shared_memory.SharedMemory(create=True, size=max(frame.nbytes, 1))
+    view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=block.buf)
+    view[...] = frame
+    return block, {"name": block.name, "shape": frame.shape, "dtype": frame.dtype.str}
+
+
+def frame_from_shared(descriptor, copy=True):
+    """Read a frame described by frame_to_shared, returning (frame, block)"""
+    block = shared_memory.SharedMemory(name=descriptor["name"])
+    frame = np.ndarray(descriptor["shape"], dtype=np.dtype(descriptor["dtype"]), buffer=block.buf)
+    if copy:
+        frame = frame.copy()
+    return frame, block
+
+
+def ring_frame(slot, shape, dtype):
+    """View the start of a raw ring slot as a frame"""
+    dtype = np.dtype(dtype)
+    return slot[:int(np.prod(shape)) * dtype.itemsize].view(dtype).reshape(shape)
+
+
+def put_frame(ring, frame, sequence):
+    """
+    Hand a frame over through the next ring slot, or a shared memory block of its own.
+    
+    Returns (descriptor, block). block is None when the frame went into the
+    ring; otherwise close and unlink it once the reader is done. Never
+    blocks: a full ring or a frame larger than a slot takes the block path.
+    """
+    if ring is not None and frame.nbytes <= ring.frame_bytes:
+        slot = ring.acquire_write(timeout=0)
+        if slot is not None:
+            np.copyto(ring_frame(slot, frame.shape, frame.dtype), frame)
+            ring.commit_write(sequence)
+            return {"ring": True, "shape": frame.shape, "dtype": frame.dtype.str}, None
+    block, descriptor = frame_to_shared(frame)
+    return descriptor, block
+
+
+def _worker_main(worker_id, task_queue, result_queue, temp_dir, env, rings=(None, None)):
+    """
+    Worker process: owns its own model, temp directory and device.
+    
+    UPSCALER_DEVICE_ID pins it to a device, UPSCALER_CPU_CORES to a core set.
+    rings are its (input, output) SharedFrameRings, shared with the pool.
+    """
+    # Thread-pool variables must be in place before torch is imported
+    os.environ.update(env)
+    if env.get("UPSCALER_CPU_CORES"):
+        pin_process(parse_cpulist(env["UPSCALER_CPU_CORES"]))
+    
+    # Heavy imports happen in the worker, never in the web process
+    import torch
+    from utils.temp_manager import TempManager
+    from utils.device_manager import DeviceManager
+    from tabs.upscaler_tab import UpscalerTab
+    
+    if env.get("OMP_NUM_THREADS"):
+        torch.set_num_threads(int(env["OMP_NUM_THREADS"]))
+    
+    temp_manager = TempManager(temp_dir)
+    temp_manager.initialize()
+    device_manager = DeviceManager()
+    if os.environ.get("UPSCALER_DEVICE_ID"):
+        device_manager.pin_device(os.environ["UPSCALER_DEVICE_ID"])
+    engine = UpscalerTab(temp_manager, device_manager)
+    result_queue.put(("ready", worker_id, None))
+    
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, method, args, kwargs = task
+        
+        def progress(fraction=None, desc=None, *_, **__):
+            result_queue.put(("progress", task_id, {"progress": fraction, "desc": desc}))
+        
+        try:
+            if method == "enhance_frame":
+                result = _enhance_shared_frame(engine, rings, task_id, *args, **kwargs)
+            else:
+                result = getattr(engine, method)(*args, progress=progress, **kwargs)
+            result_queue.put(("result", task_id, result))
+        except Exception as e:
+            result_queue.put(("error", task_id, f"{type(e).__name__}: {e}"))
+    
+    temp_manager.cleanup()
+
+
+def _enhance_shared_frame(engine, rings, task_id, descriptor, model_name, device):
+    """Upscale a frame passed with put_frame, returning the output the same way"""
+    input_ring, output_ring = rings
+    # The ring slot is taken before anything can fail, so the ring stays in step with the tasks
+    if descriptor.get("ring"):
+        sequence, slot = input_ring.acquire_read()
+        frame, block = ring_frame(slot, descriptor["shape"], descriptor["dtype"]), None
+    else:
+        sequence = task_id
+        frame, block = frame_from_shared(descriptor, copy=False)
+    try:
+        if sequence != task_id:
+            raise RuntimeError(f"Frame ring out of step: frame {sequence} for task {task_id}")
+        load_msg = engine.load_model(model_name, device)
+        if engine.upsampler is None:
+            raise RuntimeError(load_msg)
+        from config.config import MODELS
+        output, _ = engine.upsampler.enhance(frame, outscale=MODELS[model_name]['scale'])
+    finally:
+        del frame
+        if block is None:
+            input_ring.release_read()
+        else:
+            block.close()
+    
+    output_descriptor, output_block = put_frame(output_ring, output, task_id)
+    if output_block is not None:
+        output_block.close()
+    return output_descriptor
+
+
+class InferenceWorkerPool:
+    """
+    Pool of inference worker processes.
+    
+    Each worker has its own task queue; a task goes to the worker with the
+    fewest outstanding tasks. Given a DeviceManager and workers pinned to
+    devices, the task is first placed on the least-loaded device
+    (acquire_device) and goes to one of that device's workers; the device is
+    released when the task ends. Results and progress come back on a result
+    queue read by a listener thread, which resolves futures and forwards
+    progress callbacks.
+    
+    Frames travel through a pair of SharedFrameRings per worker, in and out,
+    reused for every frame. Frames larger than a slot, or sent while all
+    slots are busy, get a shared memory block of their own instead.
+    
+    A monitor thread waits on the process sentinels. When a worker dies
+    (out of memory, a crash in native code) its outstanding tasks fail with
+    RuntimeError and a replacement worker, with a fresh queue and rings, is
+    started in its slot.
+    """
+    
+    def __init__(self, num_workers, temp_dir, worker_envs=None, device_manager=None):
+        self.num_workers = num_workers
+        self.temp_dir = Path(temp_dir)
+        self.worker_envs = worker_envs or [{} for _ in range(num_workers)]
+        self.context = mp.get_context("spawn")
+        # Tasks are placed on devices only when every worker is pinned to one
+        devices = [env.get("UPSCALER_DEVICE_ID") for env in self.worker_envs]
+        self.device_manager = device_manager if device_manager is not None and all(devices) else None
+        self.worker_devices = devices if self.device_manager is not None else [None] * num_workers
+        self.task_queues = [None] * num_workers
+        self.rings = [(None, None)] * num_workers
+        self.result_queue = self.context.Queue()
+        self.processes = [None] * num_workers
+        self.pending = {}
+        self.progress_callbacks = {}
+        self.placements = {}
+        # Outstanding task ids per worker, the worker of each task, and which tasks return a frame
+        self.assigned = [set() for _ in range(num_workers)]
+        self.task_workers = {}
+        self.frame_tasks = set()
+        self.task_ids = itertools.count()
+        self.ready = threading.Event()
+        self.ready_count = 0
+        self.lock = threading.Lock()
+        self.listener = None
+        self.monitor = None
+        self.stopping = False
+    
+    def _create_rings(self):
+        """Input and output frame rings for one worker"""
+        if WORKER_RING_FRAME_BYTES <= 0:
+            return None, None
+        return (SharedFrameRing((WORKER_RING_FRAME_BYTES,), WORKER_RING_SLOTS, context=self.context),
+                SharedFrameRing((WORKER_RING_FRAME_BYTES * OUTPUT_RING_FACTOR,), WORKER_RING_SLOTS,
+                                context=self.context))
+    
+    @staticmethod
+    def _close_rings(rings):
+        """Free a worker's frame rings"""
+        for ring in rings:
+            if ring is not None:
+                ring.close()
+                ring.unlink()
+    
+    def _spawn(self, worker_id):
+        """Start the worker process for a slot, with a fresh task queue and frame rings"""
+        old_rings = self.rings[worker_id]
+        self.task_queues[worker_id] = self.context.Queue()
+        self.rings[worker_id] = self._create_rings()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(worker_id, self.task_queues[worker_id], self.result_queue,
+                  str(self.temp_dir / f"worker_{worker_id}"), self.worker_envs[worker_id], self.rings[worker_id]),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self._close_rings(old_rings)
+    
+    def start(self):
+        """Spawn the workers, the result listener and the process monitor"""
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+        
+        self.listener = threading.Thread(target=self._listen, name="worker-results", daemon=True)
+        self.listener.start()
+        self.monitor = threading.Thread(target=self._monitor, name="worker-monitor", daemon=True)
+        self.monitor.start()
+        print(f"✓ Started {self.num_workers} inference worker process(es)")
+    
+    def _listen(self):
+        """Dispatch messages coming back from workers"""
+        while True:
+            message = self.result_queue.get()
+            if message is None:
+                break
+            kind, task_id, payload = message
+            
+            if kind == "ready":
+                self.ready_count += 1
+                if self.ready_count >= self.num_workers:
+                    self.ready.set()
+                continue
+            if kind == "progress":
+                callback = self.progress_callbacks.get(task_id)
+                if callback is not None:
+                    callback(payload)
+                continue
+            if kind == "died":
+                # Sent by the monitor, with the worker id in place of a task id
+                self._replace_worker(task_id, payload)
+                continue
+            
+            with self.lock:
+                future = self._forget(task_id)
+                worker_id = self.task_workers.pop(task_id, None)
+                returns_frame = task_id in self.frame_tasks
+                self.frame_tasks.discard(task_id)
+            self._release(task_id)
+            if kind == "result" and returns_frame:
+                # Taken even if nobody waits for it, to keep the output ring in step
+                try:
+                    payload = self._take_output(worker_id, task_id, payload)
+                except RuntimeError as e:
+                    kind, payload = "error", str(e)
+            if future is None:
+                continue
+            if kind == "result":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+    
+    def _forget(self, task_id):
+        """Drop a task's bookkeeping (lock held), returning its future"""
+        self.progress_callbacks.pop(task_id, None)
+        worker_id = self.task_workers.get(task_id)
+        if worker_id is not None:
+            self.assigned[worker_id].discard(task_id)
+        return self.pending.pop(task_id, None)
+    
+    def _take_output(self, worker_id, task_id, descriptor):
+        """Copy a worker's output frame out of its output ring or shared memory block"""
+        if descriptor.get("ring"):
+            output_ring = self.rings[worker_id][1]
+            sequence, slot = output_ring.acquire_read()
+            frame = ring_frame(slot, descriptor["shape"], descriptor["dtype"]).copy()
+            output_ring.release_read()
+            if sequence != task_id:
+                raise RuntimeError(f"Frame ring out of step: frame {sequence} for task {task_id}")
+            return frame
+        frame, block = frame_from_shared(descriptor)
+        block.close()
+        block.unlink()
+        return frame
+    
+    def _replace_worker(self, worker_id, exitcode):
+        """Fail the tasks of a dead worker and start a new process in its slot"""
+        with self.lock:
+            lost = list(self.assigned[worker_id])
+            futures = [self._forget(task_id) for task_id in lost]
+            for task_id in lost:
+                self.task_workers.pop(task_id, None)
+                self.frame_tasks.discard(task_id)
+            # Its queue and rings may hold tasks and slots of the dead process
+            self._spawn(worker_id)
+        for task_id in lost:
+            self._release(task_id)
+        for future in futures:
+            if future is not None:
+                future.set_exception(RuntimeError(f"Inference worker {worker_id} died (exit code {exitcode})"))
+    
+    def _monitor(self):
+        """Report workers whose process has exited, for the listener to replace"""
+        reported = set()
+        while not self.stopping:
+            processes = list(self.processes)
+            connection.wait([process.sentinel for process in processes if process not in reported], timeout=1.0)
+            if self.stopping:
+                break
+            for worker_id, process in enumerate(processes):
+                if process in reported or process.exitcode is None:
+                    continue
+                reported.add(process)
+                print(f"✗ Inference worker {worker_id} exited with code {process.exitcode}, restarting it")
+                # Goes through the result queue so it is handled after anything the worker sent
+                self.result_queue.put(("died", worker_id, process.exitcode))
+    
+    def _release(self, task_id):
+        """Give back the device a task was placed on"""
+        with self.lock:
+            device_id = self.placements.pop(task_id, None)
+        if device_id is not None:
+            self.device_manager.release_device(device_id)
+    
+    def _dispatch(self, method, args, kwargs, on_progress=None, frame=None):
+        """
+        Place a task on a worker and queue it there, returning (future, block).
+        
+        A frame goes to the worker ahead of the task, its descriptor becoming
+        the first argument; block is its own shared memory block when it
+        didn't go into the ring, to free once the task is done.
+        """
+        future = Future()
+        device_id = None
+        if self.device_manager is not None:
+            device_id = self.device_manager.acquire_device(device_ids=set(self.worker_devices))
+            if device_id is None:
+                future.set_exception(RuntimeError("No device has enough free memory for this job"))
+                return future, None
+        
+        block = None
+        with self.lock:
+            task_id = next(self.task_ids)
+            _, worker_id = min((len(self.assigned[worker]), worker) for worker in range(self.num_workers)
+                               if self.worker_devices[worker] == device_id)
+            self.pending[task_id] = future
+            self.assigned[worker_id].add(task_id)
+            self.task_workers[task_id] = worker_id
+            if device_id is not None:
+                self.placements[task_id] = device_id
+            if on_progress is not None:
+                self.progress_callbacks[task_id] = on_progress
+            if frame is not None:
+                descriptor, block = put_frame(self.rings[worker_id][0], frame, task_id)
+                args = (descriptor,) + tuple(args)
+                self.frame_tasks.add(task_id)
+            self.task_queues[worker_id].put((task_id, method, args, kwargs))
+        return future, block
+    
+    def submit(self, method, *args, on_progress=None, **kwargs):
+        """Queue an UpscalerTab method call on a worker, returning a Future"""
+        future, _ = self._dispatch(method, args, kwargs, on_progress)
+        return future
+    
+    async def run(self, method, *args, on_progress=None, **kwargs):
+        """Async wrapper around submit for use in the web tier"""
+        return await asyncio.wrap_future(self.submit(method, *args, on_progress=on_progress, **kwargs))
+    
+    async def enhance_frame(self, frame, model_name, device):
+        """Upscale a single frame on a worker, passing pixels through its frame rings"""
+        future, block = self._dispatch("enhance_frame", (model_name, device), {}, frame=frame)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+    
+    def shutdown(self, timeout=10):
+        """Stop all workers"""
+        self.stopping = True
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.result_queue.put(None)
+        if self.listener is not None:
+            self.listener.join(timeout)
+        with self.lock:
+            for future in self.pending.values():
+                future.set_exception(RuntimeError("Worker pool shut down"))
+            self.pending.clear()
+            placements = list(self.placements.values())
+            self.placements.clear()
+        for device_id in placements:
+            self.device_manager.release_device(device_id)
+        for rings in self.rings:
+            self._close_rings(rings)